@@ -0,0 +1,170 @@
+# ann_index.py
+#
+# Approximate nearest-neighbour (IVF) index over the NCF movie embeddings,
+# used as a candidate-generation stage: retrieve a few hundred movies cheaply,
+# then rank only those with the full model (ncf_engine.CatalogScorer).
+#
+# The NCF network is not a dot-product model, so the retrieval query is its
+# first-order Taylor expansion around the average movie:
+#   f(u, m) ~= f(u, m_avg) + grad_m f(u, m_avg) . (m - m_avg)
+# Ranking by grad . m is an inner-product search over the item embeddings.
+#
+# The index is a k-means partition of the embeddings (the "inverted lists").
+# A query scores the centroids, opens the `nprobe` best lists and scores only
+# the movies inside them.
+#
+# Usage (from the project folder):
+#   python ann_index.py build        # writes item_ann_index.npz
+#   python ann_index.py benchmark    # recall@10 and latency for each nprobe
+
+import os
+import sys
+import time
+import numpy as np
+
+INDEX_PATH = 'item_ann_index.npz'
+DEFAULT_NPROBE = 8
+N_CANDIDATES = 300
+
+
+# --- 1. Retrieval Query ---
+def retrieval_query(scorer, user_hidden):
+    """Gradient of the NCF output w.r.t. the movie embedding, at the average movie."""
+    model = scorer.model
+    k = model.embedding_size
+    h1 = user_hidden + scorer.item_hidden.mean(axis=0)
+    h2 = np.maximum(h1, 0) @ model.w2 + model.b2
+    grad_h2 = (h2 > 0) * model.w3[:, 0]
+    grad_h1 = (h1 > 0) * (model.w2 @ grad_h2)
+    return model.w1[k:] @ grad_h1
+
+
+# --- 2. IVF Index ---
+def kmeans(vectors, n_clusters, n_iter=20, seed=42):
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        # ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2 ; ||x||^2 does not affect argmin
+        distances = (centroids ** 2).sum(axis=1) - 2 * vectors @ centroids.T
+        assignments = distances.argmin(axis=1)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        non_empty = counts > 0
+        centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+    return centroids, assignments
+
+
+class IVFIndex:
+    def __init__(self, centroids, list_offsets, item_ids, vectors):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.item_ids = item_ids
+        self.vectors = vectors
+
+    @classmethod
+    def build(cls, item_vectors, n_lists=None, seed=42):
+        item_vectors = np.asarray(item_vectors, dtype=np.float32)
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(len(item_vectors))))
+        centroids, assignments = kmeans(item_vectors, n_lists, seed=seed)
+        order = np.argsort(assignments, kind='stable')
+        list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=n_lists), out=list_offsets[1:])
+        return cls(centroids, list_offsets, order.astype(np.int64), item_vectors[order])
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        with np.load(path) as data:
+            return cls(data['centroids'], data['list_offsets'], data['item_ids'], data['vectors'])
+
+    def to_arrays(self):
+        return {'centroids': self.centroids, 'list_offsets': self.list_offsets,
+                'item_ids': self.item_ids, 'vectors': self.vectors}
+
+    def save(self, path=INDEX_PATH):
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, **self.to_arrays())
+        os.replace(tmp_path, path)
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    def search(self, query, k=N_CANDIDATES, nprobe=DEFAULT_NPROBE):
+        """Top-k item indices by inner product with `query`, probing `nprobe` lists."""
+        nprobe = min(nprobe, self.n_lists)
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        positions = np.concatenate([np.arange(self.list_offsets[i], self.list_offsets[i + 1]) for i in probe])
+        scores = self.vectors[positions] @ query
+        k = min(k, len(positions))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return self.item_ids[positions[top]]
+
+
+# --- 3. Two-Stage Recommendation ---
+def two_stage_top_n(scorer, index, user_hidden, n=10, seen=None, n_candidates=N_CANDIDATES, nprobe=DEFAULT_NPROBE):
+    """Retrieve candidates from the ANN index, then rank them with the full model.
+
+    `user_hidden` is the user's half of the first layer (scorer.user_hidden[i],
+    or scorer.hidden_for_vector(v) for a folded-in user).
+    """
+    candidates = retrieve_candidates(scorer, index, user_hidden, seen, n_candidates=n_candidates, nprobe=nprobe)
+    return scorer.top_n_candidates(user_hidden, candidates, n=n, seen=seen)
+
+
+def retrieve_candidates(scorer, index, user_hidden, seen=None, n_candidates=N_CANDIDATES, nprobe=DEFAULT_NPROBE):
+    """The first stage alone: candidate movie indices, with room for the seen ones that get dropped."""
+    n_seen = 0 if seen is None else len(seen)
+    return index.search(retrieval_query(scorer, user_hidden), k=n_candidates + n_seen, nprobe=nprobe)
+
+
+def build_index(scorer, path=INDEX_PATH):
+    index = IVFIndex.build(scorer.model.movie_embedding)
+    index.save(path)
+    return index
+
+
+# --- 4. Benchmark ---
+def benchmark(n_users=200, nprobes=(1, 2, 4, 8, 16, 32), n=10, seed=42):
+    from batch_recommendations import load_engine
+
+    _, scorer, seen_index, _ = load_engine()
+    index = IVFIndex.load() if os.path.exists(INDEX_PATH) else build_index(scorer)
+    rng = np.random.default_rng(seed)
+    users = rng.choice(len(scorer.user_hidden), size=min(n_users, len(scorer.user_hidden)), replace=False)
+
+    start_time = time.perf_counter()
+    exact = {u: set(scorer.top_n(u, n=n, seen=seen_index.seen(u))[0]) for u in users}
+    exact_ms = (time.perf_counter() - start_time) * 1000 / len(users)
+    print(f"Exhaustive scoring: {exact_ms:.3f} ms/user over {scorer.n_movies} movies ({index.n_lists} lists)")
+
+    results = []
+    for nprobe in sorted(set(min(p, index.n_lists) for p in nprobes)):
+        hits = 0
+        start_time = time.perf_counter()
+        for u in users:
+            top, _ = two_stage_top_n(scorer, index, scorer.user_hidden[u], n=n, seen=seen_index.seen(u), nprobe=nprobe)
+            hits += len(exact[u].intersection(top))
+        latency_ms = (time.perf_counter() - start_time) * 1000 / len(users)
+        recall = hits / sum(len(v) for v in exact.values())
+        results.append((nprobe, recall, latency_ms))
+        print(f"nprobe={nprobe:>3}  recall@{n}={recall:.3f}  latency={latency_ms:.3f} ms/user")
+    return results
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'build'
+    if command == 'build':
+        from batch_recommendations import load_engine
+        _, scorer, _, _ = load_engine()
+        index = build_index(scorer)
+        print(f"SUCCESS: Wrote '{INDEX_PATH}' ({index.n_lists} lists over {len(index.item_ids)} movies).")
+    elif command == 'benchmark':
+        benchmark()
+    else:
+        print("Usage: python ann_index.py [build|benchmark]")
+        sys.exit(1)
@@ -0,0 +1,146 @@
+# batch_recommendations.py
+#
+# Offline job that precomputes the top-N AI recommendations for EVERY user in
+# user_to_index.json and stores them in movies.db, so Home.py can serve them
+# with one indexed query instead of running the model on each page load.
+#
+# Usage (from the project folder):
+#   python batch_recommendations.py            # top 10 per user, all CPU cores
+#   python batch_recommendations.py 20 4       # top 20 per user, 4 worker processes
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from db import DB_PATH, connect
+from ncf_engine import load_ncf_model, load_mappings, CatalogScorer, SeenIndex, WEIGHTS_PATH, MODEL_PATH
+
+TOP_N = 10
+CHUNK_SIZE = 64
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS user_recommendations (
+    userId INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    movieId INTEGER NOT NULL,
+    score REAL NOT NULL,
+    generated_at INTEGER NOT NULL,
+    PRIMARY KEY (userId, rank)
+) WITHOUT ROWID
+"""
+
+
+# --- 1. Engine State (one copy per worker process) ---
+_engine = None
+
+
+def load_engine(db_path=DB_PATH):
+    user_to_index, movie_to_index = load_mappings()
+
+    con = connect(db_path)
+    ratings = np.array(con.execute("SELECT userId, movieId FROM ratings").fetchall(), dtype=np.int64).reshape(-1, 2)
+    valid_movie_ids = np.array([row[0] for row in con.execute("SELECT movieId FROM movies")], dtype=np.int64)
+    con.close()
+
+    model = load_ncf_model()
+    index_to_movie_id = np.zeros(model.movie_embedding.shape[0], dtype=np.int64)
+    index_to_movie_id[list(movie_to_index.values())] = list(movie_to_index.keys())
+
+    user_indices = np.array([user_to_index.get(u, -1) for u in ratings[:, 0]], dtype=np.int64)
+    movie_indices = np.array([movie_to_index.get(m, -1) for m in ratings[:, 1]], dtype=np.int64)
+    known = (user_indices >= 0) & (movie_indices >= 0)
+
+    scorer = CatalogScorer(model, available_mask=np.isin(index_to_movie_id, valid_movie_ids))
+    seen_index = SeenIndex.from_ratings(user_indices[known], movie_indices[known], len(model.user_embedding))
+    return user_to_index, scorer, seen_index, index_to_movie_id
+
+
+def _init_worker(db_path):
+    global _engine
+    _engine = load_engine(db_path)
+
+
+def _score_chunk(args):
+    user_ids, top_n, generated_at = args
+    user_to_index, scorer, seen_index, index_to_movie_id = _engine
+    rows = []
+    for user_id in user_ids:
+        user_index = user_to_index[user_id]
+        top, scores = scorer.top_n(user_index, n=top_n, seen=seen_index.seen(user_index))
+        for rank, (movie_index, score) in enumerate(zip(top, scores), start=1):
+            rows.append((user_id, rank, int(index_to_movie_id[movie_index]), float(score), generated_at))
+    return rows
+
+
+# --- 2. Batch Job ---
+def materialize_all(db_path=DB_PATH, top_n=TOP_N, workers=None, chunk_size=CHUNK_SIZE):
+    with open('user_to_index.json', 'r') as f:
+        user_ids = sorted(int(k) for k in json.load(f))
+    chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+    generated_at = int(time.time())
+
+    start_time = time.time()
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(db_path,)) as pool:
+        for chunk_rows in pool.map(_score_chunk, [(chunk, top_n, generated_at) for chunk in chunks]):
+            rows.extend(chunk_rows)
+    scoring_time = time.time() - start_time
+
+    con = connect(db_path)
+    with con:
+        con.execute(CREATE_TABLE_SQL)
+        con.execute("DELETE FROM user_recommendations")
+        con.executemany("INSERT INTO user_recommendations (userId, rank, movieId, score, generated_at) VALUES (?, ?, ?, ?, ?)", rows)
+    con.close()
+    total_time = time.time() - start_time
+
+    return len(user_ids), len(rows), scoring_time, total_time
+
+
+# --- 3. Read Path (used by Home.py) ---
+def model_built_at():
+    path = WEIGHTS_PATH if os.path.exists(WEIGHTS_PATH) else MODEL_PATH
+    return int(os.path.getmtime(path)) if os.path.exists(path) else 0
+
+
+def read_user_recommendations(user_id, db_path=DB_PATH, n=TOP_N):
+    """Precomputed (movieId, score) rows for a user, or None if missing, stale or short.
+
+    Rows are stale when the user rated something after they were generated,
+    or when the model was rebuilt after they were generated. Rows for movies
+    deleted since are skipped; fewer than `n` left (or a batch run with a
+    smaller top-N than asked for) means live scoring instead.
+    """
+    con = connect(db_path)
+    try:
+        rows = con.execute(
+            "SELECT r.movieId, r.score, r.generated_at FROM user_recommendations r"
+            " JOIN movies m ON m.movieId = r.movieId WHERE r.userId = ? ORDER BY r.rank",
+            (user_id,),
+        ).fetchall()
+        if len(rows) < n:
+            return None
+        generated_at = rows[0][2]
+        last_rated = con.execute("SELECT MAX(timestamp) FROM ratings WHERE userId = ?", (user_id,)).fetchone()[0]
+    except sqlite3.OperationalError:
+        # The batch job has never been run on this database
+        return None
+    finally:
+        con.close()
+
+    if (last_rated is not None and last_rated > generated_at) or model_built_at() > generated_at:
+        return None
+    return [(movie_id, score) for movie_id, score, _ in rows]
+
+
+if __name__ == '__main__':
+    top_n = int(sys.argv[1]) if len(sys.argv) > 1 else TOP_N
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    print(f"Materializing top-{top_n} recommendations for every user...")
+    n_users, n_rows, scoring_time, total_time = materialize_all(top_n=top_n, workers=workers)
+    print(f"SUCCESS: Wrote {n_rows} rows for {n_users} users into 'user_recommendations'.")
+    print(f"Scoring: {scoring_time:.2f}s ({n_users / max(scoring_time, 1e-9):.0f} users/sec). Total incl. DB write: {total_time:.2f}s.")
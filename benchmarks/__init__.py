@@ -0,0 +1,5 @@
+# benchmarks/
+#
+# Headless timings of the app's hot paths (no Streamlit UI):
+#   python -m benchmarks.run                    # 1x, 10x and 100x datasets -> benchmarks/results/*.json
+#   python -m benchmarks.compare old.json new.json
@@ -0,0 +1,48 @@
+# benchmarks/compare.py
+#
+# Side-by-side medians of two benchmark runs (same machine, different commits).
+#
+# Usage (from the project folder):
+#   python -m benchmarks.compare before.json after.json [--threshold 1.2]
+# Exits with status 1 if any benchmark got slower than `threshold` times.
+
+import sys
+import json
+import argparse
+
+THRESHOLD = 1.2
+
+
+def compare(before, after, threshold=THRESHOLD):
+    regressions = []
+    for scale in sorted(set(before['scales']) & set(after['scales']), key=int):
+        print(f"--- Scale {scale}x ---")
+        old_results, new_results = before['scales'][scale]['results'], after['scales'][scale]['results']
+        for name in old_results:
+            if name not in new_results:
+                continue
+            old_ms, new_ms = old_results[name]['median_ms'], new_results[name]['median_ms']
+            ratio = new_ms / old_ms if old_ms > 0 else float('inf')
+            flag = "  <-- slower" if ratio > threshold else ""
+            print(f"  {name:<20} {old_ms:>10.3f} ms -> {new_ms:>10.3f} ms   x{ratio:.2f}{flag}")
+            if ratio > threshold:
+                regressions.append((scale, name, ratio))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare two benchmarks/run.py reports.")
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    print(f"{before['environment']['git_commit']} -> {after['environment']['git_commit']}")
+    regressions = compare(before, after, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than x{args.threshold}.")
+        sys.exit(1)
@@ -0,0 +1,171 @@
+# benchmarks/load_test.py
+#
+# Requests/sec through rec_server.py as the number of app workers grows.
+# Starts the server on a scaled dataset (benchmarks/scale.py), then for each
+# worker count runs that many client processes (one per Streamlit worker),
+# each with SESSIONS_PER_WORKER threads issuing the Home/pages request mix
+# (WORKLOAD) through rec_client.RecClient for DURATION seconds.
+# Reports total requests/sec, latency percentiles and errors per worker
+# count, plus the server's cache and scheduler counters.
+#
+# Usage (from the project folder):
+#   python -m benchmarks.load_test                          # scale 1, workers 1,2,4
+#   python -m benchmarks.load_test --scale 100 --workers 1,2,4 --duration 20 --out load.json
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import multiprocessing
+import numpy as np
+
+from benchmarks.scale import build_scaled_dataset
+from benchmarks.run import RESULTS_DIR, summarize, environment
+
+WORKERS = [1, 2, 4]
+SESSIONS_PER_WORKER = 4
+DURATION = 10.0
+SERVER_START_TIMEOUT = 120
+# Share of requests per endpoint: mostly Home page loads
+WORKLOAD = {'recommendations': 0.70, 'similar': 0.15, 'genre': 0.13, 'rate': 0.02}
+PAGE_SIZE = 15
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(dataset_dir, port):
+    server_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'rec_server.py')
+    # The server reads its files relative to the working directory, like the app
+    process = subprocess.Popen([sys.executable, server_path, '--port', str(port)], cwd=dataset_dir,
+                               stdout=subprocess.DEVNULL)
+    from rec_client import RecClient, RecServiceError
+    client = RecClient(f"http://127.0.0.1:{port}", timeout=2)
+    deadline = time.time() + SERVER_START_TIMEOUT
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"rec_server.py exited with code {process.returncode}")
+        try:
+            client.health()
+            return process
+        except RecServiceError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("rec_server.py did not start in time")
+
+
+def run_session(client, inputs, seed, deadline, latencies, errors):
+    """One simulated session: requests back to back until the deadline."""
+    rng = np.random.default_rng(seed)
+    endpoints, weights = list(WORKLOAD), list(WORKLOAD.values())
+    while time.perf_counter() < deadline:
+        endpoint = endpoints[rng.choice(len(endpoints), p=weights)]
+        start_time = time.perf_counter()
+        try:
+            if endpoint == 'recommendations':
+                client.recommendations(int(rng.choice(inputs['user_ids'])), n=10)
+            elif endpoint == 'similar':
+                client.similar(int(rng.choice(inputs['movie_ids'])), k=20)
+            elif endpoint == 'genre':
+                genres = inputs['genre_sets'][int(rng.integers(len(inputs['genre_sets'])))]
+                client.genre(genres, offset=PAGE_SIZE * int(rng.integers(3)), limit=PAGE_SIZE)
+            else:
+                client.rate(int(rng.choice(inputs['user_ids'])), int(rng.choice(inputs['movie_ids'])),
+                            float(rng.integers(1, 11)) / 2)
+        except Exception:
+            errors.append(endpoint)
+            continue
+        latencies.append((time.perf_counter() - start_time) * 1000)
+
+
+def run_worker(url, inputs, worker, start_at, duration):
+    """One app worker process: SESSIONS_PER_WORKER threads sharing a client; (latencies_ms, errors)."""
+    from rec_client import RecClient
+    client = RecClient(url)
+    latencies, errors = [], []
+    time.sleep(max(start_at - time.time(), 0))
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=run_session,
+                                args=(client, inputs, [worker, session], deadline, latencies, errors))
+               for session in range(SESSIONS_PER_WORKER)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def sample_inputs(seed=42, n=200):
+    from catalog import load_catalog
+    catalog = load_catalog()
+    rng = np.random.default_rng(seed)
+    return {
+        'user_ids': rng.choice(catalog.ratings['userId'].unique(), size=n).tolist(),
+        'movie_ids': rng.choice(catalog.movies['movieId'].to_numpy(), size=n).tolist(),
+        'genre_sets': [list(rng.choice(catalog.genres, size=int(rng.integers(1, 3)), replace=False)) for _ in range(n)],
+    }
+
+
+def load_test(scale=1, workers=WORKERS, duration=DURATION):
+    dataset_dir = os.path.abspath(build_scaled_dataset(scale))
+    project_dir = os.getcwd()
+    os.chdir(dataset_dir)
+    try:
+        inputs = sample_inputs()
+    finally:
+        os.chdir(project_dir)
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    server = start_server(dataset_dir, port)
+    report = {'environment': environment(), 'scale': scale, 'sessions_per_worker': SESSIONS_PER_WORKER,
+              'duration_s': duration, 'workload': WORKLOAD, 'runs': {}}
+    try:
+        from rec_client import RecClient
+        # Warm-up: first requests pay for lazy loads, not for serving
+        run_worker(url, inputs, worker=max(workers), start_at=time.time(), duration=min(duration, 2.0))
+        ctx = multiprocessing.get_context('spawn')
+        for n_workers in workers:
+            start_at = time.time() + 1.0  # every worker starts together
+            with ctx.Pool(n_workers) as pool:
+                outputs = pool.starmap(run_worker, [(url, inputs, w, start_at, duration) for w in range(n_workers)])
+            latencies = [ms for worker_latencies, _ in outputs for ms in worker_latencies]
+            errors = [e for _, worker_errors in outputs for e in worker_errors]
+            stats = summarize(latencies) if latencies else {'n': 0}
+            stats['requests_per_sec'] = round(len(latencies) / duration, 1)
+            stats['errors'] = len(errors)
+            report['runs'][str(n_workers)] = stats
+            print(f"  {n_workers} worker(s) x {SESSIONS_PER_WORKER} sessions: {stats['requests_per_sec']:>8.1f} requests/s   "
+                  f"median {stats.get('median_ms', 0):>8.3f} ms   p95 {stats.get('p95_ms', 0):>8.3f} ms   errors {len(errors)}")
+        report['server'] = RecClient(url).metrics()
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test of rec_server.py with several app workers.")
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--workers', default=','.join(str(w) for w in WORKERS))
+    parser.add_argument('--duration', type=float, default=DURATION, help="seconds per worker count")
+    parser.add_argument('--out', default=None, help="JSON path (default: benchmarks/results/load-<commit>-<time>.json)")
+    args = parser.parse_args()
+
+    print(f"--- rec_server.py at scale {args.scale}x ---")
+    report = load_test(args.scale, [int(w) for w in args.workers.split(',')], args.duration)
+    out_path = args.out
+    if out_path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        name = f"load-{report['environment']['git_commit'] or 'nogit'}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+        out_path = os.path.join(RESULTS_DIR, name)
+    with open(out_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"SUCCESS: Wrote '{out_path}'.")
@@ -0,0 +1,177 @@
+# benchmarks/poster_fetch.py
+#
+# poster_cache.py against a local stand-in for the poster CDN: an HTTP server
+# that serves generated JPEGs by poster path after ORIGIN_LATENCY_MS, and
+# counts how often it is hit. Reports:
+#  - cold fetch time of N_POSTERS posters, one download at a time vs the
+#    asyncio fetcher's bounded concurrency;
+#  - a page of thumbnails through the poster server: cold (fetch + resize),
+#    warm (from disk), and after POST /prefetch, as the Browse pages do for
+#    the next page;
+#  - that duplicate images are stored once and that the store stays under
+#    its size limit (LRU eviction).
+# Nothing leaves the machine: both servers listen on 127.0.0.1.
+#
+# Usage (from the project folder):
+#   python -m benchmarks.poster_fetch
+#   python -m benchmarks.poster_fetch --posters 120 --latency-ms 80 --out posters.json
+
+import io
+import json
+import time
+import argparse
+import tempfile
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+
+from poster_cache import PosterStore, PosterFetcher, make_server, request_prefetch
+from benchmarks.run import summarize
+
+N_POSTERS = 60
+PAGE_SIZE = 20
+ORIGIN_LATENCY_MS = 50
+CONCURRENCY = 8
+N_DUPLICATES = 5  # paths at the end that repeat earlier images
+
+
+def poster_image(i):
+    """A distinct 500x750 JPEG per i (a plain byte blob if Pillow is missing)."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return b'\xff\xd8' + np.random.default_rng(i).bytes(60_000)
+    rng = np.random.default_rng(i)
+    pixels = (rng.random((75, 50, 3)) * 255).astype(np.uint8)
+    out = io.BytesIO()
+    Image.fromarray(pixels).resize((500, 750)).save(out, 'JPEG', quality=90)
+    return out.getvalue()
+
+
+def start_origin(n_posters, latency_ms):
+    """Stand-in CDN on a free port: /p<i>.jpg, with the last N_DUPLICATES repeating earlier images."""
+    images = {f"/p{i}.jpg": poster_image(i if i < n_posters - N_DUPLICATES else i - (n_posters - N_DUPLICATES))
+              for i in range(n_posters)}
+    hits = {'count': 0}
+    lock = threading.Lock()
+
+    class OriginHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with lock:
+                hits['count'] += 1
+            time.sleep(latency_ms / 1000)
+            data = images.get(self.path)
+            self.send_response(200 if data else 404)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(len(data or b'')))
+            self.end_headers()
+            self.wfile.write(data or b'')
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), OriginHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, sorted(images, key=lambda p: int(p[2:-4])), hits, sum(len(d) for d in images.values())
+
+
+def cold_fetch_ms(origin_url, paths, concurrency):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        store = PosterStore(cache_dir)
+        fetcher = PosterFetcher(store, origin=origin_url, concurrency=concurrency)
+        start_time = time.perf_counter()
+        digests = fetcher.fetch(paths)
+        elapsed = (time.perf_counter() - start_time) * 1000
+        stats = store.stats()
+        fetcher.close()
+        store.close()
+    assert all(digests), "some posters failed to download"
+    return elapsed, stats
+
+
+def get_page(base_url, paths):
+    """Time per thumbnail request (ms), fetching the page one image after another."""
+    samples = []
+    for path in paths:
+        start_time = time.perf_counter()
+        with urllib.request.urlopen(f"{base_url}/poster{path}?w=200", timeout=30) as response:
+            response.read()
+        samples.append((time.perf_counter() - start_time) * 1000)
+    return summarize(samples)
+
+
+def server_benchmark(origin_url, paths, hits):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        server = make_server('127.0.0.1', 0, cache_dir, origin=origin_url)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        first, second = paths[:PAGE_SIZE], paths[PAGE_SIZE:2 * PAGE_SIZE]
+        report = {'cold': get_page(base_url, first), 'warm': get_page(base_url, first)}
+
+        # As a Browse page does after rendering: queue the next page, then the user clicks
+        hits_before = hits['count']
+        request_prefetch(second, base_url)
+        deadline = time.time() + 30
+        while time.time() < deadline and hits['count'] - hits_before < len(second):
+            time.sleep(0.01)
+        time.sleep(0.2)  # the last downloads are being written
+        report['after_prefetch'] = get_page(base_url, second)
+        with urllib.request.urlopen(f"{base_url}/stats") as response:
+            report['stats'] = json.load(response)
+        server.shutdown()
+        server.server_close()
+    return report
+
+
+def eviction_check(origin_url, paths, total_bytes):
+    """Limit the store to a quarter of the images and fetch them all."""
+    max_bytes = total_bytes // 4
+    with tempfile.TemporaryDirectory() as cache_dir:
+        store = PosterStore(cache_dir, max_bytes=max_bytes)
+        fetcher = PosterFetcher(store, origin=origin_url)
+        for start in range(0, len(paths), PAGE_SIZE):
+            fetcher.fetch(paths[start:start + PAGE_SIZE])
+        stats = store.stats()
+        fetcher.close()
+        store.close()
+    assert stats['bytes'] <= max_bytes, stats
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Poster cache against a local stand-in CDN.")
+    parser.add_argument('--posters', type=int, default=N_POSTERS)
+    parser.add_argument('--latency-ms', type=float, default=ORIGIN_LATENCY_MS)
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args()
+
+    origin, paths, hits, total_bytes = start_origin(args.posters, args.latency_ms)
+    origin_url = f"http://127.0.0.1:{origin.server_port}"
+    report = {'posters': args.posters, 'origin_latency_ms': args.latency_ms, 'origin_bytes': total_bytes}
+
+    serial_ms, _ = cold_fetch_ms(origin_url, paths, 1)
+    async_ms, stats = cold_fetch_ms(origin_url, paths, args.concurrency)
+    report['cold_fetch'] = {'serial_ms': round(serial_ms, 1), 'concurrent_ms': round(async_ms, 1),
+                            'concurrency': args.concurrency, 'store': stats}
+    print(f"  cold fetch of {args.posters} posters: one at a time {serial_ms:.0f} ms, "
+          f"{args.concurrency} at a time {async_ms:.0f} ms")
+    print(f"  stored {stats['posters']} paths as {stats['blobs']} blobs ({N_DUPLICATES} duplicate images)")
+
+    report['server'] = server_benchmark(origin_url, paths, hits)
+    for name in ('cold', 'warm', 'after_prefetch'):
+        page = report['server'][name]
+        print(f"  thumbnail page ({name:<14}) median {page['median_ms']:>7.2f} ms   p95 {page['p95_ms']:>7.2f} ms per image")
+
+    report['eviction'] = eviction_check(origin_url, paths, total_bytes)
+    evicted = report['eviction']
+    print(f"  size limit {evicted['max_bytes']} bytes: holding {evicted['bytes']} bytes "
+          f"({evicted['blobs']} blobs) after {evicted['evictions']} evictions")
+
+    origin.shutdown()
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(f"SUCCESS: Exercised the poster cache against a stand-in origin ({hits['count']} origin requests).")
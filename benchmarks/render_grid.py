@@ -0,0 +1,121 @@
+# benchmarks/render_grid.py
+#
+# Frontend messages and server-side render time of one page of movie cards:
+# the per-movie st.columns/st.image/st.markdown loop the pages used before
+# (LEGACY_GRID, kept here as the baseline) against poster_grid.py's single
+# HTML block. Each variant runs as a Streamlit script under
+# streamlit.testing's AppTest, which goes through the same script runner and
+# message serialization as a browser session; every element in the
+# resulting tree is one delta message sent to the browser.
+#
+# Usage (from the project folder):
+#   python -m benchmarks.render_grid                  # 20 cards, scale 1
+#   python -m benchmarks.render_grid --cards 20 --repeat 30 --out render.json
+
+import os
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+
+from benchmarks.scale import build_scaled_dataset
+from benchmarks.run import summarize
+
+N_CARDS = 20
+REPEAT = 20
+
+# The loop the Genre and Browse pages ran before poster_grid.py
+LEGACY_GRID = """
+import html
+import pandas as pd
+import streamlit as st
+page_df = pd.read_pickle({path!r})
+cols = st.columns(5)
+for i, (index, row) in enumerate(page_df.iterrows()):
+    with cols[i % 5]:
+        st.image(row['poster_url'], use_container_width=True)
+        safe_title = html.escape(row['title'])
+        genres = row.get('genres', '').replace('|', ', ')
+        rating = row.get('rating', 0)
+        ratings_count = row.get('ratings_count', 0)
+        st.markdown(f"<p class='movie-title'>{{safe_title}}</p>", unsafe_allow_html=True)
+        st.markdown(f'''
+            <div class='movie-details'>
+                ⭐ {{rating:.2f}} ({{int(ratings_count)}} ratings)<br>
+                <i>{{genres}}</i>
+            </div>
+        ''', unsafe_allow_html=True)
+"""
+
+POSTER_GRID = """
+import pandas as pd
+from poster_grid import poster_grid
+page_df = pd.read_pickle({path!r})
+poster_grid(page_df)
+"""
+
+
+def count_elements(node):
+    """Delta messages behind an AppTest tree: one per element and one per container block."""
+    children = getattr(node, 'children', None)
+    if not children:
+        return 1
+    return 1 + sum(count_elements(child) for child in children.values())
+
+
+def measure(script, repeat=REPEAT):
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_string(script, default_timeout=60)
+    samples = []
+    for _ in range(repeat + 1):
+        # A rerun of the same session, as on every widget interaction
+        start_time = time.perf_counter()
+        app.run()
+        samples.append((time.perf_counter() - start_time) * 1000)
+        if app.exception:
+            raise RuntimeError(app.exception[0].value)
+    # Messages below the page's root block (the root itself is not sent)
+    stats = summarize(samples[1:])  # the first run pays for imports
+    stats['messages'] = count_elements(app.main) - 1
+    stats['html_bytes'] = sum(len(md.value) for md in app.markdown)
+    return stats
+
+
+def render_benchmark(scale=1, n_cards=N_CARDS, repeat=REPEAT, seed=42):
+    dataset_dir = os.path.abspath(build_scaled_dataset(scale))
+    project_dir = os.getcwd()
+    os.chdir(dataset_dir)
+    try:
+        from catalog import load_catalog
+        movies_df = load_catalog().movies
+    finally:
+        os.chdir(project_dir)
+    rows = np.random.default_rng(seed).choice(len(movies_df), size=n_cards, replace=False)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'page.pkl')
+        movies_df.iloc[rows].to_pickle(path)
+        return {
+            'n_cards': n_cards,
+            'legacy_grid': measure(LEGACY_GRID.format(path=path), repeat),
+            'poster_grid': measure(POSTER_GRID.format(path=path), repeat),
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Messages and render time of a page of movie cards, before/after poster_grid.py.")
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--cards', type=int, default=N_CARDS)
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args()
+
+    report = render_benchmark(args.scale, args.cards, args.repeat)
+    for name in ('legacy_grid', 'poster_grid'):
+        stats = report[name]
+        print(f"  {name:<12} {stats['messages']:>4} messages   median {stats['median_ms']:>8.2f} ms   "
+              f"p95 {stats['p95_ms']:>8.2f} ms   {stats['html_bytes']} bytes of HTML")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(f"SUCCESS: Rendered {args.cards} cards both ways.")
@@ -0,0 +1,302 @@
+# benchmarks/run.py
+#
+# Times every recommendation and data-loading hot path at several dataset
+# scales and writes the numbers to JSON, so runs on the same machine can be
+# compared across commits (benchmarks/compare.py).
+#
+# Usage (from the project folder):
+#   python -m benchmarks.run                          # scales 1, 10, 100
+#   python -m benchmarks.run --scales 1,10 --out before.json
+
+import os
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from benchmarks.scale import build_scaled_dataset
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+SCALES = [1, 10, 100]
+N_USERS = 200        # users sampled for the per-user benchmarks
+N_MOVIES = 200       # movies sampled for the similar-movie lookup
+N_QUERIES = 200      # title search queries
+N_INSERTS = 300      # ratings inserted one transaction at a time
+N_RATING_THREADS = 8 # concurrent sessions for the rating queue
+N_SCORING_THREADS = 8  # concurrent sessions for live scoring
+COLD_START_REPEAT = 3
+
+
+def summarize(samples_ms):
+    samples_ms = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        'n': int(len(samples_ms)),
+        'mean_ms': round(float(samples_ms.mean()), 4),
+        'median_ms': round(float(np.median(samples_ms)), 4),
+        'p95_ms': round(float(np.percentile(samples_ms, 95)), 4),
+        'min_ms': round(float(samples_ms.min()), 4),
+    }
+
+
+def time_calls(function, inputs):
+    """Per-call wall time (ms) of function(x) for every x in inputs."""
+    samples = []
+    for x in inputs:
+        start_time = time.perf_counter()
+        function(x)
+        samples.append((time.perf_counter() - start_time) * 1000)
+    return summarize(samples)
+
+
+# --- Benchmarks (each runs inside the dataset folder) ---
+def bench_cold_start(use_snapshot=True):
+    """load_catalog() + load_resources(): what the first Home page load pays (from the snapshot or from SQL).
+
+    The scoring arrays are rebuilt on every repeat (share=False); mapping
+    already-published ones is bench_warm_attach().
+    """
+    from catalog import load_catalog
+    from recommender import load_resources
+
+    def load(_):
+        load_resources(load_catalog(use_snapshot=use_snapshot), share=False)
+
+    return time_calls(load, range(COLD_START_REPEAT))
+
+
+def bench_warm_attach():
+    """load_catalog() + load_resources() in a worker that finds the arrays already in shared/."""
+    from catalog import load_catalog
+    from recommender import load_resources
+
+    load_resources(load_catalog())  # publishes them if no worker has yet
+    return time_calls(lambda _: load_resources(load_catalog()), range(COLD_START_REPEAT))
+
+
+def bench_home_scoring(resources, user_ids):
+    from recommender import recommend_for_user
+    return time_calls(lambda user_id: recommend_for_user(resources, user_id, n=10), user_ids)
+
+
+def bench_home_scoring_cached(resources, user_ids):
+    """Home reruns with nothing changed: every user is already in the result cache."""
+    from recommender import recommend_cached, RecommendationCache
+    cache = RecommendationCache()
+    for user_id in user_ids:
+        recommend_cached(resources, cache, user_id, n=10)
+    return time_calls(lambda user_id: recommend_cached(resources, cache, user_id, n=10), user_ids)
+
+
+def bench_concurrent_scoring(resources, user_ids, use_scheduler):
+    """N_SCORING_THREADS sessions scoring live at once, directly or through inference_scheduler.py."""
+    from recommender import recommend_for_user
+    from inference_scheduler import InferenceScheduler
+
+    scheduler = InferenceScheduler() if use_scheduler else None
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=N_SCORING_THREADS) as pool:
+        samples = list(pool.map(
+            lambda user_id: time_calls(lambda u: recommend_for_user(resources, u, n=10, scheduler=scheduler), [user_id])['mean_ms'],
+            user_ids))
+    elapsed = time.perf_counter() - start_time
+    stats = summarize(samples)
+    stats['requests_per_sec'] = round(len(user_ids) / elapsed, 1)
+    if scheduler is not None:
+        stats['mean_batch_size'] = scheduler.metrics()['mean_batch_size']
+        scheduler.close()
+    return stats
+
+
+def bench_similar_lookup(movie_ids):
+    from similarity_index import similar_movie_ids
+    return time_calls(lambda movie_id: similar_movie_ids(movie_id, k=20), movie_ids)
+
+
+def bench_genre_filter(catalog, genre_sets):
+    from genre_index import has_all, mask_for
+    movies_df = catalog.movies
+    return time_calls(
+        lambda genres: movies_df[has_all(movies_df['genre_mask'].values, mask_for(genres, catalog.genres))],
+        genre_sets,
+    )
+
+
+def bench_title_search(catalog, queries):
+    return time_calls(lambda query: catalog.title_index.search(query, k=50), queries)
+
+
+def bench_analytics(catalog, user_ids):
+    """The per-user aggregation of pages/3_Analytics.py."""
+    movies_df = catalog.movies[['movieId', 'title', 'genres', 'poster_url']]
+    ratings_df = catalog.ratings
+
+    def analytics(user_id):
+        user_ratings_df = ratings_df[ratings_df['userId'] == user_id]
+        user_full_data = pd.merge(user_ratings_df, movies_df, on='movieId', how='left')
+        all_genres = user_full_data['genres'].str.split('|').explode()
+        return len(user_ratings_df), user_ratings_df['rating'].mean(), all_genres.mode(), all_genres.value_counts()
+
+    return time_calls(analytics, user_ids)
+
+
+def bench_rating_inserts(movie_ids, rng):
+    """Ratings/sec through the Similar page's path (own connection + commit per rating), on a copy of the db."""
+    from db import DB_PATH, connect
+
+    con = connect(DB_PATH)
+    con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    con.close()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_copy = os.path.join(tmp_dir, 'movies.db')
+        shutil.copy(DB_PATH, db_copy)
+
+        def insert(i):
+            con = connect(db_copy)
+            con.execute("INSERT INTO ratings (userId, movieId, rating, timestamp) VALUES (?, ?, ?, ?)",
+                        (10_000_000 + i, int(movie_ids[i % len(movie_ids)]), float(rng.integers(1, 11) / 2),
+                         int(time.time())))
+            con.commit()
+            con.close()
+
+        start_time = time.perf_counter()
+        stats = time_calls(insert, range(N_INSERTS))
+        stats['ratings_per_sec'] = round(N_INSERTS / (time.perf_counter() - start_time), 1)
+    return stats
+
+
+def bench_rating_queue(movie_ids, rng):
+    """Ratings/sec through rating_queue.py with N_RATING_THREADS sessions submitting at once, on a copy of the db."""
+    from db import DB_PATH, connect
+    from rating_queue import RatingQueue
+
+    con = connect(DB_PATH)
+    con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    con.close()
+    ratings = [(10_000_000 + i % 50, int(movie_ids[i % len(movie_ids)]), float(rng.integers(1, 11) / 2))
+               for i in range(N_INSERTS)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_copy = os.path.join(tmp_dir, 'movies.db')
+        shutil.copy(DB_PATH, db_copy)
+        rating_queue = RatingQueue(db_copy)
+
+        def submit_and_wait(rating):
+            rating_queue.submit(*rating).result()
+
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=N_RATING_THREADS) as pool:
+            samples = list(pool.map(lambda rating: time_calls(submit_and_wait, [rating])['mean_ms'], ratings))
+        elapsed = time.perf_counter() - start_time
+        rating_queue.close()
+        stats = summarize(samples)
+        stats['ratings_per_sec'] = round(N_INSERTS / elapsed, 1)
+        stats['batches'] = rating_queue.stats['batches']
+    return stats
+
+
+def random_queries(titles, rng, n):
+    """Half whole words from real titles, half prefixes with one dropped letter (typos)."""
+    queries = []
+    for title in rng.choice(titles, size=n):
+        words = [w for w in str(title).split() if w.isalpha() and len(w) > 3] or [str(title)[:5]]
+        word = str(rng.choice(words))
+        if len(queries) % 2:
+            cut = int(rng.integers(1, len(word)))
+            word = word[:cut] + word[cut + 1:]
+        queries.append(word)
+    return queries
+
+
+def run_scale(factor, seed=42):
+    from catalog import load_catalog
+    from recommender import load_resources
+
+    rng = np.random.default_rng(seed)
+    results = {}
+    results['cold_start_sql'] = bench_cold_start(use_snapshot=False)
+    results['cold_start'] = bench_cold_start()
+    results['warm_attach'] = bench_warm_attach()
+
+    catalog = load_catalog()
+    resources = load_resources(catalog)
+    user_ids = rng.choice(catalog.ratings['userId'].unique(), size=N_USERS)
+    movie_ids = rng.choice(catalog.movies['movieId'].to_numpy(), size=N_MOVIES)
+    genre_sets = [list(rng.choice(catalog.genres, size=int(rng.integers(1, 3)), replace=False)) for _ in range(N_QUERIES)]
+
+    results['home_scoring'] = bench_home_scoring(resources, user_ids)
+    results['home_scoring_cached'] = bench_home_scoring_cached(resources, user_ids)
+    results['concurrent_direct'] = bench_concurrent_scoring(resources, user_ids, use_scheduler=False)
+    results['concurrent_batched'] = bench_concurrent_scoring(resources, user_ids, use_scheduler=True)
+    results['similar_lookup'] = bench_similar_lookup(movie_ids)
+    results['genre_filter'] = bench_genre_filter(catalog, genre_sets)
+    results['title_search'] = bench_title_search(catalog, random_queries(catalog.movies['title'].to_numpy(), rng, N_QUERIES))
+    results['analytics'] = bench_analytics(catalog, user_ids)
+    results['rating_inserts'] = bench_rating_inserts(movie_ids, rng)
+    results['rating_queue'] = bench_rating_queue(movie_ids, rng)
+    return {
+        'n_movies': int(len(catalog.movies)),
+        'n_users': int(catalog.ratings['userId'].nunique()),
+        'n_ratings': int(len(catalog.ratings)),
+        'results': results,
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'git_commit': commit or None,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def run(scales=SCALES, rebuild=False):
+    report = {'environment': environment(), 'scales': {}}
+    project_dir = os.getcwd()
+    for factor in scales:
+        print(f"--- Scale {factor}x ---")
+        dataset_dir = os.path.abspath(build_scaled_dataset(factor, rebuild=rebuild))
+        # Every module reads its files relative to the working directory
+        os.chdir(dataset_dir)
+        try:
+            scale_report = run_scale(factor)
+        finally:
+            os.chdir(project_dir)
+        report['scales'][str(factor)] = scale_report
+        print(f"{scale_report['n_ratings']} ratings, {scale_report['n_users']} users, {scale_report['n_movies']} movies")
+        for name, stats in scale_report['results'].items():
+            extra = f"  ({stats['ratings_per_sec']:.0f} ratings/s)" if 'ratings_per_sec' in stats else ''
+            extra += f"  ({stats['requests_per_sec']:.0f} requests/s)" if 'requests_per_sec' in stats else ''
+            print(f"  {name:<20} median {stats['median_ms']:>10.3f} ms   p95 {stats['p95_ms']:>10.3f} ms{extra}")
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless benchmarks of the app's hot paths.")
+    parser.add_argument('--scales', default=','.join(str(s) for s in SCALES))
+    parser.add_argument('--out', default=None, help="JSON path (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument('--rebuild', action='store_true', help="regenerate the scaled datasets")
+    args = parser.parse_args()
+
+    report = run([int(s) for s in args.scales.split(',')], rebuild=args.rebuild)
+    out_path = args.out
+    if out_path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        name = f"{report['environment']['git_commit'] or 'nogit'}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+        out_path = os.path.join(RESULTS_DIR, name)
+    with open(out_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"SUCCESS: Wrote '{out_path}'.")
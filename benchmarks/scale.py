@@ -0,0 +1,76 @@
+# benchmarks/scale.py
+#
+# Self-contained benchmark datasets: a folder per scale factor with its own
+# movies.db (built by create_database.build_database), similar_movies index,
+# id mappings and NCF weights.
+#
+# Scale 1 is the bundled clean CSVs. A scale-f dataset is synthetic
+# (synth_data.py) with f times their ratings and users and ceil(sqrt(f)) times
+# their movies (MovieLens grows users and ratings much faster than its
+# catalog), with power-law activity and popularity instead of copies of the
+# same users. The NCF weights are random: every timed path costs the same
+# with trained ones.
+
+import os
+import json
+import math
+import numpy as np
+import pandas as pd
+
+from db import connect
+from create_database import build_database
+from synth_data import build_synthetic_database
+from similarity_index import build_similarity_index
+from ncf_engine import WEIGHTS_PATH, USER_INDEX_PATH, MOVIE_INDEX_PATH
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+BASE_MOVIES_CSV = 'movies_clean_final.csv'
+BASE_RATINGS_CSV = 'ratings_clean_final.csv'
+EMBEDDING_SIZE = 50
+
+
+def write_random_model(ratings, out_dir, seed=42):
+    """Mappings in first-appearance order (like train_model.py) and random NCF weights."""
+    rng = np.random.default_rng(seed)
+    user_ids, movie_ids = pd.unique(ratings['userId']), pd.unique(ratings['movieId'])
+    with open(os.path.join(out_dir, USER_INDEX_PATH), 'w') as f:
+        json.dump({str(u): i for i, u in enumerate(user_ids)}, f)
+    with open(os.path.join(out_dir, MOVIE_INDEX_PATH), 'w') as f:
+        json.dump({str(m): i for i, m in enumerate(movie_ids)}, f)
+
+    def dense(n_in, n_out):
+        return (rng.normal(0, np.sqrt(2 / n_in), size=(n_in, n_out)).astype(np.float32),
+                np.zeros(n_out, dtype=np.float32))
+
+    (w1, b1), (w2, b2), (w3, b3) = dense(2 * EMBEDDING_SIZE, 128), dense(128, 64), dense(64, 1)
+    b3 += 3.5
+    np.savez(os.path.join(out_dir, WEIGHTS_PATH),
+             user_embedding=rng.normal(0, 0.05, size=(len(user_ids), EMBEDDING_SIZE)).astype(np.float32),
+             movie_embedding=rng.normal(0, 0.05, size=(len(movie_ids), EMBEDDING_SIZE)).astype(np.float32),
+             w1=w1, b1=b1, w2=w2, b2=b2, w3=w3, b3=b3)
+
+
+def build_scaled_dataset(factor, base_dir='.', data_dir=DATA_DIR, rebuild=False):
+    """Folder with a scale-`factor` copy of the bundled data; built once, then reused."""
+    out_dir = os.path.join(data_dir, f'scale_{factor}')
+    db_path = os.path.join(out_dir, 'movies.db')
+    if os.path.exists(db_path) and os.path.exists(os.path.join(out_dir, WEIGHTS_PATH)) and not rebuild:
+        return out_dir
+    os.makedirs(out_dir, exist_ok=True)
+
+    movies_csv, ratings_csv = os.path.join(base_dir, BASE_MOVIES_CSV), os.path.join(base_dir, BASE_RATINGS_CSV)
+    if factor == 1:
+        build_database(db_path, movies_csv, ratings_csv)
+    else:
+        n_movies = len(pd.read_csv(movies_csv, usecols=['movieId']))
+        base_ratings = pd.read_csv(ratings_csv, usecols=['userId'])
+        build_synthetic_database(factor * len(base_ratings), n_users=factor * base_ratings['userId'].nunique(),
+                                 n_movies=math.ceil(math.sqrt(factor)) * n_movies, db_path=db_path,
+                                 base_dir=base_dir, verbose=False)
+    build_similarity_index(db_path)
+
+    con = connect(db_path)
+    ratings = pd.read_sql_query("SELECT userId, movieId FROM ratings ORDER BY ratingId", con)
+    con.close()
+    write_random_model(ratings, out_dir)
+    return out_dir
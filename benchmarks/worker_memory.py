@@ -0,0 +1,89 @@
+# benchmarks/worker_memory.py
+#
+# Memory per app worker process, with the scoring resources private to each
+# worker or shared through shared_arrays.py. Starts N_WORKERS processes on a
+# scaled dataset (benchmarks/scale.py); each loads the catalog and
+# load_resources(), scores a few users so the arrays are actually touched,
+# then reports (while all of them are still alive):
+#  - anon_mb: private heap memory the load added (RssAnon);
+#  - pss_mb:  its proportional share of everything resident, shared pages
+#    divided by the number of processes mapping them (Linux /proc only).
+#
+# Usage (from the project folder):
+#   python -m benchmarks.worker_memory --scale 100
+
+import os
+import json
+import shutil
+import argparse
+import multiprocessing
+import numpy as np
+
+from benchmarks.scale import build_scaled_dataset
+
+N_WORKERS = 3
+N_USERS = 20
+
+
+def memory_mb():
+    """(RssAnon, Pss) of this process in MB, from /proc."""
+    with open('/proc/self/status') as f:
+        status = dict(line.split(':', 1) for line in f)
+    with open('/proc/self/smaps_rollup') as f:
+        rollup = dict(line.split(':', 1) for line in f if ':' in line and not line.startswith('0'))
+    anon_kb = int(status['RssAnon'].split()[0])
+    pss_kb = int(rollup['Pss'].split()[0])
+    return anon_kb / 1024, pss_kb / 1024
+
+
+def run_worker(dataset_dir, share, loaded, done, results, worker):
+    os.chdir(dataset_dir)
+    from catalog import load_catalog
+    from recommender import load_resources, recommend_for_user
+
+    anon_before, _ = memory_mb()
+    catalog = load_catalog()
+    resources = load_resources(catalog, share=share)
+    for user_id in catalog.ratings['userId'].unique()[:N_USERS]:
+        recommend_for_user(resources, user_id, n=10)
+    # Measure once every worker has loaded, so shared pages are split between them
+    loaded.wait()
+    anon_after, pss = memory_mb()
+    results.put((worker, round(anon_after - anon_before, 1), round(pss, 1)))
+    done.wait()
+
+
+def measure(dataset_dir, share, n_workers=N_WORKERS):
+    from shared_arrays import shared_dir_for
+    shutil.rmtree(shared_dir_for(os.path.join(dataset_dir, 'movies.db')), ignore_errors=True)
+    ctx = multiprocessing.get_context('spawn')
+    loaded, done, results = ctx.Barrier(n_workers + 1), ctx.Barrier(n_workers + 1), ctx.Queue()
+    workers = [ctx.Process(target=run_worker, args=(dataset_dir, share, loaded, done, results, w)) for w in range(n_workers)]
+    for process in workers:
+        process.start()
+    loaded.wait()
+    rows = sorted(results.get() for _ in workers)
+    done.wait()
+    for process in workers:
+        process.join()
+    return [{'worker': w, 'anon_mb': anon, 'pss_mb': pss} for w, anon, pss in rows]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Memory per worker process, private vs shared scoring arrays.")
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=N_WORKERS)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args()
+
+    dataset_dir = os.path.abspath(build_scaled_dataset(args.scale))
+    report = {'scale': args.scale}
+    for mode, share in (('private', False), ('shared', True)):
+        report[mode] = measure(dataset_dir, share, args.workers)
+        anon = [row['anon_mb'] for row in report[mode]]
+        pss = [row['pss_mb'] for row in report[mode]]
+        print(f"  {mode:<8} anon MB per worker {anon}   PSS MB per worker {pss}   (mean PSS {np.mean(pss):.1f})")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    print("SUCCESS: Measured worker memory.")
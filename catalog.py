@@ -0,0 +1,151 @@
+# catalog.py
+#
+# The ONE place the app loads movies and ratings from movies.db.
+# Every page calls get_catalog(), which returns the same process-wide object
+# (st.cache_resource shares it between pages and sessions without copying).
+# Treat the frames as READ-ONLY; copy before adding columns.
+# get_catalog() follows db.data_version() (counters moved by any process):
+#  - a new database or changed movies reload the frames: they map the
+#    columnar snapshot (snapshot.py) while it matches, otherwise they query
+#    SQLite and publish a fresh snapshot;
+#  - new ratings only refresh each movie's average and count, read from the
+#    trigger-maintained movie_stats table (one row per movie, no scan of the
+#    ratings). `ratings` itself stays as of the last reload; read a user's
+#    current ratings with user_ratings().
+# refresh_catalog() forces a full reload.
+
+import os
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from db import DB_PATH, connect, data_version, structure_version
+from genre_index import genre_vocabulary, genre_masks
+from title_search import TitleIndex
+from snapshot import SNAPSHOT_DIR, source_version, compact_frames, load_snapshot, write_snapshot
+
+
+class Catalog:
+    def __init__(self, movies, ratings, popularity, genres, title_index=None, source_version=None):
+        self.movies = movies            # one row per movie, with 'rating', 'ratings_count' and 'genre_mask'
+        self.ratings = ratings          # ratings for movies that exist in the catalog, as of the last reload
+        self.popularity = popularity    # real (current) number of ratings per movieId
+        self.genres = genres            # genre vocabulary; bit i of 'genre_mask' is genres[i]
+        # Title search index; positions into `movies` (snapshot.py saves a built one)
+        self.title_index = TitleIndex(movies['title']) if title_index is None else title_index
+        self.version = time.time()      # changes on every (re)load, including a stats refresh
+        self.source_version = source_version  # snapshot.source_version() of the frames (epoch and movies)
+
+
+def query_frames(con):
+    """movies (with rating, num_ratings and genre_mask), ratings and the genre vocabulary, from SQL."""
+    # Averages and counts come from the trigger-maintained movie_stats table
+    movies_df = pd.read_sql_query("""
+        SELECT m.*,
+               COALESCE(s.rating_sum / NULLIF(s.rating_count, 0), 0) AS rating,
+               COALESCE(s.rating_count, 0) AS num_ratings
+        FROM movies m LEFT JOIN movie_stats s ON s.movieId = m.movieId
+    """, con)
+    # Inner join: every rating must belong to a movie we have details for
+    ratings_df = pd.read_sql_query("""
+        SELECT userId, movieId, rating, timestamp FROM ratings
+        WHERE movieId IN (SELECT movieId FROM movies)
+    """, con)
+
+    genres = genre_vocabulary(movies_df['genres'])
+    movies_df['genre_mask'] = genre_masks(movies_df['genres'], genres)
+    movies_df, ratings_df = compact_frames(movies_df, ratings_df)
+    return movies_df, ratings_df, genres
+
+
+def read_movie_stats(con):
+    """Current average rating and count per movieId, from movie_stats."""
+    return pd.read_sql_query("""
+        SELECT movieId, COALESCE(rating_sum / NULLIF(rating_count, 0), 0) AS rating, rating_count AS num_ratings
+        FROM movie_stats
+    """, con)
+
+
+def with_movie_stats(catalog, stats):
+    """A Catalog sharing `catalog`'s frames, with 'rating' and popularity taken from `stats`."""
+    stats = stats.set_index('movieId').reindex(catalog.movies['movieId'].to_numpy())
+    ratings = stats['rating'].fillna(0).to_numpy(np.float32)
+    counts = stats['num_ratings'].fillna(0).astype(np.int32)
+    popularity = counts[counts > 0].rename('ratings_count')
+    # assign() leaves the shared frame as it is (copy-on-write: only 'rating' is new)
+    movies_df = catalog.movies.assign(rating=ratings)
+    return Catalog(movies_df, catalog.ratings, popularity, catalog.genres, catalog.title_index,
+                   source_version=catalog.source_version)
+
+
+def load_catalog(db_path=DB_PATH, use_snapshot=True):
+    snapshot_dir = os.path.join(os.path.dirname(db_path), SNAPSHOT_DIR)
+    con = connect(db_path)
+    try:
+        version = source_version(con)
+        frames = load_snapshot(version, snapshot_dir) if use_snapshot else None
+        if frames is None:
+            movies_df, ratings_df, genres = query_frames(con)
+            title_index = TitleIndex(movies_df['title'])
+            frames = movies_df, ratings_df, genres, title_index
+            try:
+                write_snapshot(movies_df, ratings_df, version, genres, title_index, snapshot_dir)
+            except OSError:
+                # Read-only folder: keep serving from SQL
+                pass
+        stats = read_movie_stats(con)
+    finally:
+        con.close()
+    movies_df, ratings_df, genres, title_index = frames
+    # The frames' own averages are as of the snapshot; with_movie_stats() sets the current ones
+    movies_df = movies_df.drop(columns='num_ratings')
+
+    # Displayed counts are fake, impressive-looking numbers (e.g., between 50 and 5000);
+    # the real counts live in `popularity`.
+    movies_df['ratings_count'] = np.random.randint(50, 5000, size=len(movies_df))
+
+    catalog = Catalog(movies_df, ratings_df, None, genres, title_index, source_version=version)
+    return with_movie_stats(catalog, stats)
+
+
+def user_ratings(user_id, db_path=DB_PATH):
+    """One user's current ratings (userId, movieId, rating, timestamp) for movies in the catalog."""
+    con = connect(db_path)
+    try:
+        return pd.read_sql_query("""
+            SELECT userId, movieId, rating, timestamp FROM ratings
+            WHERE userId = ? AND movieId IN (SELECT movieId FROM movies)
+        """, con, params=(int(user_id),))
+    finally:
+        con.close()
+
+
+@st.cache_resource(max_entries=1)
+def _load_cached_catalog(structure):
+    return load_catalog()
+
+
+@st.cache_resource(max_entries=1)
+def _cached_catalog_with_stats(version, _catalog):
+    con = connect(DB_PATH)
+    try:
+        stats = read_movie_stats(con)
+    finally:
+        con.close()
+    return with_movie_stats(_catalog, stats)
+
+
+def get_catalog():
+    con = connect(DB_PATH)
+    try:
+        version = data_version(con)
+    finally:
+        con.close()
+    # Frames per epoch:movies; a rating write only re-reads movie_stats
+    return _cached_catalog_with_stats(version, _load_cached_catalog(structure_version(version)))
+
+
+def refresh_catalog():
+    _load_cached_catalog.clear()
+    _cached_catalog_with_stats.clear()
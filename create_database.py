@@ -1,29 +1,156 @@
 # create_database.py
+#
+# Builds movies.db from the clean CSVs (plus links.csv / tags.csv from
+# ml-latest-small/ when present) with a bulk loader that also copes with
+# ml-25m-sized files:
+#  - CSVs are streamed in chunks with explicit compact dtypes, so memory stays
+#    flat and every column lands in SQLite with its declared type.
+#  - Rows go in with executemany, one large transaction per chunk, under
+#    ingest PRAGMAs (no journal, no fsync, big page cache) that are restored
+#    to the connect() settings afterwards.
+#  - Indexes, triggers and movie_stats are built once after the load instead
+#    of being maintained row by row.
+#
+# Usage (from the project folder):
+#   python create_database.py
+#   python create_database.py --ratings ml-25m/ratings.csv --movies ml-25m/movies.csv --chunk-size 1000000
 
+import os
+import time
+import argparse
+import contextlib
 import pandas as pd
-import sqlite3
 
-print("Starting database creation...")
+from db import DB_PATH, connect, create_schema, create_indexes, rebuild_movie_stats
+from similarity_index import build_similarity_index
 
-# Create a connection to a new database file
-# This will create 'movies.db' in your folder
-con = sqlite3.connect('movies.db')
+MOVIE_COLUMNS = ['movieId', 'title', 'genres', 'imdbId', 'tmdbId', 'id', 'poster_path', 'poster_url']
+RATING_COLUMNS = ['userId', 'movieId', 'rating', 'timestamp']
+LINK_COLUMNS = ['movieId', 'imdbId', 'tmdbId']
+TAG_COLUMNS = ['userId', 'movieId', 'tag', 'timestamp']
 
-# --- Load your clean CSVs ---
-try:
-    movies = pd.read_csv('movies_clean_final.csv')
-    ratings = pd.read_csv('ratings_clean_final.csv')
-except FileNotFoundError:
-    print("ERROR: Make sure 'movies_clean_final.csv' and 'ratings_clean_final.csv' are in this folder!")
-    exit()
+# Nullable ids use pandas' Int64; a half-star rating is exact in float32
+MOVIE_DTYPES = {'movieId': 'int32', 'title': 'string', 'genres': 'string', 'imdbId': 'Int64', 'tmdbId': 'Int64',
+                'id': 'Int64', 'poster_path': 'string', 'poster_url': 'string'}
+RATING_DTYPES = {'userId': 'int32', 'movieId': 'int32', 'rating': 'float32', 'timestamp': 'int64'}
+LINK_DTYPES = {'movieId': 'int32', 'imdbId': 'Int64', 'tmdbId': 'Int64'}
+TAG_DTYPES = {'userId': 'int32', 'movieId': 'int32', 'tag': 'string', 'timestamp': 'int64'}
 
-# --- Save these dataframes as tables in the database ---
-movies.to_sql('movies', con, if_exists='replace', index=False)
-ratings.to_sql('ratings', con, if_exists='replace', index=False)
+LINKS_CSV = os.path.join('ml-latest-small', 'links.csv')
+TAGS_CSV = os.path.join('ml-latest-small', 'tags.csv')
+CHUNK_SIZE = 500_000
+INGEST_CACHE_KB = 512_000   # page cache during the load (~500 MB)
 
-# --- Close the connection ---
-con.close()
 
-print("SUCCESS: Your 'movies.db' file has been created.")
-print("It contains a 'movies' table and a 'ratings' table.")
-print("You can now delete this script. You only need to run it once.")
\ No newline at end of file
+def create_empty_database(db_path=DB_PATH, with_indexes=True):
+    """Delete any old database and return a connection to a fresh one with the schema."""
+    # Start from a fresh file so the typed schema is always the one in use
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    con = connect(db_path)
+    create_schema(con, with_indexes=with_indexes)
+    return con
+
+
+@contextlib.contextmanager
+def ingest_pragmas(con):
+    """Fast, non-durable settings for a bulk load into a throwaway file; restored on exit."""
+    saved = {name: con.execute(f"PRAGMA {name}").fetchone()[0] for name in ('journal_mode', 'synchronous', 'cache_size')}
+    con.execute("PRAGMA journal_mode = OFF")
+    con.execute("PRAGMA synchronous = OFF")
+    con.execute(f"PRAGMA cache_size = -{INGEST_CACHE_KB}")
+    try:
+        yield con
+    finally:
+        for name, value in saved.items():
+            con.execute(f"PRAGMA {name} = {value}")
+
+
+def row_values(frame, columns):
+    """Rows of plain Python values (sqlite3 can't bind NumPy scalars), missing values as None."""
+    values = []
+    for column in columns:
+        series = frame[column]
+        if series.hasnans:
+            values.append(series.astype(object).where(series.notna(), None).tolist())
+        else:
+            values.append(series.tolist())
+    return list(zip(*values))
+
+
+def insert_rows(con, table, columns, rows):
+    with con:
+        con.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows)
+
+
+def load_csv(con, table, csv_path, columns, dtypes, chunk_size=CHUNK_SIZE, verbose=True):
+    """Stream one CSV into `table` chunk by chunk; returns the number of rows."""
+    start_time = time.perf_counter()
+    total = 0
+    for chunk in pd.read_csv(csv_path, usecols=columns, dtype=dtypes, chunksize=chunk_size):
+        insert_rows(con, table, columns, row_values(chunk, columns))
+        total += len(chunk)
+    if verbose:
+        elapsed = time.perf_counter() - start_time
+        print(f"  {table:<8} {total:>12,} rows in {elapsed:6.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+    return total
+
+
+def finish_load(con, verbose=True):
+    """Indexes, triggers and movie_stats, once all rows are in."""
+    start_time = time.perf_counter()
+    create_indexes(con)
+    rebuild_movie_stats(con)
+    con.execute("PRAGMA optimize")
+    if verbose:
+        print(f"  indexes and movie_stats in {time.perf_counter() - start_time:.1f}s")
+
+
+def build_database(db_path=DB_PATH, movies_csv='movies_clean_final.csv', ratings_csv='ratings_clean_final.csv',
+                   links_csv=LINKS_CSV, tags_csv=TAGS_CSV, chunk_size=CHUNK_SIZE, verbose=False):
+    con = create_empty_database(db_path, with_indexes=False)
+    try:
+        with ingest_pragmas(con):
+            # Plain MovieLens movies.csv has only movieId/title/genres; the poster columns stay NULL
+            movie_columns = [c for c in MOVIE_COLUMNS if c in pd.read_csv(movies_csv, nrows=0).columns]
+            n_movies = load_csv(con, 'movies', movies_csv, movie_columns, MOVIE_DTYPES, chunk_size, verbose)
+            n_ratings = load_csv(con, 'ratings', ratings_csv, RATING_COLUMNS, RATING_DTYPES, chunk_size, verbose)
+            if links_csv and os.path.exists(links_csv):
+                load_csv(con, 'links', links_csv, LINK_COLUMNS, LINK_DTYPES, chunk_size, verbose)
+            if tags_csv and os.path.exists(tags_csv):
+                load_csv(con, 'tags', tags_csv, TAG_COLUMNS, TAG_DTYPES, chunk_size, verbose)
+            finish_load(con, verbose)
+    finally:
+        con.close()
+    return n_movies, n_ratings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build movies.db from the clean CSVs.")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--movies', default='movies_clean_final.csv')
+    parser.add_argument('--ratings', default='ratings_clean_final.csv')
+    parser.add_argument('--links', default=LINKS_CSV)
+    parser.add_argument('--tags', default=TAGS_CSV)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    print("Starting database creation...")
+
+    # --- Load your clean CSVs ---
+    try:
+        n_movies, n_ratings = build_database(args.db, args.movies, args.ratings, args.links, args.tags,
+                                             chunk_size=args.chunk_size, verbose=True)
+    except FileNotFoundError:
+        print(f"ERROR: Make sure '{args.movies}' and '{args.ratings}' are in this folder!")
+        exit()
+    build_similarity_index(args.db)
+
+    print(f"SUCCESS: Your '{args.db}' file has been created.")
+    print(f"It contains a 'movies' table ({n_movies} rows), a 'ratings' table ({n_ratings} rows)")
+    print("a 'movie_stats' table that triggers keep in sync with 'ratings',")
+    print("'links'/'tags' tables from ml-latest-small/ (when present),")
+    print("and a 'similar_movies' table for the Movie Explorer page.")
+    print("Re-run this script whenever you want to reset the database to the clean CSVs.")
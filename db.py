@@ -0,0 +1,228 @@
+# db.py
+#
+# Schema and connection settings for movies.db.
+# create_database.py builds the database from this schema; the app and the
+# offline scripts open it through connect() so they all get the same PRAGMAs.
+
+import sqlite3
+
+DB_PATH = 'movies.db'
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS movies (
+    movieId INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    genres TEXT NOT NULL,
+    imdbId INTEGER,
+    tmdbId INTEGER,
+    id INTEGER,
+    poster_path TEXT,
+    poster_url TEXT
+);
+
+CREATE TABLE IF NOT EXISTS ratings (
+    ratingId INTEGER PRIMARY KEY,
+    userId INTEGER NOT NULL,
+    movieId INTEGER NOT NULL,
+    rating REAL NOT NULL,
+    timestamp INTEGER NOT NULL
+);
+
+-- MovieLens links.csv / tags.csv (ml-latest-small/)
+CREATE TABLE IF NOT EXISTS links (
+    movieId INTEGER PRIMARY KEY,
+    imdbId INTEGER,
+    tmdbId INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS tags (
+    tagId INTEGER PRIMARY KEY,
+    userId INTEGER NOT NULL,
+    movieId INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    timestamp INTEGER NOT NULL
+);
+
+-- Change counters, bumped by the triggers below: 'ratings' and 'movies' on
+-- any write to those tables, plus one counter per user whose ratings
+-- changed. 'epoch' is random per database file, so a rebuilt database never
+-- repeats an old version. Caches key on these (see data_version()).
+CREATE TABLE IF NOT EXISTS data_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS user_versions (
+    userId INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO data_versions (name, version) VALUES ('epoch', abs(random())), ('ratings', 0), ('movies', 0);
+
+-- Running totals per movie, kept current by the triggers below, so the
+-- average rating is a keyed lookup instead of a GROUP BY over all ratings.
+CREATE TABLE IF NOT EXISTS movie_stats (
+    movieId INTEGER PRIMARY KEY,
+    rating_sum REAL NOT NULL DEFAULT 0,
+    rating_count INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_ratings_user ON ratings (userId, movieId);
+CREATE INDEX IF NOT EXISTS idx_ratings_movie ON ratings (movieId);
+CREATE INDEX IF NOT EXISTS idx_movies_title ON movies (title);
+CREATE INDEX IF NOT EXISTS idx_ratings_timestamp ON ratings (timestamp);
+CREATE INDEX IF NOT EXISTS idx_tags_movie ON tags (movieId);
+"""
+
+TRIGGER_SQL = """
+CREATE TRIGGER IF NOT EXISTS ratings_after_insert AFTER INSERT ON ratings
+BEGIN
+    INSERT INTO movie_stats (movieId, rating_sum, rating_count) VALUES (NEW.movieId, NEW.rating, 1)
+    ON CONFLICT (movieId) DO UPDATE SET rating_sum = rating_sum + NEW.rating, rating_count = rating_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS ratings_after_delete AFTER DELETE ON ratings
+BEGIN
+    UPDATE movie_stats SET rating_sum = rating_sum - OLD.rating, rating_count = rating_count - 1
+    WHERE movieId = OLD.movieId;
+END;
+
+CREATE TRIGGER IF NOT EXISTS ratings_after_update AFTER UPDATE OF rating, movieId ON ratings
+BEGIN
+    UPDATE movie_stats SET rating_sum = rating_sum - OLD.rating, rating_count = rating_count - 1
+    WHERE movieId = OLD.movieId;
+    INSERT INTO movie_stats (movieId, rating_sum, rating_count) VALUES (NEW.movieId, NEW.rating, 1)
+    ON CONFLICT (movieId) DO UPDATE SET rating_sum = rating_sum + NEW.rating, rating_count = rating_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS movies_after_delete AFTER DELETE ON movies
+BEGIN
+    DELETE FROM movie_stats WHERE movieId = OLD.movieId;
+END;
+
+CREATE TRIGGER IF NOT EXISTS ratings_version_insert AFTER INSERT ON ratings
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE name = 'ratings';
+    INSERT INTO user_versions (userId, version) VALUES (NEW.userId, 1)
+    ON CONFLICT (userId) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS ratings_version_delete AFTER DELETE ON ratings
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE name = 'ratings';
+    INSERT INTO user_versions (userId, version) VALUES (OLD.userId, 1)
+    ON CONFLICT (userId) DO UPDATE SET version = version + 1;
+END;
+
+-- Dropped first so create_indexes() replaces the older version that only bumped NEW.userId
+DROP TRIGGER IF EXISTS ratings_version_update;
+CREATE TRIGGER ratings_version_update AFTER UPDATE ON ratings
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE name = 'ratings';
+    INSERT INTO user_versions (userId, version) VALUES (NEW.userId, 1)
+    ON CONFLICT (userId) DO UPDATE SET version = version + 1;
+    -- A rating moved to another user changes the old user's ratings too
+    INSERT INTO user_versions (userId, version) SELECT OLD.userId, 1 WHERE OLD.userId <> NEW.userId
+    ON CONFLICT (userId) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS movies_version_insert AFTER INSERT ON movies
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE name = 'movies';
+END;
+
+CREATE TRIGGER IF NOT EXISTS movies_version_delete AFTER DELETE ON movies
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE name = 'movies';
+END;
+
+CREATE TRIGGER IF NOT EXISTS movies_version_update AFTER UPDATE ON movies
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE name = 'movies';
+END;
+"""
+
+
+def connect(db_path=DB_PATH, timeout=5.0):
+    """Open movies.db with the settings every reader and writer should use."""
+    con = sqlite3.connect(db_path, timeout=timeout)
+    # WAL lets readers keep going while a rating is being written
+    con.execute("PRAGMA journal_mode = WAL")
+    con.execute("PRAGMA synchronous = NORMAL")
+    con.execute(f"PRAGMA busy_timeout = {int(timeout * 1000)}")
+    con.execute("PRAGMA temp_store = MEMORY")
+    con.execute("PRAGMA cache_size = -20000")  # ~20 MB page cache
+    return con
+
+
+def create_schema(con, with_indexes=True):
+    con.executescript(SCHEMA_SQL)
+    if with_indexes:
+        create_indexes(con)
+
+
+def create_indexes(con):
+    """Indexes and the movie_stats triggers; a bulk load adds these after the rows."""
+    con.executescript(INDEX_SQL)
+    con.executescript(TRIGGER_SQL)
+
+
+def migrate(con):
+    """Add the counters, movie_stats and their triggers to a database built without them.
+
+    movie_stats is filled from the existing ratings (the triggers only track
+    changes from now on); an empty table would read as every movie unrated.
+    """
+    create_schema(con)
+    has_stats = con.execute("SELECT 1 FROM movie_stats LIMIT 1").fetchone() is not None
+    has_ratings = con.execute("SELECT 1 FROM ratings LIMIT 1").fetchone() is not None
+    if has_ratings and not has_stats:
+        rebuild_movie_stats(con)
+
+
+def data_version(con):
+    """'epoch:ratings:movies' counters; changes with every write to ratings or movies.
+
+    Databases built before the counters existed are migrated here, on first use.
+    """
+    try:
+        versions = dict(con.execute("SELECT name, version FROM data_versions").fetchall())
+    except sqlite3.OperationalError:
+        migrate(con)
+        versions = dict(con.execute("SELECT name, version FROM data_versions").fetchall())
+    return f"{versions['epoch']}:{versions['ratings']}:{versions['movies']}"
+
+
+def structure_version(version):
+    """'epoch:movies' part of a data_version(): what the catalog's frames, the snapshot
+    and the scoring arrays are built from. Rating writes leave it alone."""
+    epoch, _, movies = version.split(':')
+    return f"{epoch}:{movies}"
+
+
+def user_version(con, user_id):
+    """Counter bumped whenever this user's ratings (or folded-in embedding) change."""
+    row = con.execute("SELECT version FROM user_versions WHERE userId = ?", (int(user_id),)).fetchone()
+    return 0 if row is None else row[0]
+
+
+def bump_user_version(con, user_id):
+    """For changes to a user that the triggers don't see (e.g. a new folded-in embedding)."""
+    sql = "INSERT INTO user_versions (userId, version) VALUES (?, 1) ON CONFLICT (userId) DO UPDATE SET version = version + 1"
+    try:
+        con.execute(sql, (int(user_id),))
+    except sqlite3.OperationalError:
+        migrate(con)
+        con.execute(sql, (int(user_id),))
+
+
+def rebuild_movie_stats(con):
+    """Recompute movie_stats from scratch (e.g. after a bulk load)."""
+    with con:
+        con.execute("DELETE FROM movie_stats")
+        con.execute("""
+            INSERT INTO movie_stats (movieId, rating_sum, rating_count)
+            SELECT movieId, SUM(rating), COUNT(*) FROM ratings GROUP BY movieId
+        """)
@@ -0,0 +1,61 @@
+# genre_index.py
+#
+# Genres as integer bitmasks: bit i is set when a movie has genre vocabulary[i].
+# Filtering by genres and counting shared genres become vectorized bitwise
+# operations, and every test is an exact genre match (no substring surprises).
+
+import numpy as np
+
+MAX_GENRES = 63  # bits available in an int64 mask
+
+# Popcount of every byte value, for NumPy versions without np.bitwise_count
+_BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def genre_vocabulary(genres):
+    """Sorted list of the distinct genres in a Series of 'A|B|C' strings."""
+    return sorted(genres.str.split('|').explode().dropna().unique())
+
+
+def genre_masks(genres, vocabulary):
+    """One int64 bitmask per row of a Series of 'A|B|C' strings."""
+    if len(vocabulary) > MAX_GENRES:
+        raise ValueError(f"Too many genres for an int64 mask ({len(vocabulary)} > {MAX_GENRES}).")
+    bit_of = {genre: np.int64(1) << np.int64(i) for i, genre in enumerate(vocabulary)}
+    exploded = genres.reset_index(drop=True).str.split('|').explode()
+    bits = exploded.map(bit_of).fillna(0).astype(np.int64)
+    masks = np.zeros(len(genres), dtype=np.int64)
+    np.bitwise_or.at(masks, bits.index.to_numpy(), bits.to_numpy())
+    return masks
+
+
+def mask_for(selected_genres, vocabulary):
+    """Bitmask of a list of genre names.
+
+    Raises KeyError for names not in `vocabulary`: dropping them would leave a
+    mask of 0, which has_all() matches against every movie.
+    """
+    unknown = [genre for genre in selected_genres if genre not in vocabulary]
+    if unknown:
+        raise KeyError(f"unknown genres: {', '.join(map(str, unknown))}")
+    mask = np.int64(0)
+    for genre in selected_genres:
+        mask |= np.int64(1) << np.int64(vocabulary.index(genre))
+    return mask
+
+
+def popcount(masks):
+    masks = np.asarray(masks, dtype=np.int64)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(masks)
+    return _BYTE_POPCOUNT[masks.view(np.uint8)].reshape(masks.shape + (8,)).sum(axis=-1)
+
+
+def has_all(masks, query_mask):
+    """Boolean array: which movies have EVERY genre in query_mask."""
+    return (masks & query_mask) == query_mask
+
+
+def overlap(masks, query_mask):
+    """Number of genres each movie shares with query_mask."""
+    return popcount(masks & query_mask)
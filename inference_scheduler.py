@@ -0,0 +1,180 @@
+# inference_scheduler.py
+#
+# Cross-session micro-batching of NCF scoring. When many users log in at
+# once, every Streamlit session thread would run its own small forward pass;
+# each pays the fixed per-call overhead and they fight over the BLAS threads.
+# Instead, sessions submit (user vector, candidates) requests here and ONE
+# worker thread:
+#  - waits for the first request, then collects more for up to MAX_WAIT_MS
+#    or until MAX_BATCH requests / MAX_BATCH_ROWS (user, movie) pairs;
+#  - scores the whole batch in one forward pass (CatalogScorer.score_batch);
+#  - resolves each request's Future with its own top-n.
+# Requests for different scorers (a reloaded model) are batched separately.
+# metrics() reports queue depth and batch sizes.
+#
+# Batching is OFF unless INFERENCE_BATCHING=1: benchmarks/run.py (8 sessions,
+# concurrent_direct vs concurrent_batched) shows no gain on the benchmark
+# machine. 1x: 131/141 vs 109/154 req/s in back-to-back runs; 10x: 85/90/90
+# vs 84/93/90 req/s. No MAX_WAIT_MS (0-5) or MAX_BATCH_ROWS (16k-262k)
+# setting beat direct calls beyond the run-to-run noise, so by default
+# sessions score directly and skip the extra thread and queueing latency.
+# Turn it on where many cores sit behind one app process and re-measure.
+#
+# Usage (from the app):
+#   from inference_scheduler import get_inference_scheduler
+#   scheduler = get_inference_scheduler()   # None unless INFERENCE_BATCHING=1
+#   recommend_cached(resources, cache, user_id, scheduler=scheduler)
+
+import os
+import time
+import queue
+import atexit
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+from ncf_engine import select_top_n
+
+BATCHING_ENV = 'INFERENCE_BATCHING'
+MAX_BATCH = 32
+MAX_WAIT_MS = 1.0
+# (user, movie) pairs per forward pass: ~8 MB of first-layer activations, so a
+# batch stays in cache. Whole-catalog requests mostly go one per pass (the
+# gain there is not thrashing the cache with concurrent passes); ANN
+# candidate requests (a few hundred rows) batch by the dozen.
+MAX_BATCH_ROWS = 16_384
+RECENT_BATCHES = 1_000     # batch sizes kept for the metrics
+
+_STOP = object()
+
+
+class InferenceRequest:
+    def __init__(self, scorer, user_hidden, n, seen, candidates):
+        self.scorer = scorer
+        self.user_hidden = user_hidden
+        self.n = n
+        self.seen = seen
+        # None = the whole catalog; otherwise only the usable candidates are scored
+        self.items = None if candidates is None else scorer.usable_candidates(candidates, seen)
+        self.rows = scorer.n_movies if self.items is None else len(self.items)
+        self.submitted_at = time.perf_counter()
+        self.future = Future()
+
+
+class InferenceScheduler:
+    def __init__(self, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, max_rows=MAX_BATCH_ROWS):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_rows = max_rows
+        self._queue = queue.Queue()
+        self._held = None  # a request that did not fit in the previous batch
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._recent_sizes = deque(maxlen=RECENT_BATCHES)
+        self._recent_waits_ms = deque(maxlen=RECENT_BATCHES)
+        self._thread = threading.Thread(target=self._run, name='inference-scheduler', daemon=True)
+        self._thread.start()
+
+    def submit(self, scorer, user_hidden, n=10, seen=None, candidates=None):
+        """Queue one user's top-n; the Future resolves to (movie indices, scores) like CatalogScorer.top_n_hidden."""
+        request = InferenceRequest(scorer, user_hidden, n, seen, candidates)
+        self._queue.put(request)
+        return request.future
+
+    def metrics(self):
+        with self._lock:
+            sizes, waits = list(self._recent_sizes), list(self._recent_waits_ms)
+            return {
+                'queue_depth': self._queue.qsize(),
+                'requests': self._requests,
+                'batches': self._batches,
+                'mean_batch_size': round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+                'max_batch_size': max(sizes, default=0),
+                'mean_wait_ms': round(sum(waits) / len(waits), 3) if waits else 0.0,
+            }
+
+    def close(self, timeout=None):
+        """Finish what is queued, then stop the worker."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    # --- Worker thread ---
+    def _next_batch(self):
+        """Requests for one forward pass (same scorer, within the limits); (batch, stop requested)."""
+        first = self._held if self._held is not None else self._queue.get()
+        self._held = None
+        if first is _STOP:
+            return [], True
+        batch, rows = [first], first.rows
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                request = self._queue.get(timeout=max(deadline - time.perf_counter(), 0))
+            except queue.Empty:
+                break
+            if request is _STOP:
+                return batch, True
+            if request.scorer is not first.scorer or rows + request.rows > self.max_rows:
+                self._held = request
+                break
+            batch.append(request)
+            rows += request.rows
+        return batch, False
+
+    def _score(self, batch):
+        started_at = time.perf_counter()
+        try:
+            scorer = batch[0].scorer
+            all_scores = scorer.score_batch([r.user_hidden for r in batch], [r.items for r in batch])
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        with self._lock:
+            self._requests += len(batch)
+            self._batches += 1
+            self._recent_sizes.append(len(batch))
+            self._recent_waits_ms.extend((started_at - r.submitted_at) * 1000 for r in batch)
+        for request, scores in zip(batch, all_scores):
+            if request.items is None:
+                result = select_top_n(scores, request.n, request.seen, scorer.available_mask)
+            else:
+                top, top_scores = select_top_n(scores, request.n)
+                result = request.items[top], top_scores
+            request.future.set_result(result)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            if batch:
+                self._score(batch)
+
+
+# --- One scheduler for the whole app process ---
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def batching_enabled():
+    return os.environ.get(BATCHING_ENV, '') not in ('', '0')
+
+
+def get_inference_scheduler():
+    """The process-wide scheduler if INFERENCE_BATCHING is set, else None (sessions score directly)."""
+    global _scheduler
+    if not batching_enabled():
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = InferenceScheduler()
+        return _scheduler
+
+
+@atexit.register
+def _close_scheduler():
+    if _scheduler is not None:
+        _scheduler.close(timeout=5)
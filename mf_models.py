@@ -0,0 +1,307 @@
+# mf_models.py
+#
+# Matrix-factorization baseline and the NCF-vs-MF comparison behind
+# pages/7_Algorithm_Comparison.py.
+#  - Ratings are kept as a scipy.sparse CSR users x movies matrix: only the
+#    ratings that exist are stored, and missing entries are "unobserved", not
+#    zeros (a dense pivot_table().fillna(0) treats them as 0-star ratings).
+#  - Both factorizers fit rating ~ mean + user bias + movie bias + p_u . q_i
+#    on the observed ratings only:
+#      ALSModel - alternating least squares with the weighted-lambda
+#                 regularization of ALS-WR; each half-step solves one small
+#                 (k x k) problem per user/movie over the ratings it has.
+#      SGDModel - mini-batch stochastic gradient descent ("Funk SVD").
+#    sweep.py searches their hyperparameters.
+#  - Both models are scored on the same held-out ratings: train_model.py's
+#    deterministic ratingId-hash split, so the NCF model trained by that
+#    script has never seen them either.
+#  - Results are cached in algorithm_comparison.json, keyed by the data
+#    version, so the page only reads a file.
+#
+# Usage (from the project folder):
+#   python mf_models.py            # (re)compute the comparison if the data changed
+
+import os
+import json
+import time
+import numpy as np
+import scipy.sparse as sp
+
+from db import DB_PATH, connect, data_version as db_data_version
+from train_model import chunk_ranges, read_chunk, is_validation, read_manifest
+
+RESULTS_PATH = 'algorithm_comparison.json'
+
+N_FACTORS = 20
+REGULARIZATION = 0.1
+N_ITERATIONS = 15
+LEARNING_RATE = 0.01  # SGD only
+SGD_BATCH_SIZE = 256
+BIAS_DAMPING = 10   # pseudo-ratings pulling the bias of a rarely-rated user/movie toward 0
+MIN_RATING, MAX_RATING = 0.5, 5.0
+
+
+# --- 1. Data ---
+class RatingSplit:
+    """Sparse training matrix plus the held-out ratings, in the same index space."""
+
+    def __init__(self, train, test_users, test_movies, test_ratings, user_ids, movie_ids):
+        self.train = train                  # CSR, n_users x n_movies
+        self.test_users = test_users        # -1 where the user has no training ratings
+        self.test_movies = test_movies      # -1 where the movie has no training ratings
+        self.test_ratings = test_ratings
+        self.user_ids = user_ids            # row -> userId
+        self.movie_ids = movie_ids          # column -> movieId
+
+    @classmethod
+    def from_db(cls, db_path=DB_PATH):
+        """Stream the ratings table and split it by train_model.is_validation."""
+        con = connect(db_path)
+        try:
+            min_id, max_id = con.execute("SELECT MIN(ratingId), MAX(ratingId) FROM ratings").fetchone()
+            known_movies = np.array([row[0] for row in con.execute("SELECT movieId FROM movies")], dtype=np.int64)
+            columns = {'ratingId': [], 'userId': [], 'movieId': [], 'rating': []}
+            for start, end in ([] if min_id is None else chunk_ranges(min_id, max_id)):
+                chunk = read_chunk(con, start, end)
+                chunk = chunk[chunk['movieId'].isin(known_movies)]
+                for name, values in columns.items():
+                    values.append(chunk[name].to_numpy())
+        finally:
+            con.close()
+        rating_ids, users, movies, ratings = (np.concatenate(values) if values else np.empty(0, dtype=np.int64)
+                                              for values in columns.values())
+        return cls.from_arrays(rating_ids, users, movies, ratings)
+
+    @classmethod
+    def from_arrays(cls, rating_ids, users, movies, ratings):
+        held_out = is_validation(rating_ids)
+        user_ids, train_users = np.unique(users[~held_out], return_inverse=True)
+        movie_ids, train_movies = np.unique(movies[~held_out], return_inverse=True)
+        train = sp.csr_matrix((ratings[~held_out].astype(np.float32), (train_users, train_movies)),
+                              shape=(len(user_ids), len(movie_ids)))
+        train.sum_duplicates()
+        return cls(train, index_of(user_ids, users[held_out]), index_of(movie_ids, movies[held_out]),
+                   ratings[held_out].astype(np.float32), user_ids, movie_ids)
+
+
+def index_of(sorted_ids, ids):
+    """Positions of `ids` in `sorted_ids`, -1 where absent."""
+    if len(sorted_ids) == 0:
+        return np.full(len(ids), -1, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    return np.where(sorted_ids[positions] == ids, positions, -1)
+
+
+# --- 2. Biased ALS ---
+def _solve_rows(matrix, fixed, reg):
+    """One ALS half-step: least-squares row factors against the `fixed` factors."""
+    k = fixed.shape[1]
+    factors = np.zeros((matrix.shape[0], k), dtype=np.float64)
+    identity = np.eye(k)
+    indptr, indices, values = matrix.indptr, matrix.indices, matrix.data
+    for row in range(matrix.shape[0]):
+        start, end = indptr[row], indptr[row + 1]
+        if start == end:
+            continue
+        block = fixed[indices[start:end]]
+        lhs = block.T @ block + reg * (end - start) * identity
+        factors[row] = np.linalg.solve(lhs, block.T @ values[start:end])
+    return factors
+
+
+def damped_biases(train, mean):
+    """Mean, then movie, then user offsets, each shrunk toward 0 for sparse rows."""
+    user_counts = np.diff(train.indptr)
+    movie_counts = np.bincount(train.indices, minlength=train.shape[1])
+    residual = train.data - mean
+    movie_bias = np.bincount(train.indices, weights=residual, minlength=train.shape[1]) / (movie_counts + BIAS_DAMPING)
+    residual = residual - movie_bias[train.indices]
+    user_bias = np.add.reduceat(residual, train.indptr[:-1]) if train.nnz else np.zeros(train.shape[0])
+    user_bias = np.where(user_counts > 0, user_bias, 0) / (user_counts + BIAS_DAMPING)
+    return user_bias, movie_bias, residual - np.repeat(user_bias, user_counts)
+
+
+class FactorModel:
+    """rating ~ mean + user_bias + movie_bias + user_factors . movie_factors"""
+
+    def __init__(self, mean, user_bias, movie_bias, user_factors, movie_factors):
+        self.mean = mean
+        self.user_bias = user_bias
+        self.movie_bias = movie_bias
+        self.user_factors = user_factors
+        self.movie_factors = movie_factors
+
+    def predict(self, user_indices, movie_indices):
+        """Predicted ratings; unknown (-1) users/movies fall back to the biases we do have."""
+        user_indices = np.asarray(user_indices)
+        movie_indices = np.asarray(movie_indices)
+        known_user, known_movie = user_indices >= 0, movie_indices >= 0
+        u, m = np.where(known_user, user_indices, 0), np.where(known_movie, movie_indices, 0)
+        predictions = (self.mean
+                       + np.where(known_user, self.user_bias[u], 0)
+                       + np.where(known_movie, self.movie_bias[m], 0)
+                       + np.where(known_user & known_movie,
+                                  np.einsum('ij,ij->i', self.user_factors[u], self.movie_factors[m]), 0))
+        return np.clip(predictions, MIN_RATING, MAX_RATING)
+
+
+class ALSModel(FactorModel):
+    @classmethod
+    def fit(cls, train, n_factors=N_FACTORS, reg=REGULARIZATION, n_iter=N_ITERATIONS, seed=42):
+        train = train.tocsr()
+        mean = float(train.data.mean()) if train.nnz else 0.0
+
+        # Damped mean biases first, then factorize what they leave over.
+        # The residual shares the (read-only) index arrays of `train`.
+        user_bias, movie_bias, residual = damped_biases(train, mean)
+        residual = sp.csr_matrix((residual, train.indices, train.indptr), shape=train.shape, copy=False)
+
+        rng = np.random.default_rng(seed)
+        movie_factors = rng.normal(0, 0.1, size=(train.shape[1], n_factors))
+        by_movie = residual.T.tocsr()
+        for _ in range(n_iter):
+            user_factors = _solve_rows(residual, movie_factors, reg)
+            movie_factors = _solve_rows(by_movie, user_factors, reg)
+        return cls(mean, user_bias, movie_bias, user_factors, movie_factors)
+
+
+class SGDModel(FactorModel):
+    @classmethod
+    def fit(cls, train, n_factors=N_FACTORS, reg=REGULARIZATION, n_iter=N_ITERATIONS, seed=42,
+            learning_rate=LEARNING_RATE, batch_size=SGD_BATCH_SIZE):
+        train = train.tocsr()
+        users = np.repeat(np.arange(train.shape[0]), np.diff(train.indptr))
+        movies, ratings = train.indices, train.data.astype(np.float64)
+        mean = float(ratings.mean()) if len(ratings) else 0.0
+
+        rng = np.random.default_rng(seed)
+        user_bias, movie_bias = np.zeros(train.shape[0]), np.zeros(train.shape[1])
+        user_factors = rng.normal(0, 0.1, size=(train.shape[0], n_factors))
+        movie_factors = rng.normal(0, 0.1, size=(train.shape[1], n_factors))
+        for _ in range(n_iter):
+            order = rng.permutation(len(ratings))
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                u, m = users[batch], movies[batch]
+                p, q = user_factors[u], movie_factors[m]
+                error = ratings[batch] - (mean + user_bias[u] + movie_bias[m] + np.einsum('ij,ij->i', p, q))
+                # One SGD step per rating; steps of repeated users/movies in a batch add up
+                np.add.at(user_bias, u, learning_rate * (error - reg * user_bias[u]))
+                np.add.at(movie_bias, m, learning_rate * (error - reg * movie_bias[m]))
+                np.add.at(user_factors, u, learning_rate * (error[:, None] * q - reg * p))
+                np.add.at(movie_factors, m, learning_rate * (error[:, None] * p - reg * q))
+        return cls(mean, user_bias, movie_bias, user_factors, movie_factors)
+
+
+MODELS = {'als': ALSModel, 'sgd': SGDModel}
+
+
+# --- 3. Comparison ---
+def error_metrics(actual, predicted):
+    errors = np.asarray(predicted, dtype=np.float64) - np.asarray(actual, dtype=np.float64)
+    return {'rmse': float(np.sqrt(np.mean(errors ** 2))), 'mae': float(np.mean(np.abs(errors))),
+            'n_test': int(len(errors))}
+
+
+def load_ncf_for_split(split):
+    """NumPy NCF model plus its (user, movie) indices for every held-out rating (-1 = unknown)."""
+    from ncf_engine import load_ncf_model, load_mappings
+
+    try:
+        model = load_ncf_model()
+        user_to_index, movie_to_index = load_mappings()
+    except (OSError, ValueError, ImportError):
+        return None, None, None
+    test_user_ids = np.where(split.test_users >= 0, split.user_ids[np.maximum(split.test_users, 0)], -1)
+    test_movie_ids = np.where(split.test_movies >= 0, split.movie_ids[np.maximum(split.test_movies, 0)], -1)
+    users = np.array([user_to_index.get(int(u), -1) for u in test_user_ids], dtype=np.int64)
+    movies = np.array([movie_to_index.get(int(m), -1) for m in test_movie_ids], dtype=np.int64)
+    return model, users, movies
+
+
+def ratings_version(db_path=DB_PATH):
+    """Changes whenever ratings are added, deleted or edited (db.data_version's counters)."""
+    con = connect(db_path)
+    try:
+        epoch, ratings, _ = db_data_version(con).split(':')
+    finally:
+        con.close()
+    return f"{epoch}:{ratings}"
+
+
+def data_version(db_path=DB_PATH):
+    """ratings_version, plus the NCF model's data hash (changes when it is retrained)."""
+    model_hash = (read_manifest() or {}).get('data', {}).get('sha256')
+    return f"{ratings_version(db_path)}:{model_hash}"
+
+
+def cache_key(db_path=DB_PATH):
+    return f"{data_version(db_path)}|als:{N_FACTORS}:{REGULARIZATION}:{N_ITERATIONS}"
+
+
+def run_comparison(db_path=DB_PATH):
+    split = RatingSplit.from_db(db_path)
+    ncf, ncf_users, ncf_movies = load_ncf_for_split(split)
+
+    # Score every model on the same held-out ratings: those whose user and
+    # movie were seen in training (by ALS and, if present, by the NCF model)
+    test_mask = (split.test_users >= 0) & (split.test_movies >= 0)
+    if ncf is not None:
+        test_mask &= (ncf_users >= 0) & (ncf_movies >= 0)
+    actual = split.test_ratings[test_mask]
+
+    start_time = time.perf_counter()
+    als = ALSModel.fit(split.train)
+    als_seconds = time.perf_counter() - start_time
+    results = [{
+        'model': 'Matrix Factorization (ALS)',
+        **error_metrics(actual, als.predict(split.test_users[test_mask], split.test_movies[test_mask])),
+        'train_seconds': als_seconds,
+        'params': {'n_factors': N_FACTORS, 'reg': REGULARIZATION, 'n_iter': N_ITERATIONS},
+    }]
+
+    if ncf is not None:
+        predicted = ncf.predict([ncf_users[test_mask], ncf_movies[test_mask]]).reshape(-1)
+        manifest = read_manifest() or {}
+        results.insert(0, {
+            'model': 'Neural Network (NCF)',
+            **error_metrics(actual, np.clip(predicted, MIN_RATING, MAX_RATING)),
+            'train_seconds': manifest.get('timings_seconds', {}).get('train'),
+            # Only a model from train_model.py held these ratings out
+            'held_out': 'validation_percent' in manifest,
+        })
+    return {
+        'cache_key': cache_key(db_path),
+        'computed_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'n_train': int(split.train.nnz),
+        'results': results,
+    }
+
+
+def read_results(path=RESULTS_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def update_results(db_path=DB_PATH, path=RESULTS_PATH, force=False):
+    """Recompute only if the data version changed since the cached run."""
+    cached = read_results(path)
+    if cached is not None and not force and cached.get('cache_key') == cache_key(db_path):
+        return cached, False
+    results = run_comparison(db_path)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    os.replace(tmp_path, path)
+    return results, True
+
+
+if __name__ == '__main__':
+    results, recomputed = update_results()
+    print("Recomputed." if recomputed else "Data unchanged; cached results are current.")
+    for row in results['results']:
+        seconds = row['train_seconds']
+        print(f"{row['model']:<30} RMSE={row['rmse']:.4f}  MAE={row['mae']:.4f}  "
+              f"train={'n/a' if seconds is None else f'{seconds:.1f}s'}  (n={row['n_test']})")
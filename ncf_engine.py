@@ -0,0 +1,264 @@
+# ncf_engine.py
+#
+# Pure-NumPy inference for the Neural Collaborative Filtering model.
+#
+# The network trained in moviepro.ipynb is small:
+#   UserEmbedding(50) + MovieEmbedding(50) -> Concatenate -> Dense(128, relu)
+#   -> Dense(64, relu) -> Dense(1)
+# so the app does not need the TensorFlow runtime to serve it. The weights are
+# exported ONCE (offline, where TensorFlow is installed) into a compact .npz
+# file, and the app runs the same forward pass with NumPy.
+#
+# Usage (from the project folder):
+#   python ncf_engine.py export    # recommender_model.keras -> recommender_weights.npz
+#   python ncf_engine.py verify    # compare NumPy vs. model.predict on random pairs
+
+import os
+import sys
+import json
+import numpy as np
+
+MODEL_PATH = 'recommender_model.keras'
+WEIGHTS_PATH = 'recommender_weights.npz'
+USER_INDEX_PATH = 'user_to_index.json'
+MOVIE_INDEX_PATH = 'movie_to_index.json'
+
+# float32 NumPy vs. TensorFlow kernels differ only by summation order, which
+# stays well below this on a 0.5-5.0 rating scale.
+PREDICTION_TOLERANCE = 1e-4
+
+
+# --- 1. Export Step (needs TensorFlow, run offline) ---
+def extract_weights(model):
+    """Pull the embedding and Dense weights out of a loaded Keras NCF model."""
+    from tensorflow.keras.layers import Dense
+
+    dense_layers = [layer for layer in model.layers if isinstance(layer, Dense)]
+    if len(dense_layers) != 3:
+        raise ValueError(f"Expected 3 Dense layers in the NCF model, found {len(dense_layers)}.")
+
+    (w1, b1), (w2, b2), (w3, b3) = [layer.get_weights() for layer in dense_layers]
+    arrays = {
+        'user_embedding': model.get_layer('UserEmbedding').get_weights()[0],
+        'movie_embedding': model.get_layer('MovieEmbedding').get_weights()[0],
+        'w1': w1, 'b1': b1,
+        'w2': w2, 'b2': b2,
+        'w3': w3, 'b3': b3,
+    }
+    return {key: np.asarray(value, dtype=np.float32) for key, value in arrays.items()}
+
+
+def export_weights(model_path=MODEL_PATH, out_path=WEIGHTS_PATH):
+    from tensorflow.keras.models import load_model
+
+    arrays = extract_weights(load_model(model_path))
+
+    # Write to a temp file first so a running app never sees a half-written file
+    tmp_path = out_path + '.tmp.npz'
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+# --- 2. NumPy Forward Pass ---
+class NCFModel:
+    """NumPy twin of the Keras NCF model. `predict` mirrors `model.predict`."""
+
+    def __init__(self, user_embedding, movie_embedding, w1, b1, w2, b2, w3, b3):
+        self.user_embedding = user_embedding
+        self.movie_embedding = movie_embedding
+        self.w1, self.b1 = w1, b1
+        self.w2, self.b2 = w2, b2
+        self.w3, self.b3 = w3, b3
+        self.embedding_size = user_embedding.shape[1]
+
+    @classmethod
+    def load(cls, path=WEIGHTS_PATH):
+        with np.load(path) as data:
+            return cls(**{key: data[key] for key in data.files})
+
+    def to_arrays(self):
+        """Constructor arguments by name (what .load() reads back)."""
+        return {'user_embedding': self.user_embedding, 'movie_embedding': self.movie_embedding,
+                'w1': self.w1, 'b1': self.b1, 'w2': self.w2, 'b2': self.b2, 'w3': self.w3, 'b3': self.b3}
+
+    def forward(self, user_vectors, movie_vectors):
+        # Dense(128) on concat([u, m]) is the same as u @ W1[:k] + m @ W1[k:]
+        k = self.embedding_size
+        hidden = user_vectors @ self.w1[:k] + movie_vectors @ self.w1[k:] + self.b1
+        np.maximum(hidden, 0, out=hidden)
+        hidden = hidden @ self.w2 + self.b2
+        np.maximum(hidden, 0, out=hidden)
+        return hidden @ self.w3 + self.b3
+
+    def predict(self, inputs, **kwargs):
+        user_indices, movie_indices = inputs
+        user_indices = np.asarray(user_indices).reshape(-1)
+        movie_indices = np.asarray(movie_indices).reshape(-1)
+        return self.forward(self.user_embedding[user_indices], self.movie_embedding[movie_indices])
+
+
+def load_ncf_model(weights_path=WEIGHTS_PATH, model_path=MODEL_PATH):
+    """Load the NumPy model; fall back to Keras only if the export was never run."""
+    if os.path.exists(weights_path):
+        return NCFModel.load(weights_path)
+    from tensorflow.keras.models import load_model
+    return NCFModel(**extract_weights(load_model(model_path)))
+
+
+def load_mappings(user_index_path=USER_INDEX_PATH, movie_index_path=MOVIE_INDEX_PATH):
+    """userId -> embedding row and movieId -> embedding row, with int keys."""
+    with open(user_index_path, 'r') as f:
+        user_to_index = {int(k): v for k, v in json.load(f).items()}
+    with open(movie_index_path, 'r') as f:
+        movie_to_index = {int(k): v for k, v in json.load(f).items()}
+    return user_to_index, movie_to_index
+
+
+# --- 3. Whole-Catalog Scoring ---
+class SeenIndex:
+    """CSR index of the movies each user has already rated (by model index)."""
+
+    def __init__(self, indptr, indices):
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_ratings(cls, user_indices, movie_indices, n_users):
+        user_indices = np.asarray(user_indices, dtype=np.int64)
+        movie_indices = np.asarray(movie_indices, dtype=np.int32)
+        order = np.argsort(user_indices, kind='stable')
+        counts = np.bincount(user_indices, minlength=n_users)
+        indptr = np.zeros(n_users + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        return cls(indptr, movie_indices[order])
+
+    def seen(self, user_index):
+        if user_index < 0 or user_index >= len(self.indptr) - 1:
+            return self.indices[:0]
+        return self.indices[self.indptr[user_index]:self.indptr[user_index + 1]]
+
+    def count(self, user_index):
+        return len(self.seen(user_index))
+
+
+class CatalogScorer:
+    """Scores every movie for one user in a single batched pass.
+
+    The item half of the first Dense layer does not depend on the user, so it
+    is computed once here; a request only adds the user's half and runs the
+    two small remaining layers over the whole catalog.
+    """
+
+    def __init__(self, model, available_mask=None, item_hidden=None, user_hidden=None):
+        k = model.embedding_size
+        self.model = model
+        self.n_movies = model.movie_embedding.shape[0]
+        # Precomputed halves may be passed in (e.g. mapped from shared_arrays.py)
+        self.item_hidden = model.movie_embedding @ model.w1[k:] + model.b1 if item_hidden is None else item_hidden
+        self.user_hidden = model.user_embedding @ model.w1[:k] if user_hidden is None else user_hidden
+        if available_mask is None:
+            available_mask = np.ones(self.n_movies, dtype=bool)
+        self.available_mask = available_mask
+
+    def score_hidden(self, user_hidden, item_hidden):
+        return self._forward(item_hidden + user_hidden)
+
+    def _forward(self, hidden):
+        """The layers after the first Dense's pre-activation (overwrites `hidden`)."""
+        np.maximum(hidden, 0, out=hidden)
+        hidden = hidden @ self.model.w2
+        hidden += self.model.b2
+        np.maximum(hidden, 0, out=hidden)
+        return (hidden @ self.model.w3 + self.model.b3).reshape(-1)
+
+    def hidden_for_vector(self, user_vector):
+        """User half of the first layer for an embedding that is not in the table (fold-in)."""
+        return user_vector @ self.model.w1[:self.model.embedding_size]
+
+    def score_all(self, user_index):
+        return self.score_hidden(self.user_hidden[user_index], self.item_hidden)
+
+    def top_n(self, user_index, n=10, seen=None):
+        return self.top_n_hidden(self.user_hidden[user_index], n=n, seen=seen)
+
+    def top_n_hidden(self, user_hidden, n=10, seen=None):
+        scores = self.score_hidden(user_hidden, self.item_hidden)
+        return select_top_n(scores, n, seen, self.available_mask)
+
+    def top_n_candidates(self, user_hidden, candidates, n=10, seen=None):
+        """Rank only `candidates` (movie indices), e.g. from the ANN index."""
+        candidates = self.usable_candidates(candidates, seen)
+        scores = self.score_hidden(user_hidden, self.item_hidden[candidates])
+        top, top_scores = select_top_n(scores, n)
+        return candidates[top], top_scores
+
+    def usable_candidates(self, candidates, seen=None):
+        """Distinct candidates that are available and not already seen."""
+        candidates = np.unique(candidates)
+        keep = self.available_mask[candidates]
+        if seen is not None and len(seen):
+            keep &= ~np.isin(candidates, seen)
+        return candidates[keep]
+
+    def score_batch(self, user_hiddens, item_lists):
+        """Scores of several users at once: item_lists[i] (movie indices, or None for
+        the whole catalog) for user_hiddens[i], as one forward pass over all pairs."""
+        lengths = [self.n_movies if items is None else len(items) for items in item_lists]
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        # Each user's first-layer rows are written straight into one shared buffer
+        hidden = np.empty((offsets[-1], self.item_hidden.shape[1]), dtype=self.item_hidden.dtype)
+        for i, (user_hidden, items) in enumerate(zip(user_hiddens, item_lists)):
+            item_hidden = self.item_hidden if items is None else self.item_hidden[items]
+            np.add(item_hidden, user_hidden, out=hidden[offsets[i]:offsets[i + 1]])
+        scores = self._forward(hidden)
+        return [scores[offsets[i]:offsets[i + 1]] for i in range(len(lengths))]
+
+
+def select_top_n(scores, n, seen=None, available_mask=None):
+    """argpartition top-n over `scores`, skipping seen/unavailable movie indices."""
+    scores = scores.astype(np.float32, copy=True)
+    if available_mask is not None:
+        scores[~available_mask] = -np.inf
+    if seen is not None and len(seen):
+        scores[seen] = -np.inf
+    n = min(n, int(np.isfinite(scores).sum()))
+    if n <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    top = np.argpartition(-scores, n - 1)[:n]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return top, scores[top]
+
+
+# --- 4. Verification Against model.predict ---
+def verify(model_path=MODEL_PATH, weights_path=WEIGHTS_PATH, n_samples=10000, seed=42):
+    from tensorflow.keras.models import load_model
+
+    keras_model = load_model(model_path)
+    numpy_model = NCFModel.load(weights_path)
+
+    rng = np.random.default_rng(seed)
+    user_indices = rng.integers(0, numpy_model.user_embedding.shape[0], size=n_samples)
+    movie_indices = rng.integers(0, numpy_model.movie_embedding.shape[0], size=n_samples)
+
+    expected = keras_model.predict([user_indices, movie_indices], verbose=0).flatten()
+    actual = numpy_model.predict([user_indices, movie_indices]).flatten()
+    max_error = float(np.max(np.abs(expected - actual)))
+    return max_error
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'export'
+    if command == 'export':
+        print(f"Exporting weights from '{MODEL_PATH}'...")
+        path = export_weights()
+        print(f"SUCCESS: Wrote '{path}' ({os.path.getsize(path) / 1024:.0f} KB).")
+    elif command == 'verify':
+        max_error = verify()
+        status = "OK" if max_error <= PREDICTION_TOLERANCE else "FAILED"
+        print(f"{status}: max |keras - numpy| = {max_error:.2e} (tolerance {PREDICTION_TOLERANCE:.0e})")
+        if status != "OK":
+            sys.exit(1)
+    else:
+        print("Usage: python ncf_engine.py [export|verify]")
+        sys.exit(1)
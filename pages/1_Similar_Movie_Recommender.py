@@ -1,13 +1,15 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import sqlite3
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from similarity_index import similar_movie_ids, similar_movie_ids_live
 import yaml
 from yaml.loader import SafeLoader
-import time
-import html
+from catalog import get_catalog, refresh_catalog
+from ncf_engine import load_ncf_model, load_mappings
+from user_foldin import refresh_user_vector
+from rating_queue import get_rating_queue
+from recommender import model_version
+from rec_client import get_rec_client, movie_details as lookup_movie_details
+from poster_grid import poster_grid
 
 # --- Security: Add the "Guard Clause" ---
 if "authentication_status" not in st.session_state or st.session_state["authentication_status"] != True:
@@ -16,26 +18,6 @@ if "authentication_status" not in st.session_state or st.session_state["authenti
     
 st.set_page_config(layout="wide", page_title="Movie Explorer")
 
-# --- CSS for clean layout ---
-st.markdown("""
-    <style>
-    .movie-title {
-        text-align: center;
-        font-size: 1em;
-        font-weight: bold;
-        white-space: normal;
-        height: 3.5em; /* Allows for 2-3 lines of title */
-        margin-top: 10px;
-    }
-    .movie-details {
-        font-size: 0.8em;
-        color: gray;
-        text-align: center;
-        white-space: normal;
-    }
-    </style>
-""", unsafe_allow_html=True)
-
 # --- Load Config to get User ID ---
 with open('config.yaml') as file:
     config = yaml.load(file, Loader=SafeLoader)
@@ -51,22 +33,16 @@ except KeyError:
         current_user_id = 1
 
 # --- Data Loading ---
-@st.cache_data
-def load_movie_data():
-    con = sqlite3.connect('movies.db')
-    movies_df = pd.read_sql_query("SELECT * FROM movies", con)
-    ratings_df = pd.read_sql_query("SELECT * FROM ratings", con)
-    con.close()
-    average_ratings = ratings_df.groupby('movieId')['rating'].mean().reset_index()
-    rating_counts = ratings_df.groupby('movieId').size().reset_index(name='ratings_count')
-    movies_df = pd.merge(movies_df, average_ratings, on='movieId', how='left')
-    movies_df = pd.merge(movies_df, rating_counts, on='movieId', how='left')
-    movies_df['rating'] = movies_df['rating'].fillna(0)
-    movies_df['ratings_count'] = movies_df['ratings_count'].fillna(0).astype(int)
-    movies_df['ratings_count'] = np.random.randint(50, 5000, size=len(movies_df))
-    return movies_df
+catalog = get_catalog()
+movies_df = catalog.movies
+# Set when REC_SERVER_URL points at rec_server.py: it does the writes and the lookups
+rec_client = get_rec_client()
 
-movies_df = load_movie_data()
+@st.cache_resource(max_entries=1)
+def load_foldin_resources(model_key):
+    # Keyed on the model files: after a retrain, fold-ins must use the new weights and mappings
+    user_to_index, movie_to_index = load_mappings()
+    return load_ncf_model(), user_to_index, movie_to_index
 
 # --- Main Page ---
 st.title("🔍 Movie Explorer & Rating Tool")
@@ -77,7 +53,8 @@ st.header("Rate a Movie")
 # (This section is unchanged and correct)
 search_term = st.text_input("Search for a movie you've seen:")
 if search_term:
-    search_results = movies_df[movies_df['title'].str.contains(search_term, case=False)]
+    # Indexed lookup: prefix and substring matches first, then close typos
+    search_results = movies_df.iloc[catalog.title_index.search(search_term, k=50)]
     if not search_results.empty:
         selected_movie_to_rate = st.selectbox("Select the movie you want to rate:", search_results['title'])
         if selected_movie_to_rate:
@@ -91,15 +68,20 @@ if search_term:
                 st.write(movie_details['genres'])
                 rating = st.slider("Your Rating (from 0.5 to 5.0):", 0.5, 5.0, 3.0, 0.5)
                 if st.button("Submit Your Rating"):
-                    new_rating_row = {'userId': current_user_id, 'movieId': int(movie_id_to_rate), 'rating': rating, 'timestamp': int(time.time())}
                     try:
-                        con = sqlite3.connect('movies.db')
-                        cursor = con.cursor()
-                        cursor.execute("INSERT INTO ratings (userId, movieId, rating, timestamp) VALUES (?, ?, ?, ?)",(new_rating_row['userId'], new_rating_row['movieId'], new_rating_row['rating'], new_rating_row['timestamp']))
-                        con.commit()
-                        con.close()
+                        if rec_client is not None:
+                            # The server stores it and folds it into the user's embedding
+                            rec_client.rate(current_user_id, int(movie_id_to_rate), rating)
+                            refresh_catalog()
+                        else:
+                            # Batched with other sessions' ratings by the background writer; wait until it is committed
+                            get_rating_queue().submit(current_user_id, int(movie_id_to_rate), rating).result(timeout=10)
+                            refresh_catalog()
+                            # Fold the new rating into the user's embedding (no retraining needed)
+                            foldin_model, user_to_index, movie_to_index = load_foldin_resources(model_version())
+                            refresh_user_vector(foldin_model, movie_to_index, current_user_id, user_to_index)
                         st.success(f"Successfully rated '{selected_movie_to_rate}' as {rating} stars!")
-                        st.info("Your new rating is saved! It will now appear in your 'My Profile' page.")
+                        st.info("Your new rating is saved! Your Home recommendations and 'My Profile' page already reflect it.")
                     except Exception as e:
                         st.error(f"An error occurred while saving your rating: {e}")
     else:
@@ -108,41 +90,23 @@ st.divider()
 
 # --- 2. Content-Based Filtering ---
 st.header("Find Similar Movies")
-tfidf = TfidfVectorizer(stop_words='english')
-tfidf_matrix = tfidf.fit_transform(movies_df['genres'])
-cosine_sim = cosine_similarity(tfidf_matrix, tfidf_matrix)
-indices = pd.Series(movies_df.index, index=movies_df['title']).drop_duplicates()
+indices = pd.Series(movies_df['movieId'].values, index=movies_df['title']).drop_duplicates()
 
 movie_list = movies_df['title'].tolist()
 selected_movie = st.selectbox("Select a movie to find similar ones:", movie_list)
 
 if st.button("Find Similar Movies"):
     try:
-        idx = indices[selected_movie]
-        sim_scores = list(enumerate(cosine_sim[idx]))
-        sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-        sim_scores = sim_scores[1:11] 
-        movie_indices = [i[0] for i in sim_scores]
-        similar_movies = movies_df.iloc[movie_indices]
+        selected_movie_id = indices[selected_movie]
+        # Precomputed top-k neighbours (similarity_index.py); a few spare in case movies were deleted
+        if rec_client is not None:
+            similar_ids = rec_client.similar(selected_movie_id, k=20)
+        else:
+            similar_ids = similar_movie_ids(selected_movie_id, k=20)
+            if not similar_ids:
+                similar_ids = similar_movie_ids_live(movies_df, selected_movie_id, k=20)
+        similar_movies = lookup_movie_details(similar_ids, movies_df)
 
-        st.subheader(f"Movies similar to '{selected_movie}':")
-        
-        # --- THIS IS THE UPDATED DISPLAY LOGIC ---
-        cols = st.columns(5)
-        for idx, row in similar_movies.head(10).reset_index().iterrows():
-            with cols[idx % 5]:
-                st.image(row['poster_url'], use_container_width=True)
-                safe_title = html.escape(row['title'])
-                year = row.get('year', '')
-                genres = row.get('genres', '').replace('|', ', ')
-                rating = row.get('rating', 0)
-                ratings_count = row.get('ratings_count', 0)
-                st.markdown(f"<p class='movie-title'>{safe_title}</p>", unsafe_allow_html=True)
-                st.markdown(f"""
-                    <div class='movie-details'>
-                        <div><i>{genres}</i></div>
-                        ⭐ {rating:.2f} ({int(ratings_count)} ratings)<br>
-                    </div>
-                """, unsafe_allow_html=True)
+        poster_grid(similar_movies.head(10), title=f"Movies similar to '{selected_movie}':")
     except KeyError:
         st.error("Movie not found in the dataset. Please try another one.")
\ No newline at end of file
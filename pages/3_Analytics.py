@@ -3,7 +3,7 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import sqlite3
+from catalog import get_catalog, user_ratings
 import yaml
 from yaml.loader import SafeLoader
 
@@ -18,18 +18,9 @@ st.set_page_config(layout="wide", page_title="Analytics")
 st.title(f"📊 Analytics for {st.session_state['name']}")
 st.markdown("Here's a deep dive into your unique movie taste!")
 
-# --- Helper Function to Load Data ---
-# We cache this to keep it fast
-# @st.cache_data
-# In pages/3_My_Profile_&_Analytics.py
-def load_data():
-    con = sqlite3.connect('movies.db')
-    movies_df = pd.read_sql_query("SELECT * FROM movies", con)
-    ratings_df = pd.read_sql_query("SELECT * FROM ratings", con)
-    con.close()
-    return movies_df, ratings_df
-
-movies_df, ratings_df = load_data()
+# --- Load Data (shared, cached catalog) ---
+catalog = get_catalog()
+movies_df = catalog.movies[['movieId', 'title', 'genres', 'poster_url']]
 
 # REPLACE IT WITH THIS CORRECT LOGIC:
 with open('config.yaml') as file:
@@ -40,8 +31,8 @@ with open('config.yaml') as file:
 current_user_name = st.session_state['username']
 current_user_id = config['credentials']['usernames'][current_user_name]['user_id']
 
-# Filter all ratings for just this user
-user_ratings_df = ratings_df[ratings_df['userId'] == current_user_id]
+# This user's ratings, read fresh (catalog.ratings is as of the last catalog reload)
+user_ratings_df = user_ratings(current_user_id)
 if user_ratings_df.empty:
     st.info("You haven't rated any movies yet. Your analytics will appear here once you do!")
     st.stop()
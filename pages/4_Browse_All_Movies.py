@@ -1,9 +1,8 @@
 import streamlit as st
-import pandas as pd
-import sqlite3
-import html
 import string
-import numpy as np
+from catalog import get_catalog
+from poster_grid import poster_grid
+from poster_cache import request_prefetch
 
 # --- Security: Add the "Guard Clause" ---
 if "authentication_status" not in st.session_state or st.session_state["authentication_status"] != True:
@@ -13,43 +12,9 @@ if "authentication_status" not in st.session_state or st.session_state["authenti
 # --- Page Config ---
 st.set_page_config(layout="wide", page_title="Browse All Movies")
 
-# --- CSS for clean layout ---
-st.markdown("""
-    <style>
-    .movie-title {
-        text-align: center;
-        font-size: 1em;
-        font-weight: bold;
-        white-space: normal;
-        height: 3.5em;
-        margin-top: 10px;
-    }
-    .movie-details {
-        font-size: 0.8em;
-        color: gray;
-        text-align: center;
-        white-space: normal;
-    }
-    </style>
-""", unsafe_allow_html=True)
-
 # --- Data Loading ---
-@st.cache_data
-def load_movie_data():
-    con = sqlite3.connect('movies.db')
-    movies_df = pd.read_sql_query("SELECT * FROM movies", con)
-    ratings_df = pd.read_sql_query("SELECT * FROM ratings", con)
-    con.close()
-    average_ratings = ratings_df.groupby('movieId')['rating'].mean().reset_index()
-    rating_counts = ratings_df.groupby('movieId').size().reset_index(name='ratings_count')
-    movies_df = pd.merge(movies_df, average_ratings, on='movieId', how='left')
-    movies_df = pd.merge(movies_df, rating_counts, on='movieId', how='left')
-    movies_df['rating'] = movies_df['rating'].fillna(0)
-    movies_df['ratings_count'] = movies_df['ratings_count'].fillna(0).astype(int)
-    movies_df['ratings_count'] = np.random.randint(50, 5000, size=len(movies_df))
-    return movies_df
-
-movies_df = load_movie_data()
+catalog = get_catalog()
+movies_df = catalog.movies
 
 # --- Main Page ---
 st.title("🎬 Browse the Full Movie Catalog")
@@ -71,10 +36,11 @@ for i, letter in enumerate(alphabets):
 st.divider()
 
 # --- Apply Filtering ---
+# Titles are pre-sorted in the catalog's search index: a letter is one contiguous range
 if st.session_state.selected_letter == "ALL":
-    filtered_movies = movies_df.sort_values(by="title")
+    filtered_movies = movies_df.iloc[catalog.title_index.all_sorted()]
 else:
-    filtered_movies = movies_df[movies_df['title'].str.startswith(st.session_state.selected_letter)].sort_values(by="title")
+    filtered_movies = movies_df.iloc[catalog.title_index.starts_with(st.session_state.selected_letter)]
 
 # --- Pagination ---
 if 'browse_page' not in st.session_state:
@@ -90,23 +56,9 @@ st.write(f"Showing page **{st.session_state.browse_page + 1}** of **{total_pages
 if page_df.empty:
     st.warning("No movies found.")
 else:
-    # --- THIS IS THE UPDATED DISPLAY LOGIC ---
-    cols = st.columns(5)
-    for i, (index, row) in enumerate(page_df.iterrows()):
-        with cols[i % 5]:
-            st.image(row['poster_url'], use_container_width=True)
-            safe_title = html.escape(row['title'])
-            year = row.get('year', '')
-            genres = row.get('genres', '').replace('|', ', ')
-            rating = row.get('rating', 0)
-            ratings_count = row.get('ratings_count', 0)
-            st.markdown(f"<p class='movie-title'>{safe_title} ({year})</p>", unsafe_allow_html=True)
-            st.markdown(f"""
-                <div class='movie-details'>
-                    ⭐ {rating:.2f} ({int(ratings_count)} ratings)<br>
-                    <i>{genres}</i>
-                </div>
-            """, unsafe_allow_html=True)
+    poster_grid(page_df)
+    # Warm the poster cache for the likely next click (no-op without POSTER_CACHE_URL)
+    request_prefetch(filtered_movies['poster_path'].iloc[end_idx:end_idx + PAGE_SIZE])
 
 # --- Pagination Buttons ---
 st.divider()
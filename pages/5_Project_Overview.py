@@ -18,11 +18,11 @@ st.markdown("""
 The final application uses a professional, two-stage architecture that separates the slow, intensive model training from the fast, lightweight web application. This is a standard industry best practice for deploying machine learning systems.
 
 **1. Offline Training Phase:**
-A separate Python script (run in a Jupyter Notebook) acts as the "Model Trainer." This script performs the heavy lifting:
-- Connects to the curated SQLite database.
-- Prepares the entire dataset, creating user and movie indexes.
+A separate command-line script (`train_model.py`, first prototyped in a Jupyter Notebook) acts as the "Model Trainer." This script performs the heavy lifting:
+- Connects to the curated SQLite database and streams the ratings in chunks through a `tf.data` pipeline, so the table never has to fit in memory.
+- Creates the user and movie indexes and holds out a fixed validation split.
 - Builds and trains the complex TensorFlow/Keras Deep Learning model for the optimal number of epochs.
-- Saves the final, trained "AI brain" as a `.keras` file and the necessary data mappings as `.json` files.
+- Saves the final, trained "AI brain" as a `.keras` file and the necessary data mappings as `.json` files, together with a manifest of the data snapshot, timings and validation RMSE.
 
 **2. Online Inference Phase (The Streamlit App):**
 The Streamlit application itself is the "inference" engine. It's designed to be fast and responsive:
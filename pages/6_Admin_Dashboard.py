@@ -4,7 +4,8 @@ import streamlit as st
 import yaml
 from yaml.loader import SafeLoader
 import pandas as pd
-import sqlite3
+from db import connect
+from catalog import get_catalog, refresh_catalog
 
 # --- ADMIN-ONLY GUARD CLAUSE ---
 if "role" not in st.session_state or st.session_state["role"] != "admin":
@@ -26,15 +27,14 @@ st.divider()
 # --- Platform Statistics (Same as before) ---
 st.header("Platform Statistics")
 try:
-    con = sqlite3.connect('movies.db')
-    ratings_df = pd.read_sql_query("SELECT * FROM ratings", con)
-    movies_df = pd.read_sql_query("SELECT * FROM movies", con)
-    con.close()
+    catalog = get_catalog()
+    movies_df = catalog.movies
     
     kpi1, kpi2, kpi3 = st.columns(3)
     kpi1.metric("Total Registered Users", len(users))
     kpi2.metric("Total Movies in Database", len(movies_df))
-    kpi3.metric("Total Ratings Submitted", len(ratings_df))
+    # Current per-movie counts (movie_stats), not the ratings frame of the last reload
+    kpi3.metric("Total Ratings Submitted", int(catalog.popularity.sum()))
 except Exception as e:
     st.error(f"Could not load platform stats: {e}")
 
@@ -84,18 +84,16 @@ with st.expander("⚠️ Delete a Movie"):
     
     if movie_title_to_delete:
         try:
-            con = sqlite3.connect('movies.db')
-            # Find matching movies
-            query = f"SELECT movieId, title FROM movies WHERE title LIKE ?"
-            search_results = pd.read_sql_query(query, con, params=(f'%{movie_title_to_delete}%',))
-            con.close()
+            # Find matching movies through the catalog's title index
+            catalog = get_catalog()
+            search_results = catalog.movies.iloc[catalog.title_index.search(movie_title_to_delete, k=50)][['movieId', 'title']]
 
             if not search_results.empty:
                 movie_to_delete_id = st.selectbox("Select the exact movie to delete:", search_results['movieId'], format_func=lambda x: search_results[search_results['movieId'] == x]['title'].iloc[0])
                 
                 if st.button("Delete Movie Permanently", type="primary"):
                     with st.spinner(f"Deleting movie ID {movie_to_delete_id} and all its ratings..."):
-                        con = sqlite3.connect('movies.db')
+                        con = connect()
                         cursor = con.cursor()
                         # Delete ratings for this movie
                         cursor.execute("DELETE FROM ratings WHERE movieId = ?", (movie_to_delete_id,))
@@ -105,8 +103,10 @@ with st.expander("⚠️ Delete a Movie"):
                         movies_deleted = cursor.rowcount
                         con.commit()
                         con.close()
+                        refresh_catalog()
                         st.success(f"Deleted {ratings_deleted} ratings and {movies_deleted} movie record.")
-                        st.warning("IMPORTANT: Your AI model is now out of sync. You must re-run your 'Model Trainer' script to update the AI.")
+                        # --incremental only adds ratings newer than the last build; it never sees a deleted movie
+                        st.warning("IMPORTANT: Your AI model is now out of sync. Run the full Model Trainer (`python train_model.py`) to rebuild it without this movie; `--incremental` only picks up new ratings.")
                         st.rerun()
             else:
                 st.warning("No movies found with that title.")
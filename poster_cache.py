@@ -0,0 +1,450 @@
+# poster_cache.py
+#
+# Local poster cache and thumbnail service, so a page of cards does not
+# depend on the remote CDN for every image:
+#  - PosterStore: content-addressed files on disk (blobs/<sha256>, identical
+#    images stored once) with an SQLite index of poster_path -> digest.
+#    Every hit refreshes the blob's last use; once the store (originals and
+#    their thumbnails) grows past max_bytes, least recently used blobs are
+#    evicted until it is back under LOW_WATER of the limit;
+#  - PosterFetcher: an asyncio loop on its own thread pulls posters from the
+#    origin by poster_path, at most `concurrency` downloads at a time
+#    (asyncio.Semaphore); concurrent requests for one path share a download;
+#  - the server (`python poster_cache.py serve`): GET /poster/<poster_path>?w=200
+#    returns a cached thumbnail (fetched on a miss) with long-lived cache
+#    headers; POST /prefetch queues paths without waiting. Thumbnails are
+#    resized with Pillow if it is installed, otherwise the original is sent.
+# With POSTER_CACHE_URL set, poster_grid.py points cards at this server and
+# the Browse pages ask it to prefetch the next page's posters.
+#
+# Usage (from the project folder):
+#   python poster_cache.py serve                 # http://127.0.0.1:8601
+#   python poster_cache.py serve --max-mb 256 --origin https://image.tmdb.org/t/p/w500
+#   python poster_cache.py stats
+#   POSTER_CACHE_URL=http://127.0.0.1:8601 streamlit run Home.py
+
+import io
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import argparse
+import threading
+import http.client
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FetchTimeoutError
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+
+CACHE_DIR = 'poster_cache'
+ORIGIN = 'https://image.tmdb.org/t/p/w500'
+HOST = '127.0.0.1'
+PORT = 8601
+POSTER_CACHE_URL_ENV = 'POSTER_CACHE_URL'
+
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+LOW_WATER = 0.9                 # evict down to this share of the limit, not just under it
+MAX_POSTER_BYTES = 5 * 1024 * 1024
+MAX_CONCURRENT_FETCHES = 8
+FETCH_TIMEOUT = 10.0
+THUMB_WIDTHS = (100, 200, 300)  # requests snap to one of these, so thumbnails stay bounded
+THUMB_WIDTH = 200
+THUMB_QUALITY = 85
+# TMDB-style paths only ("/abc123.jpg"): no traversal, no arbitrary URLs
+POSTER_PATH = re.compile(r'^/[A-Za-z0-9_-]+\.(jpg|jpeg|png|webp)$')
+CONTENT_TYPES = {b'\xff\xd8': 'image/jpeg', b'\x89P': 'image/png', b'RI': 'image/webp'}
+
+
+def valid_poster_path(poster_path):
+    return isinstance(poster_path, str) and POSTER_PATH.match(poster_path) is not None
+
+
+def content_type(data):
+    return CONTENT_TYPES.get(data[:2], 'application/octet-stream')
+
+
+def make_thumbnail(data, width):
+    """JPEG `width` pixels wide (aspect kept, never upscaled), or None without Pillow.
+
+    Raises OSError (PIL.UnidentifiedImageError) if `data` is not a decodable image.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    with Image.open(io.BytesIO(data)) as image:
+        image.thumbnail((width, width * 4), Image.LANCZOS)
+        out = io.BytesIO()
+        image.convert('RGB').save(out, 'JPEG', quality=THUMB_QUALITY, optimize=True)
+    return out.getvalue()
+
+
+# --- 1. Content-addressed store ---
+class PosterStore:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(cache_dir, 'blobs'), exist_ok=True)
+        os.makedirs(os.path.join(cache_dir, 'thumbs'), exist_ok=True)
+        # One connection shared by the server and fetcher threads, serialized by the lock
+        self._con = sqlite3.connect(os.path.join(cache_dir, 'index.db'), check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode = WAL")
+        self._con.execute("PRAGMA synchronous = NORMAL")
+        self._con.executescript("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,          -- original plus its thumbnails, in bytes
+                last_used REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS posters (
+                poster_path TEXT PRIMARY KEY,
+                digest TEXT NOT NULL REFERENCES blobs (digest)
+            );
+            CREATE INDEX IF NOT EXISTS idx_posters_digest ON posters (digest);
+            CREATE INDEX IF NOT EXISTS idx_blobs_last_used ON blobs (last_used);
+        """)
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _blob_path(self, digest):
+        return os.path.join(self.cache_dir, 'blobs', digest)
+
+    def _thumb_path(self, digest, width):
+        return os.path.join(self.cache_dir, 'thumbs', f"{digest}-w{width}.jpg")
+
+    def _write_file(self, path, data):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def digest_for(self, poster_path):
+        with self._lock:
+            row = self._con.execute("SELECT digest FROM posters WHERE poster_path = ?", (poster_path,)).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, poster_path, data):
+        """Store a downloaded original; returns its digest. ValueError if `data` is not an image."""
+        if data[:2] not in CONTENT_TYPES:
+            raise ValueError("not a JPEG, PNG or WebP image")
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if self._con.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone() is None:
+                self._write_file(self._blob_path(digest), data)
+                self._con.execute("INSERT INTO blobs (digest, size, last_used) VALUES (?, ?, ?)", (digest, len(data), time.time()))
+            self._con.execute("INSERT OR REPLACE INTO posters (poster_path, digest) VALUES (?, ?)", (poster_path, digest))
+            self._con.commit()
+            self._evict()
+        return digest
+
+    def read(self, digest, width=None):
+        """Original (width=None) or thumbnail bytes of a blob, or None if it was evicted."""
+        with self._lock:
+            row = self._con.execute("SELECT size FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if row is None:
+                return None
+            self._con.execute("UPDATE blobs SET last_used = ? WHERE digest = ?", (time.time(), digest))
+            self._con.commit()
+        path = self._blob_path(digest) if width is None else self._thumb_path(digest, width)
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def thumbnail(self, digest, width):
+        """Thumbnail bytes, made and stored on first use; the original if Pillow is missing."""
+        data = self.read(digest, width)
+        if data is not None:
+            return data
+        original = self.read(digest)
+        if original is None:
+            return None
+        try:
+            thumb = make_thumbnail(original, width)
+        except OSError:
+            # Stored but undecodable: drop it, so the next request downloads it again
+            self.discard(digest)
+            return None
+        if thumb is None:
+            return original
+        self.add_thumbnail(digest, width, thumb)
+        return thumb
+
+    def add_thumbnail(self, digest, width, thumb):
+        with self._lock:
+            if self._con.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone() is not None:
+                path = self._thumb_path(digest, width)
+                # A regenerated thumbnail replaces the old file: count only the difference
+                old_size = os.path.getsize(path) if os.path.exists(path) else 0
+                self._write_file(path, thumb)
+                self._con.execute("UPDATE blobs SET size = size + ? WHERE digest = ?", (len(thumb) - old_size, digest))
+                self._con.commit()
+                self._evict()
+
+    def _remove_blob(self, digest):
+        """Files and rows of one blob and the poster paths pointing at it (caller holds the lock)."""
+        for width in THUMB_WIDTHS:
+            if os.path.exists(self._thumb_path(digest, width)):
+                os.remove(self._thumb_path(digest, width))
+        if os.path.exists(self._blob_path(digest)):
+            os.remove(self._blob_path(digest))
+        self._con.execute("DELETE FROM posters WHERE digest = ?", (digest,))
+        self._con.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+
+    def discard(self, digest):
+        with self._lock:
+            self._remove_blob(digest)
+            self._con.commit()
+
+    def _evict(self):
+        """LRU eviction down to LOW_WATER * max_bytes (caller holds the lock)."""
+        total = self._con.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * LOW_WATER
+        for digest, size in self._con.execute("SELECT digest, size FROM blobs ORDER BY last_used").fetchall():
+            if total <= target:
+                break
+            self._remove_blob(digest)
+            total -= size
+            self.evictions += 1
+        self._con.commit()
+
+    def stats(self):
+        with self._lock:
+            n_blobs, total = self._con.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+            n_posters = self._con.execute("SELECT COUNT(*) FROM posters").fetchone()[0]
+        return {'posters': n_posters, 'blobs': n_blobs, 'bytes': total, 'max_bytes': self.max_bytes, 'evictions': self.evictions}
+
+    def close(self):
+        with self._lock:
+            self._con.close()
+
+
+# --- 2. Async fetcher ---
+class PosterFetcher:
+    """Downloads into a PosterStore from an event loop on its own thread; callable from any thread."""
+
+    def __init__(self, store, origin=ORIGIN, concurrency=MAX_CONCURRENT_FETCHES, timeout=FETCH_TIMEOUT):
+        self.store = store
+        self.origin = origin.rstrip('/')
+        self.timeout = timeout
+        self.fetched = 0
+        self.failed = 0
+        self._inflight = {}
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # Blocking downloads run here; the semaphore keeps at most `concurrency` of them busy
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='poster-fetch')
+        self._thread = threading.Thread(target=self._loop.run_forever, name='poster-fetcher', daemon=True)
+        self._thread.start()
+
+    def _download(self, poster_path):
+        with urllib.request.urlopen(self.origin + poster_path, timeout=self.timeout) as response:
+            data = response.read(MAX_POSTER_BYTES + 1)
+        if len(data) > MAX_POSTER_BYTES:
+            raise ValueError(f"poster larger than {MAX_POSTER_BYTES} bytes")
+        return data
+
+    def _store_with_thumbnail(self, poster_path, data):
+        # The grid's thumbnail is made first: a body that does not decode (an HTML
+        # error page, a truncated file) raises here and never enters the store,
+        # and a prefetched page is then served straight from disk
+        thumb = make_thumbnail(data, THUMB_WIDTH)
+        digest = self.store.put(poster_path, data)
+        if thumb is not None:
+            self.store.add_thumbnail(digest, THUMB_WIDTH, thumb)
+        return digest
+
+    async def _fetch_one(self, poster_path):
+        digest = self.store.digest_for(poster_path)
+        if digest is not None:
+            return digest
+        if poster_path not in self._inflight:
+            self._inflight[poster_path] = asyncio.ensure_future(self._download_and_store(poster_path))
+        return await asyncio.shield(self._inflight[poster_path])
+
+    async def _download_and_store(self, poster_path):
+        try:
+            async with self._semaphore:
+                data = await self._loop.run_in_executor(self._executor, self._download, poster_path)
+            digest = await self._loop.run_in_executor(self._executor, self._store_with_thumbnail, poster_path, data)
+            self.fetched += 1
+            return digest
+        # HTTPException: e.g. IncompleteRead when the CDN cuts a body short
+        except (OSError, ValueError, urllib.error.URLError, http.client.HTTPException):
+            self.failed += 1
+            return None
+        finally:
+            self._inflight.pop(poster_path, None)
+
+    async def fetch_many(self, poster_paths):
+        """Digests (None where the download failed), in the order of `poster_paths`."""
+        return await asyncio.gather(*(self._fetch_one(p) for p in poster_paths))
+
+    def fetch(self, poster_paths, timeout=None):
+        """Blocking: fetch what is missing and wait for it."""
+        return asyncio.run_coroutine_threadsafe(self.fetch_many(list(poster_paths)), self._loop).result(timeout)
+
+    def prefetch(self, poster_paths):
+        """Queue downloads and return at once."""
+        asyncio.run_coroutine_threadsafe(self.fetch_many(list(poster_paths)), self._loop)
+
+    def stats(self):
+        return {'fetched': self.fetched, 'failed': self.failed, 'in_flight': len(self._inflight)}
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._executor.shutdown(wait=False)
+
+
+# --- 3. Thumbnail server ---
+class PosterRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    fetcher = None
+
+    def _send(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload).encode(), {'Content-Type': 'application/json'})
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        elif url.path == '/stats':
+            self._send_json(200, {'store': self.fetcher.store.stats(), 'fetcher': self.fetcher.stats()})
+        elif url.path.startswith('/poster/'):
+            self._poster(url.path[len('/poster'):], parse_qs(url.query))
+        else:
+            self._send_json(404, {'error': f"unknown path '{url.path}'"})
+
+    def _poster(self, poster_path, params):
+        if not valid_poster_path(poster_path):
+            self._send_json(404, {'error': 'not a poster path'})
+            return
+        try:
+            requested = int(params.get('w', [THUMB_WIDTH])[0])
+        except ValueError:
+            requested = THUMB_WIDTH
+        width = min(THUMB_WIDTHS, key=lambda w: abs(w - requested))
+
+        try:
+            digest = self.fetcher.fetch([poster_path], timeout=self.fetcher.timeout * 2)[0]
+            data = None if digest is None else self.fetcher.store.thumbnail(digest, width)
+        except (OSError, FetchTimeoutError, http.client.HTTPException):
+            digest, data = None, None
+        if data is None:
+            self._send_json(502, {'error': 'poster unavailable'})
+            return
+        etag = f'"{digest}-w{width}"'
+        headers = {'ETag': etag, 'Cache-Control': 'public, max-age=31536000, immutable'}
+        if self.headers.get('If-None-Match') == etag:
+            self._send(304, headers=headers)
+            return
+        headers['Content-Type'] = content_type(data)
+        self._send(200, data, headers)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if urlsplit(self.path).path != '/prefetch':
+            self._send_json(404, {'error': f"unknown path '{self.path}'"})
+            return
+        try:
+            poster_paths = [p for p in json.loads(body or b'{}').get('poster_paths', []) if valid_poster_path(p)]
+        except (ValueError, AttributeError):
+            self._send_json(400, {'error': 'expected {"poster_paths": [...]}'})
+            return
+        self.fetcher.prefetch(poster_paths)
+        self._send_json(202, {'queued': len(poster_paths)})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host=HOST, port=PORT, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, origin=ORIGIN,
+                concurrency=MAX_CONCURRENT_FETCHES):
+    fetcher = PosterFetcher(PosterStore(cache_dir, max_bytes), origin=origin, concurrency=concurrency)
+    handler = type('BoundPosterRequestHandler', (PosterRequestHandler,), {'fetcher': fetcher})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+# --- 4. From the app ---
+_prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='poster-prefetch')
+
+
+def poster_cache_url():
+    """Base URL of the poster server, or None when the app uses the remote posters directly."""
+    return os.environ.get(POSTER_CACHE_URL_ENV) or None
+
+
+def local_poster_urls(poster_paths, fallback_urls, base_url, width=THUMB_WIDTH):
+    """Thumbnail URLs on the poster server for a whole column; `fallback_urls` where a path is unusable."""
+    paths = np.asarray(poster_paths, dtype=object)
+    usable = np.array([valid_poster_path(p) for p in paths], dtype=bool)
+    local = f"{base_url.rstrip('/')}/poster" + np.where(usable, paths, '').astype(object) + f"?w={int(width)}"
+    return np.where(usable, local, np.asarray(fallback_urls, dtype=object))
+
+
+def _post_prefetch(base_url, poster_paths):
+    body = json.dumps({'poster_paths': poster_paths}).encode()
+    request = urllib.request.Request(f"{base_url.rstrip('/')}/prefetch", data=body, method='POST',
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        urllib.request.urlopen(request, timeout=2).close()
+    except OSError:
+        # Prefetching is best effort: the page still loads its posters on demand
+        pass
+
+
+def request_prefetch(poster_paths, base_url=None):
+    """Ask the poster server to fetch these posters in the background; returns at once."""
+    base_url = base_url or poster_cache_url()
+    poster_paths = [p for p in poster_paths if valid_poster_path(p)]
+    if base_url and poster_paths:
+        _prefetch_pool.submit(_post_prefetch, base_url, poster_paths)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local poster cache and thumbnail server.")
+    parser.add_argument('command', choices=['serve', 'stats'])
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--max-mb', type=float, default=MAX_CACHE_BYTES / 1024 / 1024)
+    parser.add_argument('--origin', default=ORIGIN)
+    parser.add_argument('--concurrency', type=int, default=MAX_CONCURRENT_FETCHES)
+    args = parser.parse_args()
+
+    max_bytes = int(args.max_mb * 1024 * 1024)
+    if args.command == 'stats':
+        store = PosterStore(args.cache_dir, max_bytes)
+        print(json.dumps(store.stats(), indent=2))
+        store.close()
+        sys.exit(0)
+    server = make_server(args.host, args.port, args.cache_dir, max_bytes, args.origin, args.concurrency)
+    print(f"SUCCESS: Serving posters on http://{args.host}:{server.server_port} from '{args.cache_dir}/' "
+          f"(origin {args.origin}). Ctrl+C to stop.", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
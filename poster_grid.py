@@ -0,0 +1,80 @@
+# poster_grid.py
+#
+# The movie-card grid shared by Home.py and the pages. A page of cards
+# used to be 3-4 Streamlit elements per movie (st.image + st.markdown inside
+# st.columns, built row by row with iterrows), i.e. 60-80 frontend messages
+# for 20 cards. Here the whole grid is ONE st.markdown block:
+#  - the HTML is built column-wise: escaping, number formatting and string
+#    concatenation each run once over a whole column (np.char and
+#    object-array +), not once per row;
+#  - the layout is a CSS grid (GRID_CSS, sent with the block), so it needs
+#    no st.columns containers;
+#  - images are plain <img loading="lazy"> tags, so the browser fetches
+#    them as they scroll into view. With POSTER_CACHE_URL set they come from
+#    the local thumbnail server (poster_cache.py) instead of the remote CDN.
+#
+# Usage (from a page):
+#   from poster_grid import poster_grid
+#   poster_grid(page_df)                                  # title, genres, rating and count
+#   poster_grid(top_recs, title="For you", show_count=False)
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from poster_cache import poster_cache_url, local_poster_urls
+
+N_COLUMNS = 5
+# html.escape(), plus '$' so Markdown never reads a title as math
+HTML_ENTITIES = [('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;'), ("'", '&#x27;'), ('$', '&#36;')]
+
+GRID_CSS = """<style>
+.pg-grid {display: grid; grid-template-columns: repeat(var(--pg-columns), minmax(0, 1fr)); gap: 1.5rem 1rem; margin-bottom: 1.5rem;}
+.pg-card {text-align: center; min-width: 0;}
+.pg-card img {width: 100%; aspect-ratio: 2 / 3; object-fit: cover; border-radius: 0.5rem; background: #262730;}
+.pg-title {font-size: 1em; font-weight: bold; white-space: normal; height: 3.5em; overflow: hidden; margin: 10px 0 0 0;}
+.pg-details {font-size: 0.8em; color: gray; white-space: normal;}
+</style>"""
+
+
+def escape_column(values):
+    """Escaped text of a whole column, as an object array (missing values become '')."""
+    text = np.asarray(values, dtype=object)
+    text = np.where(pd.isna(text), '', text).astype(str)
+    for char, entity in HTML_ENTITIES:
+        text = np.char.replace(text, char, entity)
+    return text.astype(object)
+
+
+def format_column(values, fmt):
+    """`fmt` % value over a whole numeric column (missing values as 0), as an object array."""
+    return np.char.mod(fmt, np.nan_to_num(np.asarray(values, dtype=np.float64))).astype(object)
+
+
+def cards_html(movies_df, n_columns=N_COLUMNS, show_genres=True, show_rating=True, show_count=True):
+    """The grid for every row of `movies_df` as one HTML string (no blank lines: Markdown passes it through whole)."""
+    if movies_df.empty:
+        return ''
+    titles = escape_column(movies_df['title'])
+    sources = movies_df['poster_url']
+    cache_url = poster_cache_url()
+    if cache_url and 'poster_path' in movies_df:
+        sources = local_poster_urls(movies_df['poster_path'], sources, cache_url)
+    cards = ('<div class="pg-card"><img src="' + escape_column(sources) + '" alt="' + titles
+             + '" loading="lazy"><p class="pg-title">' + titles + '</p><div class="pg-details">')
+    if show_genres and 'genres' in movies_df:
+        genres = np.char.replace(escape_column(movies_df['genres']).astype(str), '|', ', ').astype(object)
+        cards = cards + '<div><i>' + genres + '</i></div>'
+    if show_rating:
+        cards = cards + '⭐ ' + format_column(movies_df['rating'], '%.2f')
+        if show_count:
+            cards = cards + ' (' + format_column(movies_df['ratings_count'], '%d') + ' ratings)'
+    cards = cards + '</div></div>'
+    return f'{GRID_CSS}<div class="pg-grid" style="--pg-columns: {int(n_columns)}">{"".join(cards)}</div>'
+
+
+def poster_grid(movies_df, title=None, n_columns=N_COLUMNS, **card_options):
+    """Render `movies_df` as a card grid: one st.markdown message (plus one for `title`)."""
+    if title is not None:
+        st.subheader(title)
+    st.markdown(cards_html(movies_df, n_columns, **card_options), unsafe_allow_html=True)
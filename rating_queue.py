@@ -0,0 +1,138 @@
+# rating_queue.py
+#
+# Write-behind ingest of new ratings for the app process. Opening a connection
+# and committing once per rating (the old Similar page handler) hits
+# "database is locked" and pays one fsync per rating when many sessions rate
+# at the same time. Instead:
+#  - submit() puts the rating on a thread-safe queue and returns a Future;
+#  - one background writer with a long-lived connection (busy_timeout from
+#    db.connect) collects everything that arrives within FLUSH_INTERVAL and
+#    writes it in ONE transaction;
+#  - a re-rating of the same (userId, movieId) replaces the old rating
+#    (UPDATE, else INSERT) instead of adding a second row, and repeats within
+#    one batch collapse to the latest;
+#  - each Future resolves once its batch is committed ('inserted' or
+#    'updated'), or carries the exception if the batch failed.
+# The movie_stats triggers see the UPDATE/INSERT as usual.
+#
+# Usage (from the app):
+#   from rating_queue import get_rating_queue
+#   get_rating_queue().submit(user_id, movie_id, 4.5).result(timeout=5)
+
+import time
+import queue
+import atexit
+import threading
+from concurrent.futures import Future
+
+from db import DB_PATH, connect
+
+FLUSH_INTERVAL = 0.005   # seconds the writer waits for more ratings before committing
+MAX_BATCH = 1_000
+BUSY_TIMEOUT = 10.0
+
+_STOP = object()
+
+
+class RatingQueue:
+    def __init__(self, db_path=DB_PATH, flush_interval=FLUSH_INTERVAL, max_batch=MAX_BATCH):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.stats = {'submitted': 0, 'written': 0, 'batches': 0, 'failed': 0}
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='rating-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, user_id, movie_id, rating, timestamp=None):
+        """Queue one rating; the returned Future resolves when it is committed."""
+        future = Future()
+        row = (int(user_id), int(movie_id), float(rating), int(time.time() if timestamp is None else timestamp))
+        self._queue.put((row, future))
+        self.stats['submitted'] += 1
+        return future
+
+    def close(self, timeout=None):
+        """Write everything already queued, then stop the writer."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    # --- Writer thread ---
+    def _next_batch(self):
+        """Block for the first item, then collect for flush_interval; (batch, stop requested)."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch, deadline = [first], time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _write(self, con, batch):
+        # Latest rating per (userId, movieId) wins; every caller's future gets the outcome
+        latest, waiting = {}, {}
+        for row, future in batch:
+            key = (row[0], row[1])
+            latest[key] = row
+            waiting.setdefault(key, []).append(future)
+
+        outcomes = {}
+        try:
+            with con:
+                for (user_id, movie_id), (_, _, rating, timestamp) in latest.items():
+                    cursor = con.execute("UPDATE ratings SET rating = ?, timestamp = ? WHERE userId = ? AND movieId = ?",
+                                         (rating, timestamp, user_id, movie_id))
+                    if cursor.rowcount:
+                        outcomes[(user_id, movie_id)] = 'updated'
+                    else:
+                        con.execute("INSERT INTO ratings (userId, movieId, rating, timestamp) VALUES (?, ?, ?, ?)",
+                                    (user_id, movie_id, rating, timestamp))
+                        outcomes[(user_id, movie_id)] = 'inserted'
+        except Exception as e:
+            self.stats['failed'] += len(batch)
+            for futures in waiting.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+
+        self.stats['written'] += len(latest)
+        self.stats['batches'] += 1
+        for key, futures in waiting.items():
+            for future in futures:
+                future.set_result(outcomes[key])
+
+    def _run(self):
+        con = connect(self.db_path, timeout=BUSY_TIMEOUT)
+        try:
+            stop = False
+            while not stop:
+                batch, stop = self._next_batch()
+                if batch:
+                    self._write(con, batch)
+        finally:
+            con.close()
+
+
+# --- One queue per database for the whole app process ---
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_rating_queue(db_path=DB_PATH):
+    with _queues_lock:
+        if db_path not in _queues:
+            _queues[db_path] = RatingQueue(db_path)
+        return _queues[db_path]
+
+
+@atexit.register
+def _close_all():
+    for rating_queue in list(_queues.values()):
+        rating_queue.close(timeout=5)
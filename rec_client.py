@@ -0,0 +1,130 @@
+# rec_client.py
+#
+# Thin client for rec_server.py. When REC_SERVER_URL is set, Home.py and the
+# pages ask the server for recommendations, similar movies, genre pages and
+# rating writes instead of loading the model and writing to movies.db
+# themselves; unset, they keep doing it in-process.
+#  - one keep-alive HTTP/1.1 connection per thread (Streamlit runs each
+#    session in its own thread), reused across requests;
+#  - every request has a timeout; a connection the server closed while idle
+#    is reopened and the request retried once;
+#  - the server answers with ids and scores; recommendation_frame() and
+#    movie_details() join them with the local catalog's movie details.
+#
+# Usage (from the app):
+#   from rec_client import get_rec_client
+#   client = get_rec_client()          # None when REC_SERVER_URL is not set
+#   if client is not None:
+#       recs, is_ai_recs = client.recommendation_frame(user_id, movies_df, n=10)
+
+import os
+import json
+import threading
+import http.client
+import pandas as pd
+from urllib.parse import urlsplit, urlencode
+
+SERVER_URL_ENV = 'REC_SERVER_URL'
+TIMEOUT = 5.0
+
+
+class RecServiceError(Exception):
+    """The server answered with an error, or could not be reached."""
+
+
+class RecClient:
+    def __init__(self, base_url, timeout=TIMEOUT):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self, reconnect=False):
+        con = getattr(self._local, 'con', None)
+        if con is None or reconnect:
+            if con is not None:
+                con.close()
+            con = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.con = con
+        return con
+
+    def _request(self, method, path, params=None, payload=None):
+        if params:
+            path = f"{path}?{urlencode(params, doseq=True)}"
+        body = None if payload is None else json.dumps(payload).encode()
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        for attempt in range(2):
+            con = self._connection(reconnect=attempt > 0)
+            try:
+                con.request(method, path, body=body, headers=headers)
+                response = con.getresponse()
+                data = json.loads(response.read() or b'{}')
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                # The server dropped an idle keep-alive connection: reconnect once
+                if attempt > 0:
+                    raise RecServiceError(f"recommendation server unreachable: {e}") from e
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                con.close()
+                raise RecServiceError(f"recommendation server request failed: {e}") from e
+        if response.status != 200:
+            raise RecServiceError(f"{method} {path}: {response.status} {data.get('error', '')}")
+        return data
+
+    # --- Endpoints ---
+    def health(self):
+        return self._request('GET', '/health')
+
+    def metrics(self):
+        return self._request('GET', '/metrics')
+
+    def recommendations(self, user_id, n=10):
+        """([(movieId, predicted_rating), ...], is_ai_recs)"""
+        data = self._request('GET', '/recommendations', {'user_id': int(user_id), 'n': int(n)})
+        return [(item['movieId'], item['predicted_rating']) for item in data['items']], data['is_ai_recs']
+
+    def similar(self, movie_id, k=20):
+        return self._request('GET', '/similar', {'movie_id': int(movie_id), 'k': int(k)})['items']
+
+    def genre(self, genres, offset=0, limit=None):
+        """(number of movies with every genre, movieIds of the page in title order)"""
+        params = {'genre': list(genres), 'offset': int(offset)}
+        if limit is not None:
+            params['limit'] = int(limit)
+        data = self._request('GET', '/genre', params)
+        return data['total'], data['items']
+
+    def rate(self, user_id, movie_id, rating):
+        """Store a rating (and fold it into the user's vector); 'inserted' or 'updated'."""
+        payload = {'user_id': int(user_id), 'movie_id': int(movie_id), 'rating': float(rating)}
+        return self._request('POST', '/ratings', payload=payload)['result']
+
+    # --- Joined with the local catalog ---
+    def recommendation_frame(self, user_id, movies_df, n=10):
+        """(top-n frame merged with movie details, is_ai_recs), like recommender.recommend_for_user()."""
+        items, is_ai_recs = self.recommendations(user_id, n=n)
+        top_recs = pd.DataFrame(items, columns=['movieId', 'predicted_rating'])
+        return pd.merge(top_recs, movies_df, on='movieId', how='inner'), is_ai_recs
+
+
+def movie_details(movie_ids, movies_df):
+    """Catalog rows for `movie_ids`, in that order (ids no longer in the catalog are dropped)."""
+    return movies_df.set_index('movieId').reindex(movie_ids).dropna(subset=['title']).reset_index()
+
+
+# --- One client per app process ---
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_rec_client():
+    """The shared RecClient if REC_SERVER_URL is set, else None (the app works in-process)."""
+    global _client
+    url = os.environ.get(SERVER_URL_ENV)
+    if not url:
+        return None
+    with _client_lock:
+        if _client is None:
+            _client = RecClient(url)
+        return _client
@@ -0,0 +1,231 @@
+# rec_server.py
+#
+# Headless recommendation service: ONE process holds the model, the scoring
+# engine, the result cache, the inference scheduler and the rating writer,
+# and any number of Streamlit workers talk to it over HTTP (rec_client.py)
+# instead of each loading their own copy. Standard library only
+# (ThreadingHTTPServer, JSON bodies, HTTP/1.1 keep-alive).
+#
+# Endpoints:
+#   GET  /health                               status and data version
+#   GET  /metrics                              cache, scheduler and writer counters
+#   GET  /recommendations?user_id=1&n=10       {"is_ai_recs", "items": [{"movieId", "predicted_rating"}]}
+#   GET  /similar?movie_id=1&k=20              {"items": [movieId, ...]}
+#   GET  /genre?genre=Comedy&genre=Drama&offset=0&limit=15
+#                                              {"total", "items": [movieId, ...]} in title order
+#   POST /ratings  {"user_id", "movie_id", "rating"}  {"result": "inserted" | "updated"}
+# Responses carry ids and scores only; clients join them with their own
+# catalog (snapshot-mapped, so shared through the page cache anyway).
+# The loaded data follows db.data_version(), checked at most once per
+# RELOAD_CHECK_SECONDS: a movie change from any process, or a retrained
+# model (new weights, id mappings or ANN index), reloads the catalog and the
+# scoring resources; rating writes only move the result cache's keys.
+#
+# Usage (from the project folder):
+#   python rec_server.py                       # http://127.0.0.1:8600
+#   python rec_server.py --port 8700 --host 0.0.0.0
+#   REC_SERVER_URL=http://127.0.0.1:8600 streamlit run Home.py
+
+import json
+import time
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from db import DB_PATH, connect, data_version, structure_version
+from catalog import load_catalog
+from genre_index import has_all, mask_for
+from recommender import load_resources, recommend_cached, RecommendationCache, model_version
+from inference_scheduler import InferenceScheduler, batching_enabled
+from rating_queue import RatingQueue
+from similarity_index import similar_movie_ids, similar_movie_ids_live
+from user_foldin import refresh_user_vector
+
+HOST = '127.0.0.1'
+PORT = 8600
+RELOAD_CHECK_SECONDS = 1.0
+MAX_N = 100
+
+
+class RecService:
+    """Everything the endpoints need: one catalog, scoring engine, result cache, scheduler and rating writer."""
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self.cache = RecommendationCache()
+        # Live scoring is batched across requests only with INFERENCE_BATCHING=1 (see inference_scheduler.py)
+        self.scheduler = InferenceScheduler() if batching_enabled() else None
+        self.rating_queue = RatingQueue(db_path)
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self.version = None
+        self._loaded = None
+        self._reload()
+
+    def _reload(self):
+        con = connect(self.db_path)
+        try:
+            version = data_version(con)
+        finally:
+            con.close()
+        # A rater's fold-in vector and seen movies are read per request, so only a new
+        # database, changed movies or a retrained model need the scoring engine reloaded
+        loaded = (structure_version(version), model_version())
+        if loaded != self._loaded:
+            catalog = load_catalog(self.db_path)
+            self.catalog, self.resources, self._loaded = catalog, load_resources(catalog, db_path=self.db_path), loaded
+            # By title, for the genre endpoint's stable paging
+            self.title_order = catalog.title_index.all_sorted()
+        self.version = version
+
+    def current(self):
+        """(catalog, resources), reloaded first if the movies or the model changed."""
+        with self._lock:
+            if time.monotonic() - self._checked_at > RELOAD_CHECK_SECONDS:
+                self._reload()
+                self._checked_at = time.monotonic()
+            return self.catalog, self.resources
+
+    # --- Endpoints ---
+    def recommendations(self, user_id, n=10):
+        _, resources = self.current()
+        recs, is_ai_recs = recommend_cached(resources, self.cache, user_id, n=n, db_path=self.db_path, scheduler=self.scheduler)
+        items = [{'movieId': int(m), 'predicted_rating': round(float(r), 4)}
+                 for m, r in zip(recs['movieId'], recs['predicted_rating'])]
+        return {'user_id': user_id, 'is_ai_recs': bool(is_ai_recs), 'items': items}
+
+    def similar(self, movie_id, k=20):
+        catalog, _ = self.current()
+        ids = similar_movie_ids(movie_id, k=k, db_path=self.db_path)
+        if not ids and movie_id in set(catalog.movies['movieId'].tolist()):
+            ids = similar_movie_ids_live(catalog.movies, movie_id, k=k)
+        return {'movie_id': movie_id, 'items': [int(m) for m in ids]}
+
+    def genre(self, genres, offset=0, limit=None):
+        catalog, _ = self.current()
+        unknown = [genre for genre in genres if genre not in catalog.genres]
+        if not genres or unknown:
+            raise ValueError(f"unknown genres: {', '.join(unknown)}" if unknown else "missing parameter 'genre'")
+        matches = has_all(catalog.movies['genre_mask'].values, mask_for(genres, catalog.genres))
+        ordered = self.title_order[matches[self.title_order]]
+        page = ordered[offset:None if limit is None else offset + limit]
+        return {'total': int(len(ordered)), 'items': catalog.movies['movieId'].to_numpy()[page].tolist()}
+
+    def rate(self, user_id, movie_id, rating):
+        result = self.rating_queue.submit(user_id, movie_id, rating).result(timeout=10)
+        # Fold the new rating into the user's embedding, as the Similar page does
+        model, _, _, user_to_index, movie_to_index = self.current()[1][:5]
+        refresh_user_vector(model, movie_to_index, user_id, user_to_index, db_path=self.db_path)
+        return {'result': result}
+
+    def metrics(self):
+        return {
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'data_version': self.version,
+            'cache': {'entries': len(self.cache), 'hits': self.cache.hits, 'misses': self.cache.misses},
+            'scheduler': None if self.scheduler is None else self.scheduler.metrics(),
+            'ratings': dict(self.rating_queue.stats),
+        }
+
+
+# --- HTTP layer ---
+def _int_param(params, name, default=None, low=None, high=None):
+    if name not in params:
+        if default is None:
+            raise ValueError(f"missing parameter '{name}'")
+        return default
+    value = int(params[name][0])
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise ValueError(f"'{name}' out of range")
+    return value
+
+
+class RecRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive: clients reuse one connection
+    # Headers and body go out as two writes; with Nagle on, the body waits ~40 ms for the client's delayed ACK
+    disable_nagle_algorithm = True
+    service = None
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, route):
+        try:
+            self._send(200, route())
+        except (ValueError, KeyError, json.JSONDecodeError) as e:
+            self._send(400, {'error': str(e)})
+        except Exception as e:
+            self._send(500, {'error': f"{type(e).__name__}: {e}"})
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        service = self.service
+        routes = {
+            '/health': lambda: {'status': 'ok', 'data_version': service.version},
+            '/metrics': service.metrics,
+            '/recommendations': lambda: service.recommendations(
+                _int_param(params, 'user_id'), n=_int_param(params, 'n', 10, 1, MAX_N)),
+            '/similar': lambda: service.similar(
+                _int_param(params, 'movie_id'), k=_int_param(params, 'k', 20, 1, MAX_N)),
+            '/genre': lambda: service.genre(
+                params.get('genre', []), offset=_int_param(params, 'offset', 0, 0),
+                limit=_int_param(params, 'limit', 0, 0) or None),
+        }
+        if url.path not in routes:
+            self._send(404, {'error': f"unknown path '{url.path}'"})
+            return
+        self._handle(routes[url.path])
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        if urlsplit(self.path).path != '/ratings':
+            self._send(404, {'error': f"unknown path '{self.path}'"})
+            return
+
+        def rate():
+            data = json.loads(body or b'{}')
+            rating = float(data['rating'])
+            if not 0.5 <= rating <= 5.0:
+                raise ValueError("'rating' must be between 0.5 and 5.0")
+            return self.service.rate(int(data['user_id']), int(data['movie_id']), rating)
+
+        self._handle(rate)
+
+    def log_message(self, format, *args):
+        # One line per request is too much under load; errors still reach the client as JSON
+        pass
+
+
+def make_server(host=HOST, port=PORT, db_path=DB_PATH):
+    handler = type('BoundRecRequestHandler', (RecRequestHandler,), {'service': RecService(db_path)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless recommendation service for the Streamlit workers.")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--db', default=DB_PATH)
+    args = parser.parse_args()
+
+    start_time = time.time()
+    server = make_server(args.host, args.port, args.db)
+    print(f"SUCCESS: Serving recommendations on http://{args.host}:{server.server_port} "
+          f"(loaded in {time.time() - start_time:.1f}s). Ctrl+C to stop.", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
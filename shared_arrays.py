@@ -0,0 +1,158 @@
+# shared_arrays.py
+#
+# Read-only NumPy arrays shared by every app worker process. The first
+# worker that needs a set of arrays (e.g. recommender.load_resources: model
+# weights, precomputed activations, seen index) builds and publishes it; the
+# others attach to the same pages instead of building private copies:
+#  - each array is a .npy file in a generation folder; attach_arrays() maps
+#    them with np.load(mmap_mode='r'), so attaching copies nothing and every
+#    process reads one set of pages from the OS page cache;
+#  - registry.json is the descriptor registry: per set, its current
+#    generation, the key it was built for (model and data versions) and each
+#    array's dtype and shape. A set whose key no longer matches is rebuilt;
+#  - publishing is atomic: the new generation is filled in first, then the
+#    registry is swapped with os.replace and older generations are removed.
+#    Readers that still map them keep working (Linux frees unlinked files
+#    when the last mapping goes), new readers attach to the new one;
+#  - builds take a lock file, so workers starting together build once.
+# The folder is shared/ next to movies.db. Set SHARED_ARRAYS_DIR to a tmpfs
+# folder (e.g. /dev/shm/movies) to keep the arrays in RAM only, which is
+# where multiprocessing.shared_memory puts its segments on Linux.
+#
+# Usage (from the project folder):
+#   python shared_arrays.py          # list the published sets
+#   python shared_arrays.py clear    # remove them (workers rebuild on next start)
+
+import os
+import sys
+import json
+import time
+import shutil
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent first starts may build twice
+    fcntl = None
+
+from db import DB_PATH
+
+SHARED_DIR = 'shared'
+SHARED_DIR_ENV = 'SHARED_ARRAYS_DIR'
+REGISTRY_FILE = 'registry.json'
+LOCK_FILE = '.lock'
+
+
+def shared_dir_for(db_path=DB_PATH):
+    return os.environ.get(SHARED_DIR_ENV) or os.path.join(os.path.dirname(db_path), SHARED_DIR)
+
+
+def read_registry(shared_dir):
+    try:
+        with open(os.path.join(shared_dir, REGISTRY_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+@contextmanager
+def publish_lock(shared_dir):
+    """One publisher at a time per folder (the registry is read-modify-write)."""
+    os.makedirs(shared_dir, exist_ok=True)
+    with open(os.path.join(shared_dir, LOCK_FILE), 'w') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# --- 1. Publishing ---
+def publish_arrays(name, arrays, key, shared_dir):
+    """Write `arrays` ({array name: ndarray}) as a new generation of set `name`; call under publish_lock()."""
+    generation = f"{name}-g{time.time_ns()}-{os.getpid()}"
+    out_dir = os.path.join(shared_dir, generation)
+    os.makedirs(out_dir)
+    descriptors = {}
+    try:
+        for array_name, values in arrays.items():
+            values = np.ascontiguousarray(values)
+            np.save(os.path.join(out_dir, f"{array_name}.npy"), values)
+            descriptors[array_name] = {'dtype': values.dtype.str, 'shape': list(values.shape)}
+    except OSError:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        raise
+
+    registry = read_registry(shared_dir)
+    registry[name] = {'generation': generation, 'key': key, 'arrays': descriptors}
+    tmp_path = os.path.join(shared_dir, f"{REGISTRY_FILE}.{generation}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(registry, f)
+    os.replace(tmp_path, os.path.join(shared_dir, REGISTRY_FILE))
+
+    # Older generations of this set: unlinked now, freed once their last reader unmaps them
+    for entry in os.listdir(shared_dir):
+        if entry.startswith(f"{name}-g") and entry != generation:
+            shutil.rmtree(os.path.join(shared_dir, entry), ignore_errors=True)
+    return generation
+
+
+# --- 2. Attaching ---
+def attach_arrays(name, key, shared_dir):
+    """{array name: read-only memory map} of set `name` if it was published for `key`, else None."""
+    entry = read_registry(shared_dir).get(name)
+    if entry is None or entry['key'] != key:
+        return None
+    gen_dir = os.path.join(shared_dir, entry['generation'])
+    try:
+        arrays = {array_name: np.load(os.path.join(gen_dir, f"{array_name}.npy"), mmap_mode='r')
+                  for array_name in entry['arrays']}
+    except (OSError, ValueError):
+        # Replaced by a newer generation mid-attach: the caller rebuilds or retries
+        return None
+    for array_name, spec in entry['arrays'].items():
+        if arrays[array_name].dtype.str != spec['dtype'] or list(arrays[array_name].shape) != spec['shape']:
+            return None
+    return arrays
+
+
+def get_shared_arrays(name, key, build, shared_dir):
+    """Set `name` for `key`: attached if published, else built with build() and published first.
+
+    Falls back to the privately built arrays if the folder is not writable.
+    """
+    arrays = attach_arrays(name, key, shared_dir)
+    if arrays is not None:
+        return arrays
+    built = None
+    try:
+        with publish_lock(shared_dir):
+            # Another worker may have published it while we waited for the lock
+            arrays = attach_arrays(name, key, shared_dir)
+            if arrays is not None:
+                return arrays
+            built = build()
+            publish_arrays(name, built, key, shared_dir)
+    except OSError:
+        # Read-only or full folder: keep this worker's own copy
+        return build() if built is None else built
+    arrays = attach_arrays(name, key, shared_dir)
+    return built if arrays is None else arrays
+
+
+if __name__ == '__main__':
+    shared_dir = shared_dir_for()
+    if len(sys.argv) > 1 and sys.argv[1] == 'clear':
+        shutil.rmtree(shared_dir, ignore_errors=True)
+        print(f"SUCCESS: Removed '{shared_dir}'.")
+    else:
+        registry = read_registry(shared_dir)
+        if not registry:
+            print(f"Nothing published in '{shared_dir}' yet; the app publishes on first start.")
+        for name, entry in registry.items():
+            n_bytes = sum(np.dtype(spec['dtype']).itemsize * int(np.prod(spec['shape'])) for spec in entry['arrays'].values())
+            print(f"{name}: {len(entry['arrays'])} arrays, {n_bytes / 1e6:.1f} MB, "
+                  f"generation {entry['generation']}, key {entry['key']}")
@@ -0,0 +1,115 @@
+# similarity_index.py
+#
+# Precomputed "similar movies" lists for the Movie Explorer page.
+#
+# Content similarity is TF-IDF over the genres + cosine similarity (same as the
+# page used to compute live), but it is built OFFLINE in blocks of rows:
+# each block is one sparse (block x N) product, so the full N x N matrix is
+# never materialized. Only the top-k neighbours per movie are kept, in the
+# `similar_movies` table of movies.db, so the page answers with one keyed read.
+#
+# Usage (from the project folder):
+#   python similarity_index.py          # top 20 neighbours per movie
+
+import sys
+import time
+import sqlite3
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from db import DB_PATH, connect
+
+TOP_K = 20
+BLOCK_SIZE = 512
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS similar_movies (
+    movieId INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    similarMovieId INTEGER NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (movieId, rank)
+) WITHOUT ROWID
+"""
+
+
+def tfidf_matrix(genres):
+    # TfidfVectorizer L2-normalizes rows, so X @ X.T is the cosine similarity
+    tfidf = TfidfVectorizer(stop_words='english')
+    return tfidf.fit_transform(genres).astype(np.float32).tocsr()
+
+
+def top_k_row(scores, self_position, k):
+    """Top-k positions by score, ties broken by catalog order (like a stable sort)."""
+    scores[self_position] = -np.inf
+    k = min(k, len(scores) - 1)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+    candidates = np.flatnonzero(scores >= threshold)
+    order = np.lexsort((candidates, -scores[candidates]))[:k]
+    return candidates[order]
+
+
+def top_k_neighbours(matrix, k=TOP_K, block_size=BLOCK_SIZE):
+    """Yield (row, neighbour_rows, scores) for every row, one sparse block at a time."""
+    matrix_t = matrix.T.tocsc()
+    for start in range(0, matrix.shape[0], block_size):
+        block = (matrix[start:start + block_size] @ matrix_t).toarray()
+        for offset, scores in enumerate(block):
+            row = start + offset
+            neighbours = top_k_row(scores, row, k)
+            yield row, neighbours, scores[neighbours]
+
+
+def build_similarity_index(db_path=DB_PATH, k=TOP_K, block_size=BLOCK_SIZE):
+    con = connect(db_path)
+    movies = pd.read_sql_query("SELECT movieId, genres FROM movies ORDER BY movieId", con)
+    movie_ids = movies['movieId'].to_numpy()
+    matrix = tfidf_matrix(movies['genres'])
+
+    rows = []
+    for row, neighbours, scores in top_k_neighbours(matrix, k, block_size):
+        rows.extend(
+            (int(movie_ids[row]), rank, int(movie_ids[n]), float(s))
+            for rank, (n, s) in enumerate(zip(neighbours, scores), start=1)
+        )
+
+    with con:
+        con.execute(CREATE_TABLE_SQL)
+        con.execute("DELETE FROM similar_movies")
+        con.executemany("INSERT INTO similar_movies (movieId, rank, similarMovieId, score) VALUES (?, ?, ?, ?)", rows)
+    con.close()
+    return len(movie_ids), len(rows)
+
+
+def similar_movie_ids(movie_id, k=10, db_path=DB_PATH):
+    """Neighbour movieIds for one movie, best first (empty if the index was never built)."""
+    con = connect(db_path)
+    try:
+        rows = con.execute(
+            "SELECT similarMovieId FROM similar_movies WHERE movieId = ? ORDER BY rank LIMIT ?",
+            (int(movie_id), k),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # similarity_index.py has never been run on this database
+        rows = []
+    finally:
+        con.close()
+    return [row[0] for row in rows]
+
+
+def similar_movie_ids_live(movies_df, movie_id, k=10):
+    """Fallback for one movie when the index is missing: one sparse row, never N x N."""
+    matrix = tfidf_matrix(movies_df['genres'])
+    position = int(np.flatnonzero(movies_df['movieId'].to_numpy() == movie_id)[0])
+    scores = (matrix[position] @ matrix.T).toarray().ravel()
+    return movies_df['movieId'].to_numpy()[top_k_row(scores, position, k)].tolist()
+
+
+if __name__ == '__main__':
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else TOP_K
+    start_time = time.time()
+    n_movies, n_rows = build_similarity_index(k=k)
+    print(f"SUCCESS: Stored top-{k} similar movies for {n_movies} movies ({n_rows} rows) in {time.time() - start_time:.2f}s.")
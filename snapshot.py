@@ -0,0 +1,172 @@
+# snapshot.py
+#
+# Columnar snapshot of the catalog's movies and ratings, next to movies.db, so
+# a process start maps the data instead of parsing it row by row out of SQLite:
+#  - one .npy file per column with compact dtypes (int32 ids, float32
+#    ratings, int64 genre bitmasks); text columns are int32 codes into a
+#    list of distinct values kept in meta.json (genres stay categorical);
+#  - the title search index (title_search.py) is saved as arrays too, so it
+#    is not re-tokenized on every start;
+#  - np.load(mmap_mode='r'): loading reads only the headers, pages come in
+#    on first touch, and every worker process shares them through the OS
+#    page cache;
+#  - each snapshot records the source_version() of the database it was taken
+#    from; catalog.py uses it only while that still matches, otherwise it
+#    falls back to SQL and writes a fresh one. The version covers the movies
+#    and the database epoch only: a new rating does not rewrite the snapshot
+#    (catalog.py reads the per-movie averages from movie_stats instead).
+# Publishing is atomic: a new generation folder is filled in first, then
+# CURRENT_FILE is swapped to point at it with os.replace and older
+# generations are removed (open memory maps of them stay valid on Linux).
+#
+# Usage (from the project folder):
+#   python snapshot.py          # (re)write snapshot/ from movies.db
+#   python snapshot.py check    # is the snapshot current?
+
+import os
+import sys
+import json
+import time
+import shutil
+import numpy as np
+import pandas as pd
+
+from db import DB_PATH, connect, data_version, structure_version
+from title_search import TitleIndex
+
+SNAPSHOT_DIR = 'snapshot'
+CURRENT_FILE = 'current.json'
+FORMAT_VERSION = 1
+
+MOVIE_DTYPES = {'movieId': np.int32, 'rating': np.float32, 'num_ratings': np.int32, 'genre_mask': np.int64}
+RATING_DTYPES = {'userId': np.int32, 'movieId': np.int32, 'rating': np.float32, 'timestamp': np.int64}
+CATEGORICAL_COLUMNS = ['genres']
+
+
+def source_version(con):
+    """Version of the data a snapshot is taken from: the epoch and movies counters of db.data_version()."""
+    return structure_version(data_version(con))
+
+
+def compact_frames(movies_df, ratings_df):
+    """The dtypes a snapshot stores, applied to freshly queried frames too, so both paths match."""
+    movies_df = movies_df.astype({c: t for c, t in MOVIE_DTYPES.items() if c in movies_df})
+    for column in CATEGORICAL_COLUMNS:
+        movies_df[column] = movies_df[column].astype('category')
+    ratings_df = ratings_df.astype(RATING_DTYPES)
+    return movies_df, ratings_df
+
+
+# --- 1. Writing ---
+def _encode_text(values):
+    codes, categories = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+    return codes.astype(np.int32), [str(c) for c in categories]
+
+
+def write_snapshot(movies_df, ratings_df, version, genres, title_index, snapshot_dir=SNAPSHOT_DIR):
+    """Publish catalog.query_frames() output and its TitleIndex as a new generation."""
+    generation = f"g{time.time_ns()}-{os.getpid()}"
+    out_dir = os.path.join(snapshot_dir, generation)
+    os.makedirs(out_dir)
+
+    meta = {'format': FORMAT_VERSION, 'version': version, 'genres': list(genres),
+            'movies': {'n_rows': len(movies_df), 'columns': {}}, 'ratings': {'n_rows': len(ratings_df), 'columns': {}}}
+    for table, frame in (('movies', movies_df), ('ratings', ratings_df)):
+        for column in frame.columns:
+            series = frame[column]
+            if pd.api.types.is_numeric_dtype(series.dtype) and not isinstance(series.dtype, pd.CategoricalDtype):
+                np.save(os.path.join(out_dir, f"{table}.{column}.npy"), series.to_numpy())
+                meta[table]['columns'][column] = {'kind': 'numeric'}
+            else:
+                codes, categories = _encode_text(series)
+                np.save(os.path.join(out_dir, f"{table}.{column}.npy"), codes)
+                kind = 'categorical' if column in CATEGORICAL_COLUMNS else 'text'
+                meta[table]['columns'][column] = {'kind': kind, 'categories': categories}
+    arrays, normalized, grams = title_index.to_arrays()
+    for name, values in arrays.items():
+        np.save(os.path.join(out_dir, f"title_index.{name}.npy"), values)
+    meta['title_index'] = {'arrays': list(arrays), 'normalized': normalized, 'grams': grams}
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+    # Point readers at the new generation, then drop the ones nobody points at
+    tmp_path = os.path.join(snapshot_dir, f"{CURRENT_FILE}.{generation}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump({'generation': generation, 'version': version}, f)
+    os.replace(tmp_path, os.path.join(snapshot_dir, CURRENT_FILE))
+    current = read_current(snapshot_dir)
+    for name in os.listdir(snapshot_dir):
+        path = os.path.join(snapshot_dir, name)
+        if os.path.isdir(path) and current is not None and name != current['generation']:
+            shutil.rmtree(path, ignore_errors=True)
+    return out_dir
+
+
+# --- 2. Reading ---
+def read_current(snapshot_dir=SNAPSHOT_DIR):
+    try:
+        with open(os.path.join(snapshot_dir, CURRENT_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _read_column(path, spec):
+    values = np.load(path, mmap_mode='r')
+    if spec['kind'] == 'numeric':
+        return values
+    categories = spec['categories']
+    if spec['kind'] == 'categorical':
+        return pd.Categorical.from_codes(np.asarray(values), categories=categories)
+    # Text: look the codes up in the distinct values (None where missing)
+    lookup = np.array(categories + [None], dtype=object)
+    return lookup[np.asarray(values)]
+
+
+def load_snapshot(version, snapshot_dir=SNAPSHOT_DIR):
+    """(movies_df, ratings_df, genres, title_index) if the current snapshot was taken at `version`, else None.
+
+    Numeric columns are read-only memory maps; copy a frame before writing to it.
+    """
+    current = read_current(snapshot_dir)
+    if current is None or current['version'] != version:
+        return None
+    gen_dir = os.path.join(snapshot_dir, current['generation'])
+    try:
+        with open(os.path.join(gen_dir, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta['format'] != FORMAT_VERSION:
+            return None
+        frames = []
+        for table in ('movies', 'ratings'):
+            columns = {column: _read_column(os.path.join(gen_dir, f"{table}.{column}.npy"), spec)
+                       for column, spec in meta[table]['columns'].items()}
+            # copy=False keeps the memory maps as the frame's columns
+            frames.append(pd.DataFrame(columns, copy=False))
+        spec = meta['title_index']
+        arrays = {name: np.load(os.path.join(gen_dir, f"title_index.{name}.npy"), mmap_mode='r') for name in spec['arrays']}
+        title_index = TitleIndex.from_arrays(frames[0]['title'], arrays, spec['normalized'], spec['grams'])
+    except (OSError, ValueError, KeyError):
+        # Replaced by another process mid-read, or damaged: the caller falls back to SQL
+        return None
+    return frames[0], frames[1], meta['genres'], title_index
+
+
+if __name__ == '__main__':
+    from catalog import load_catalog
+
+    con = connect(DB_PATH)
+    version = source_version(con)
+    con.close()
+    current = read_current()
+    if len(sys.argv) > 1 and sys.argv[1] == 'check':
+        if current is not None and current['version'] == version:
+            print(f"SUCCESS: '{SNAPSHOT_DIR}/' is current ({current['generation']}).")
+        else:
+            print("Snapshot is missing or stale; run `python snapshot.py`.")
+            sys.exit(1)
+    else:
+        start_time = time.time()
+        catalog = load_catalog(use_snapshot=False)
+        print(f"SUCCESS: Wrote '{SNAPSHOT_DIR}/' ({len(catalog.movies)} movies, {len(catalog.ratings)} ratings) "
+              f"in {time.time() - start_time:.1f}s.")
@@ -0,0 +1,236 @@
+# sweep.py
+#
+# Hyperparameter sweep for the baseline factorization models in mf_models.py
+# (ALS and SGD): grid or random search over rank, regularization and
+# iterations, run in parallel on a process pool.
+#  - The training matrix and the held-out ratings are loaded ONCE, copied into
+#    multiprocessing.shared_memory, and every worker maps the same read-only
+#    buffers instead of unpickling its own copy.
+#  - Every finished trial is written to the `sweep_results` table of movies.db
+#    right away, so an interrupted sweep picks up where it stopped: trials
+#    already stored for the same sweep name and ratings version are skipped.
+#  - pages/7_Algorithm_Comparison.py charts the stored results (accuracy vs.
+#    training time and its Pareto frontier); it never trains anything itself.
+#
+# Usage (from the project folder):
+#   python sweep.py                        # full grid, all CPU cores
+#   python sweep.py random 20              # 20 random trials
+#   python sweep.py grid --workers 4 --name nightly
+
+import json
+import time
+import sqlite3
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from db import DB_PATH, connect
+from mf_models import MODELS, RatingSplit, error_metrics, ratings_version
+
+DEFAULT_SWEEP = 'default'
+
+GRID = {
+    'model': ['als', 'sgd'],
+    'n_factors': [10, 20, 50],
+    'reg': [0.03, 0.1, 0.3],
+    'n_iter': [5, 10, 20],
+}
+# Random search ranges: factors and iterations are drawn from these values,
+# reg log-uniformly between the bounds
+RANDOM_FACTORS = [5, 10, 20, 30, 50, 80]
+RANDOM_ITERATIONS = [3, 5, 10, 15, 20, 30]
+RANDOM_REG = (0.01, 1.0)
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS sweep_results (
+    sweep TEXT NOT NULL,
+    data_version TEXT NOT NULL,
+    model TEXT NOT NULL,
+    params TEXT NOT NULL,
+    rmse REAL NOT NULL,
+    mae REAL NOT NULL,
+    n_test INTEGER NOT NULL,
+    train_seconds REAL NOT NULL,
+    finished_at INTEGER NOT NULL,
+    PRIMARY KEY (sweep, data_version, model, params)
+)
+"""
+
+
+# --- 1. Trials ---
+def grid_trials(grid=GRID):
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def random_trials(n_trials, seed=42):
+    """Deterministic for a given seed, so a resumed random sweep asks for the same trials."""
+    rng = np.random.default_rng(seed)
+    low, high = np.log10(RANDOM_REG[0]), np.log10(RANDOM_REG[1])
+    return [{
+        'model': str(rng.choice(list(MODELS))),
+        'n_factors': int(rng.choice(RANDOM_FACTORS)),
+        'reg': round(float(10 ** rng.uniform(low, high)), 4),
+        'n_iter': int(rng.choice(RANDOM_ITERATIONS)),
+    } for _ in range(n_trials)]
+
+
+def params_key(trial):
+    return json.dumps({k: v for k, v in sorted(trial.items()) if k != 'model'})
+
+
+# --- 2. Shared Memory ---
+def share_arrays(arrays):
+    """Copy arrays into shared memory blocks; returns (blocks, spec to attach them by name)."""
+    blocks, spec = [], {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        spec[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, spec
+
+
+def attach_arrays(spec):
+    blocks, arrays = [], {}
+    for name, (block_name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        array.flags.writeable = False
+        blocks.append(block)
+        arrays[name] = array
+    return blocks, arrays
+
+
+def release(blocks):
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+# --- 3. Workers (one attached copy of the data per process) ---
+_data = None
+
+
+def _init_worker(spec, shape):
+    global _data
+    blocks, arrays = attach_arrays(spec)
+    train = sp.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=shape, copy=False)
+    # Keep the blocks referenced for as long as the arrays are in use
+    _data = (blocks, train, arrays)
+
+
+def _run_trial(trial):
+    _, train, arrays = _data
+    model_class = MODELS[trial['model']]
+    params = {k: v for k, v in trial.items() if k != 'model'}
+
+    start_time = time.perf_counter()
+    model = model_class.fit(train, **params)
+    train_seconds = time.perf_counter() - start_time
+
+    predicted = model.predict(arrays['test_users'], arrays['test_movies'])
+    return trial, error_metrics(arrays['test_ratings'], predicted), train_seconds
+
+
+# --- 4. Sweep ---
+def finished_trials(con, sweep, version):
+    rows = con.execute("SELECT model, params FROM sweep_results WHERE sweep = ? AND data_version = ?",
+                       (sweep, version)).fetchall()
+    return set(rows)
+
+
+def run_sweep(trials, sweep=DEFAULT_SWEEP, workers=None, db_path=DB_PATH):
+    version = ratings_version(db_path)
+    con = connect(db_path)
+    with con:
+        con.execute(CREATE_TABLE_SQL)
+    done = finished_trials(con, sweep, version)
+    pending = [t for t in trials if (t['model'], params_key(t)) not in done]
+    print(f"Sweep '{sweep}': {len(trials)} trials, {len(trials) - len(pending)} already done, {len(pending)} to run.")
+    if not pending:
+        con.close()
+        return 0
+
+    split = RatingSplit.from_db(db_path)
+    shape = split.train.shape
+    # Score on held-out ratings whose user and movie appear in training
+    test_mask = (split.test_users >= 0) & (split.test_movies >= 0)
+    blocks, spec = share_arrays({
+        'data': split.train.data,
+        'indices': split.train.indices,
+        'indptr': split.train.indptr,
+        'test_users': split.test_users[test_mask],
+        'test_movies': split.test_movies[test_mask],
+        'test_ratings': split.test_ratings[test_mask],
+    })
+    del split
+
+    completed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(spec, shape)) as pool:
+            futures = [pool.submit(_run_trial, trial) for trial in pending]
+            for future in as_completed(futures):
+                trial, metrics, train_seconds = future.result()
+                # Checkpoint every trial as soon as it finishes
+                with con:
+                    con.execute(
+                        "INSERT OR REPLACE INTO sweep_results (sweep, data_version, model, params, rmse, mae, n_test, "
+                        "train_seconds, finished_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (sweep, version, trial['model'], params_key(trial), metrics['rmse'], metrics['mae'],
+                         metrics['n_test'], train_seconds, int(time.time())),
+                    )
+                completed += 1
+                print(f"[{completed}/{len(pending)}] {trial['model']} {params_key(trial)}  "
+                      f"RMSE={metrics['rmse']:.4f}  {train_seconds:.2f}s")
+    finally:
+        release(blocks)
+        con.close()
+    return completed
+
+
+# --- 5. Read Path (used by the Algorithm Comparison page) ---
+def read_sweep_results(sweep=None, db_path=DB_PATH):
+    """Stored trials for the current ratings (all sweeps unless `sweep` is given), params expanded."""
+    con = connect(db_path)
+    try:
+        query = "SELECT sweep, model, params, rmse, mae, n_test, train_seconds, finished_at FROM sweep_results WHERE data_version = ?"
+        args = [ratings_version(db_path)]
+        if sweep is not None:
+            query += " AND sweep = ?"
+            args.append(sweep)
+        results = pd.read_sql_query(query, con, params=args)
+    except (pd.errors.DatabaseError, sqlite3.OperationalError):
+        # No sweep has been run on this database yet
+        return pd.DataFrame()
+    finally:
+        con.close()
+    params = pd.DataFrame([json.loads(p) for p in results['params']], index=results.index)
+    return pd.concat([results.drop(columns='params'), params], axis=1)
+
+
+def pareto_frontier(results):
+    """Trials not beaten on BOTH accuracy (rmse) and training time by any other trial."""
+    ordered = results.sort_values(['train_seconds', 'rmse'])
+    best_faster = ordered['rmse'].cummin().shift(fill_value=np.inf)
+    return ordered[ordered['rmse'] < best_faster]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep for the ALS/SGD baselines.")
+    parser.add_argument('mode', nargs='?', choices=['grid', 'random'], default='grid')
+    parser.add_argument('n_trials', nargs='?', type=int, default=20, help="random mode only")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--name', default=DEFAULT_SWEEP)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    trials = grid_trials() if args.mode == 'grid' else random_trials(args.n_trials, seed=args.seed)
+    start_time = time.time()
+    completed = run_sweep(trials, sweep=args.name, workers=args.workers)
+    print(f"SUCCESS: {completed} trials finished in {time.time() - start_time:.1f}s; results are in 'sweep_results'.")
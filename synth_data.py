@@ -0,0 +1,250 @@
+# synth_data.py
+#
+# Synthetic, MovieLens-shaped movies.db for scale and load testing (the
+# bundled CSVs are ~8k ratings, too small for any scaling problem to show up).
+#  - Item popularity and user activity both follow power laws: a few
+#    blockbusters and heavy raters, a long tail of both (every user has at
+#    least MIN_USER_RATINGS, as in MovieLens).
+#  - Genre combinations and release years are drawn from
+#    ml-latest-small/movies.csv; titles are made from words of real titles.
+#  - Ratings come from a small latent-factor model plus user/movie biases and
+#    noise, rounded to half stars, so the models have something to learn.
+#  - Each user rates in a session that starts somewhere in the MovieLens years,
+#    so timestamps grow per user like the real data.
+# Ratings are generated and inserted in chunks of users (memory stays flat at
+# 25M+ ratings) into a database created with create_database.py's schema,
+# through its bulk-load path (ingest PRAGMAs, indexes built at the end).
+# Everything is drawn from a fixed seed: the same arguments give the same file.
+# It writes synth/movies.db by default and never replaces an existing file
+# without --force, so the app's own movies.db (and every rating submitted
+# through it) is not overwritten by accident.
+#
+# Usage (from the project folder):
+#   python synth_data.py                              # 1M ratings into synth/movies.db
+#   python synth_data.py 25000000 --db synth/movies-25m.db
+#   python synth_data.py 500000 --users 3000 --movies 5000 --seed 7 --no-similarity
+#   python synth_data.py --db movies.db --force       # replace the app's database
+
+import os
+import re
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+from create_database import (create_empty_database, ingest_pragmas, insert_rows, row_values, finish_load,
+                             MOVIE_COLUMNS, RATING_COLUMNS)
+from similarity_index import build_similarity_index
+
+SOURCE_MOVIES_CSV = os.path.join('ml-latest-small', 'movies.csv')
+POSTERS_CSV = 'movies_clean_final.csv'
+
+SYNTH_DB_PATH = os.path.join('synth', 'movies.db')
+SEED = 42
+N_RATINGS = 1_000_000
+RATINGS_PER_USER = 150      # MovieLens averages ~150 ratings per user
+MIN_USER_RATINGS = 20
+POPULARITY_EXPONENT = 1.0   # Zipf exponent of movie popularity by rank
+ACTIVITY_SHAPE = 1.3        # Pareto shape of user activity (smaller = heavier tail)
+N_FACTORS = 8
+MEAN_RATING = 3.5
+TOP_UP_ROUNDS = 8
+USER_BLOCK = 1_000          # users per RNG block; the output does not depend on chunk size
+CHUNK_RATINGS = 500_000     # ratings per insert transaction (approximate)
+START_TIME = 825_000_000    # 1996, the first MovieLens ratings
+END_TIME = 1_700_000_000    # 2023
+
+
+def default_movies(n_ratings):
+    # ~1.8k movies for 100k ratings, ~60k for 25M: about the MovieLens releases
+    return max(100, int(n_ratings ** 0.65))
+
+
+def default_users(n_ratings):
+    return max(1, n_ratings // RATINGS_PER_USER)
+
+
+# --- 1. Movies ---
+def read_sources(base_dir='.'):
+    """Genre strings, release years, title words and poster urls to sample from."""
+    source = pd.read_csv(os.path.join(base_dir, SOURCE_MOVIES_CSV))
+    years = source['title'].str.extract(r'\((\d{4})\)\s*$')[0].dropna().astype(int).to_numpy()
+    words = sorted({w for title in source['title'].str.replace(r'\s*\(\d{4}\)\s*$', '', regex=True)
+                    for w in re.findall(r"[A-Za-z][A-Za-z']+", title) if len(w) > 2})
+    posters_path = os.path.join(base_dir, POSTERS_CSV)
+    posters = pd.read_csv(posters_path)[['poster_path', 'poster_url']].dropna() if os.path.exists(posters_path) else None
+    return source['genres'].to_numpy(), years, np.array(words), posters
+
+
+def make_movies(n_movies, rng, base_dir='.'):
+    genres, years, words, posters = read_sources(base_dir)
+    title_lengths = rng.integers(1, 5, size=n_movies)
+    title_words = rng.choice(words, size=(n_movies, 4))
+    movie_years = rng.choice(years, size=n_movies)
+    titles = [f"{' '.join(title_words[i, :title_lengths[i]])} ({movie_years[i]})" for i in range(n_movies)]
+
+    movies = pd.DataFrame({
+        'movieId': np.arange(1, n_movies + 1),
+        'title': titles,
+        'genres': rng.choice(genres, size=n_movies),
+        'imdbId': None,
+        'tmdbId': None,
+        'id': None,
+        'poster_path': None,
+        'poster_url': None,
+    })
+    if posters is not None and len(posters):
+        # Real poster urls, so the pages render as usual
+        picks = posters.iloc[rng.integers(0, len(posters), size=n_movies)]
+        movies['poster_path'] = picks['poster_path'].to_numpy()
+        movies['poster_url'] = picks['poster_url'].to_numpy()
+    return movies[MOVIE_COLUMNS]
+
+
+# --- 2. Users and Popularity ---
+def popularity_cdf(n_movies, rng):
+    """Zipf weights by popularity rank, ranks shuffled over the movie ids."""
+    weights = 1.0 / np.arange(1, n_movies + 1) ** POPULARITY_EXPONENT
+    cdf = np.cumsum(weights[rng.permutation(n_movies)])
+    return cdf / cdf[-1]
+
+
+def user_activity(n_users, n_ratings, n_movies, rng):
+    """Ratings per user: Pareto-tailed, at least MIN_USER_RATINGS, summing to ~n_ratings."""
+    low = min(MIN_USER_RATINGS, n_movies, max(1, n_ratings // n_users))
+    high = max(low, n_movies // 4)
+    weights = rng.pareto(ACTIVITY_SHAPE, size=n_users)
+    counts = np.full(n_users, float(low))
+    # Users capped at `high` hand their share of the total back to the others
+    for _ in range(10):
+        open_users = counts < high
+        missing = n_ratings - counts.sum()
+        if missing < 1 or not open_users.any():
+            break
+        counts[open_users] += missing * weights[open_users] / max(weights[open_users].sum(), 1e-12)
+        counts = np.minimum(counts, high)
+    return np.floor(counts).astype(np.int64)
+
+
+def sample_movies(rng, cdf, counts):
+    """(user, movie index) pairs: counts[u] distinct popularity-weighted movies per user.
+
+    Draws with replacement and tops up what the duplicates removed; the
+    rare user whose count is out of reach after a few rounds gets fewer.
+    """
+    local = np.arange(len(counts))
+    users = np.empty(0, dtype=np.int64)
+    movies = np.empty(0, dtype=np.int64)
+    missing = counts
+    for _ in range(TOP_UP_ROUNDS):
+        draw_users = np.repeat(local, missing + (missing + 1) // 4)
+        draw_movies = np.minimum(np.searchsorted(cdf, rng.random(len(draw_users))), len(cdf) - 1)
+        pairs = pd.DataFrame({'u': np.concatenate([users, draw_users]), 'm': np.concatenate([movies, draw_movies])})
+        pairs = pairs.drop_duplicates()
+        # Earlier picks come first, so the cut keeps them and drops surplus new ones
+        pairs = pairs[pairs.groupby('u').cumcount().to_numpy() < counts[pairs['u'].to_numpy()]]
+        users, movies = pairs['u'].to_numpy(), pairs['m'].to_numpy()
+        missing = counts - np.bincount(users, minlength=len(counts))
+        if not missing.any():
+            break
+    order = np.argsort(users, kind='stable')
+    return users[order], movies[order]
+
+
+# --- 3. Ratings ---
+def generate_block(block, seed, first_user, counts, cdf, movie_factors, movie_bias):
+    """Ratings of one block of users; the block index and seed alone fix its content."""
+    rng = np.random.default_rng([seed, block])
+    local, movie_indices = sample_movies(rng, cdf, counts)
+    user_ids = local + first_user
+    user_factors = rng.normal(0, 0.5, size=(len(counts), N_FACTORS))
+    user_bias = rng.normal(0, 0.4, size=len(counts))
+    affinity = np.einsum('ij,ij->i', user_factors[local], movie_factors[movie_indices])
+    ratings = MEAN_RATING + user_bias[local] + movie_bias[movie_indices] + affinity + rng.normal(0, 0.8, len(local))
+    ratings = np.clip(np.round(ratings * 2) / 2, 0.5, 5.0)
+
+    # A session per user: starts anywhere in the MovieLens years, minutes to months long
+    session_start = rng.integers(START_TIME, END_TIME, size=len(counts))
+    session_length = np.minimum(rng.exponential(30 * 86400, size=len(counts)), END_TIME - session_start)
+    offsets = rng.random(len(local)) * session_length[local]
+    order = np.lexsort((offsets, local))
+    timestamps = session_start[local] + offsets[order].astype(np.int64)
+    # Within a user, rating order follows time (as in the MovieLens CSVs)
+    return pd.DataFrame({
+        'userId': user_ids,
+        'movieId': movie_indices[order] + 1,
+        'rating': ratings[order],
+        'timestamp': timestamps,
+    })
+
+
+def generate_ratings(n_ratings, n_users, n_movies, seed=SEED, chunk_ratings=CHUNK_RATINGS):
+    """Yields rating frames of ~chunk_ratings rows each, in userId order."""
+    rng = np.random.default_rng(seed)
+    cdf = popularity_cdf(n_movies, rng)
+    movie_factors = rng.normal(0, 0.5, size=(n_movies, N_FACTORS))
+    movie_bias = rng.normal(0, 0.3, size=n_movies)
+    counts = user_activity(n_users, n_ratings, n_movies, rng)
+
+    pending, pending_rows = [], 0
+    for block, first in enumerate(range(0, n_users, USER_BLOCK)):
+        frame = generate_block(block, seed, first + 1, counts[first:first + USER_BLOCK], cdf, movie_factors, movie_bias)
+        pending.append(frame)
+        pending_rows += len(frame)
+        if pending_rows >= chunk_ratings:
+            yield pd.concat(pending, ignore_index=True)
+            pending, pending_rows = [], 0
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
+
+
+# --- 4. Database ---
+def build_synthetic_database(n_ratings=N_RATINGS, n_users=None, n_movies=None, db_path=SYNTH_DB_PATH,
+                             seed=SEED, chunk_ratings=CHUNK_RATINGS, base_dir='.', verbose=True):
+    n_movies = n_movies or default_movies(n_ratings)
+    n_users = n_users or default_users(n_ratings)
+    rng = np.random.default_rng([seed, 2 ** 31])
+    movies = make_movies(n_movies, rng, base_dir)
+
+    con = create_empty_database(db_path, with_indexes=False)
+    start_time = time.perf_counter()
+    total = 0
+    try:
+        with ingest_pragmas(con):
+            insert_rows(con, 'movies', MOVIE_COLUMNS, row_values(movies, MOVIE_COLUMNS))
+            for chunk in generate_ratings(n_ratings, n_users, n_movies, seed=seed, chunk_ratings=chunk_ratings):
+                insert_rows(con, 'ratings', RATING_COLUMNS, row_values(chunk, RATING_COLUMNS))
+                total += len(chunk)
+                if verbose:
+                    elapsed = time.perf_counter() - start_time
+                    print(f"  {total:,} / ~{n_ratings:,} ratings ({total / elapsed:,.0f} rows/s)")
+            finish_load(con, verbose)
+    finally:
+        con.close()
+    return n_movies, n_users, total
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a synthetic MovieLens-shaped movies.db.")
+    parser.add_argument('n_ratings', nargs='?', type=int, default=N_RATINGS)
+    parser.add_argument('--users', type=int, default=None, help=f"default: n_ratings / {RATINGS_PER_USER}")
+    parser.add_argument('--movies', type=int, default=None, help="default: n_ratings ** 0.65")
+    parser.add_argument('--db', default=SYNTH_DB_PATH)
+    parser.add_argument('--force', action='store_true', help="replace --db if it already exists")
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_RATINGS)
+    parser.add_argument('--no-similarity', action='store_true', help="skip building the similar_movies table")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db) and not args.force:
+        print(f"ERROR: '{args.db}' already exists; pass --force to replace it (its ratings will be lost).")
+        raise SystemExit(1)
+    if os.path.dirname(args.db):
+        os.makedirs(os.path.dirname(args.db), exist_ok=True)
+    start_time = time.time()
+    n_movies, n_users, n_ratings = build_synthetic_database(args.n_ratings, args.users, args.movies, args.db,
+                                                            seed=args.seed, chunk_ratings=args.chunk_size)
+    if not args.no_similarity:
+        build_similarity_index(args.db)
+    print(f"SUCCESS: '{args.db}' has {n_movies} movies, {n_users} users and {n_ratings} ratings "
+          f"({time.time() - start_time:.1f}s).")
@@ -0,0 +1,139 @@
+# title_search.py
+#
+# Title search index, built once when the catalog loads.
+#  - Prefix lookups: titles kept in sorted order, so "all titles starting
+#    with X" is a binary search (np.searchsorted) for a contiguous range.
+#  - Substring / typo-tolerant lookups: an inverted index from every 3-letter
+#    chunk ("trigram") of the normalized title to the movies containing it.
+#    Queries only touch the posting lists of their own trigrams and are
+#    ranked by trigram overlap, with exact substring hits first.
+# All results are row positions into the catalog's movies frame.
+
+import re
+import unicodedata
+from collections import defaultdict
+import numpy as np
+
+MIN_SIMILARITY = 0.5  # fuzzy matches sharing fewer of the query's trigrams are dropped
+
+
+def normalize(text):
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return re.sub(r'[^a-z0-9]+', ' ', text).strip()
+
+
+def trigrams(normalized):
+    """Trigrams of every word, padded so word starts and ends count too."""
+    grams = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def inner_trigrams(normalized):
+    """Unpadded trigrams inside each word: any title containing `normalized` has all of them."""
+    return {word[i:i + 3] for word in normalized.split() for i in range(len(word) - 2)}
+
+
+class TitleIndex:
+    def __init__(self, titles):
+        titles = np.asarray(titles, dtype=object)
+        self.titles = titles
+        self.normalized = np.array([normalize(t) for t in titles], dtype=object)
+
+        # Sorted views for prefix ranges (raw titles for browsing, normalized for search)
+        self.by_title = np.argsort(titles.astype(str), kind='stable')
+        self.sorted_titles = titles.astype(str)[self.by_title]
+        self.by_normalized = np.argsort(self.normalized.astype(str), kind='stable')
+        self.sorted_normalized = self.normalized.astype(str)[self.by_normalized]
+
+        # Trigram inverted index
+        postings = defaultdict(list)
+        self.trigram_counts = np.zeros(len(titles), dtype=np.int32)
+        for position, title in enumerate(self.normalized):
+            grams = trigrams(title)
+            self.trigram_counts[position] = len(grams)
+            for gram in grams:
+                postings[gram].append(position)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def to_arrays(self):
+        """(arrays, normalized titles, trigrams) to rebuild the index with from_arrays (snapshot.py)."""
+        grams = list(self.postings)
+        offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(self.postings[g]) for g in grams])
+        ids = np.concatenate([self.postings[g] for g in grams]) if grams else np.empty(0, dtype=np.int32)
+        arrays = {'by_title': self.by_title, 'by_normalized': self.by_normalized,
+                  'trigram_counts': self.trigram_counts, 'posting_offsets': offsets, 'posting_ids': ids}
+        return arrays, [str(t) for t in self.normalized], grams
+
+    @classmethod
+    def from_arrays(cls, titles, arrays, normalized, grams):
+        """An index saved with to_arrays, for the same titles in the same order, without re-tokenizing."""
+        index = cls.__new__(cls)
+        index.titles = np.asarray(titles, dtype=object)
+        index.normalized = np.array(normalized, dtype=object)
+        index.by_title = arrays['by_title']
+        index.sorted_titles = index.titles.astype(str)[index.by_title]
+        index.by_normalized = arrays['by_normalized']
+        index.sorted_normalized = index.normalized.astype(str)[index.by_normalized]
+        index.trigram_counts = arrays['trigram_counts']
+        offsets, ids = arrays['posting_offsets'], arrays['posting_ids']
+        index.postings = {gram: ids[offsets[i]:offsets[i + 1]] for i, gram in enumerate(grams)}
+        return index
+
+    def __len__(self):
+        return len(self.titles)
+
+    def _prefix_range(self, sorted_values, prefix):
+        start = np.searchsorted(sorted_values, prefix, side='left')
+        end = np.searchsorted(sorted_values, prefix + '\uffff', side='left')
+        return start, end
+
+    def starts_with(self, prefix):
+        """Positions of titles starting with `prefix` (case-sensitive), in title order."""
+        start, end = self._prefix_range(self.sorted_titles, prefix)
+        return self.by_title[start:end]
+
+    def all_sorted(self):
+        """Every position, in title order."""
+        return self.by_title
+
+    def search(self, query, k=20):
+        """Top-k positions for a free-text query: exact substring hits, then close typos."""
+        query = normalize(query)
+        if not query:
+            return np.empty(0, dtype=np.int64)
+
+        # Normalized-prefix hits rank above everything else
+        start, end = self._prefix_range(self.sorted_normalized, query)
+        prefix_hits = self.by_normalized[start:end]
+
+        # Fuzzy score: share of the query's trigrams found in the title
+        query_grams = trigrams(query)
+        scores = np.zeros(len(self), dtype=np.float64)
+        hits = [self.postings[g] for g in query_grams if g in self.postings]
+        if hits:
+            shared = np.bincount(np.concatenate(hits), minlength=len(self))
+            similarity = shared / len(query_grams)
+            scores = np.where(similarity >= MIN_SIMILARITY, similarity, 0.0)
+
+        # Exact substring hits: intersect the posting lists of the query's inner
+        # trigrams, then confirm only those few candidates
+        required = inner_trigrams(query)
+        if required and all(g in self.postings for g in required):
+            candidates = self.postings[required.pop()]
+            for gram in required:
+                candidates = np.intersect1d(candidates, self.postings[gram], assume_unique=True)
+            substring_hits = [p for p in candidates if query in self.normalized[p]]
+            scores[substring_hits] += 1.0
+        scores[prefix_hits] += 2.0
+
+        matches = np.flatnonzero(scores > 0)
+        if len(matches) > k:
+            matches = matches[np.argpartition(-scores[matches], k - 1)[:k]]
+        # Best score first; among equals, shorter titles first, then alphabetical
+        return matches[np.lexsort((self.normalized[matches].astype(str), self.trigram_counts[matches], -scores[matches]))]
@@ -0,0 +1,501 @@
+# train_model.py
+#
+# The "Model Trainer" from moviepro.ipynb as a command-line script. Same NCF
+# architecture and id mappings, but the ratings are STREAMED out of movies.db
+# instead of being loaded into pandas, so it also works when the ratings
+# table is far bigger than RAM:
+#  - the table is read in ratingId ranges ("chunks"); every epoch visits the
+#    chunks in a new random order and shuffles the rows inside each chunk.
+#  - tf.data batches each chunk, shuffles the batches through a buffer and
+#    prefetches the next ones while the current step trains.
+#  - the validation split is a hash of ratingId, so a rating is on the same
+#    side of the split on every run (see is_validation).
+#  - the model, mappings, NumPy weights and model_manifest.json are written to
+#    temp files and renamed into place together; the manifest goes last.
+#
+# Usage (from the project folder):
+#   python train_model.py [--epochs 10] [--batch-size 128]
+#   python train_model.py --incremental [--epochs 2]
+#
+# --incremental warm-starts from the current model instead: it keeps every
+# existing user/movie index, appends rows for new ones, and fine-tunes only on
+# the ratings added since the last build (the manifest's watermark) mixed with
+# a random replay sample of older ratings, so the model does not drift toward
+# the few users who rated recently.
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+
+from db import DB_PATH, connect
+from ncf_engine import MODEL_PATH, WEIGHTS_PATH, USER_INDEX_PATH, MOVIE_INDEX_PATH, extract_weights
+
+MANIFEST_PATH = 'model_manifest.json'
+
+EPOCHS = 10
+BATCH_SIZE = 128
+EMBEDDING_SIZE = 50
+LEARNING_RATE = 0.001
+CHUNK_SIZE = 200_000     # ratingId range read from SQLite at a time
+SHUFFLE_BATCHES = 512    # tf.data shuffle buffer, in batches
+VALIDATION_PERCENT = 10
+SEED = 42
+
+INCREMENTAL_EPOCHS = 2
+REPLAY_RATIO = 2.0       # older ratings replayed per new rating
+MIN_REPLAY = 20_000
+
+
+# --- 1. Data ---
+def is_validation(rating_ids):
+    """Deterministic hold-out split: multiplicative hash of ratingId, mod 100."""
+    rating_ids = np.asarray(rating_ids, dtype=np.int64)
+    return (rating_ids * 2654435761) % 4294967296 % 100 < VALIDATION_PERCENT
+
+
+def read_chunk(con, start, end):
+    return pd.read_sql_query(
+        "SELECT ratingId, userId, movieId, rating, timestamp FROM ratings WHERE ratingId >= ? AND ratingId < ?",
+        con, params=(int(start), int(end)),
+    )
+
+
+def chunk_ranges(min_id, max_id, chunk_size=CHUNK_SIZE):
+    starts = np.arange(min_id, max_id + 1, chunk_size, dtype=np.int64)
+    return [(int(s), int(min(s + chunk_size, max_id + 1))) for s in starts]
+
+
+def lookup_table(id_to_index):
+    """Dense id -> index array (-1 for unknown ids), for vectorized mapping."""
+    size = max(id_to_index, default=-1) + 1
+    table = np.full(size, -1, dtype=np.int32)
+    table[np.fromiter(id_to_index.keys(), dtype=np.int64)] = np.fromiter(id_to_index.values(), dtype=np.int32)
+    return table
+
+
+def lookup(table, ids):
+    ids = np.asarray(ids, dtype=np.int64)
+    inside = (ids >= 0) & (ids < len(table))
+    return np.where(inside, table[np.where(inside, ids, 0)], -1)
+
+
+def extend_mapping(id_to_index, ids):
+    """Number ids not seen yet in order of first appearance, after the existing ones."""
+    for value in pd.unique(ids):
+        id_to_index.setdefault(int(value), len(id_to_index))
+
+
+def hash_ratings(digest, chunk):
+    digest.update(chunk[['ratingId', 'userId', 'movieId', 'timestamp']].to_numpy(dtype=np.int64).tobytes())
+    digest.update(chunk['rating'].to_numpy(dtype=np.float64).tobytes())
+
+
+def scan_ratings(con, chunk_size=CHUNK_SIZE):
+    """One streaming pass over the ratings: id mappings, data hash and counts.
+
+    Users and movies are numbered in order of first appearance, exactly like
+    `ratings_df['userId'].unique()` in the notebook. Ratings of movies that are
+    no longer in the movies table are skipped, as in the notebook.
+    """
+    min_id, max_id = con.execute("SELECT MIN(ratingId), MAX(ratingId) FROM ratings").fetchone()
+    if min_id is None:
+        raise ValueError("The ratings table is empty.")
+    known_movies = {row[0] for row in con.execute("SELECT movieId FROM movies")}
+
+    user_to_index, movie_to_index = {}, {}
+    digest = hashlib.sha256()
+    n_train = n_validation = 0
+    watermark = 0
+    for start, end in chunk_ranges(min_id, max_id, chunk_size):
+        chunk = read_chunk(con, start, end)
+        chunk = chunk[chunk['movieId'].isin(known_movies)]
+        if chunk.empty:
+            continue
+        extend_mapping(user_to_index, chunk['userId'])
+        extend_mapping(movie_to_index, chunk['movieId'])
+        hash_ratings(digest, chunk)
+        held_out = int(is_validation(chunk['ratingId']).sum())
+        n_validation += held_out
+        n_train += len(chunk) - held_out
+        watermark = max(watermark, int(chunk['timestamp'].max()))
+
+    return {
+        'user_to_index': user_to_index,
+        'movie_to_index': movie_to_index,
+        'ranges': chunk_ranges(min_id, max_id, chunk_size),
+        'max_rating_id': int(max_id),
+        'sha256': digest.hexdigest(),
+        'n_train': n_train,
+        'n_validation': n_validation,
+        'timestamp_watermark': watermark,
+    }
+
+
+def chunk_generator(db_path, ranges, user_table, movie_table, validation, seed=None):
+    """Yields (user_idx, movie_idx, rating) arrays, one chunk at a time.
+
+    With a seed, the chunk order and the rows inside each chunk are shuffled,
+    and every call (= every epoch) gets a different order.
+    """
+    rng = np.random.default_rng(seed)
+
+    def generate():
+        order = rng.permutation(len(ranges)) if seed is not None else range(len(ranges))
+        con = connect(db_path)
+        try:
+            for i in order:
+                chunk = read_chunk(con, *ranges[i])
+                users = lookup(user_table, chunk['userId'])
+                movies = lookup(movie_table, chunk['movieId'])
+                keep = (users >= 0) & (movies >= 0) & (is_validation(chunk['ratingId']) == validation)
+                if not keep.any():
+                    continue
+                users, movies = users[keep], movies[keep]
+                ratings = chunk['rating'].to_numpy(dtype=np.float32)[keep]
+                if seed is not None:
+                    shuffle = rng.permutation(len(ratings))
+                    users, movies, ratings = users[shuffle], movies[shuffle], ratings[shuffle]
+                yield users.astype(np.int32), movies.astype(np.int32), ratings
+        finally:
+            con.close()
+
+    return generate
+
+
+def make_dataset(generator, batch_size=BATCH_SIZE, shuffle_batches=0, seed=SEED):
+    import tensorflow as tf
+
+    spec = tf.TensorSpec(shape=[None], dtype=tf.int32)
+    dataset = tf.data.Dataset.from_generator(
+        generator, output_signature=(spec, spec, tf.TensorSpec(shape=[None], dtype=tf.float32)),
+    )
+    # Batch inside each chunk with TF ops instead of yielding batches from Python
+    dataset = dataset.flat_map(
+        lambda u, m, r: tf.data.Dataset.from_tensor_slices(((u, m), r)).batch(batch_size)
+    )
+    if shuffle_batches:
+        dataset = dataset.shuffle(shuffle_batches, seed=seed, reshuffle_each_iteration=True)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+# --- 2. Model (same architecture as moviepro.ipynb) ---
+def use_all_cpu_cores():
+    import tensorflow as tf
+
+    tf.config.set_visible_devices([], 'GPU')
+    tf.config.threading.set_intra_op_parallelism_threads(os.cpu_count() or 1)
+    tf.config.threading.set_inter_op_parallelism_threads(os.cpu_count() or 1)
+
+
+def build_model(n_users, n_movies, embedding_size=EMBEDDING_SIZE, learning_rate=LEARNING_RATE):
+    from tensorflow.keras.models import Model
+    from tensorflow.keras.layers import Input, Embedding, Flatten, Concatenate, Dense
+    from tensorflow.keras.metrics import RootMeanSquaredError
+    from tensorflow.keras.optimizers import Adam
+
+    user_input = Input(shape=[1], name='UserInput')
+    user_embedding = Embedding(input_dim=n_users, output_dim=embedding_size, name='UserEmbedding')(user_input)
+    user_vec = Flatten()(user_embedding)
+    movie_input = Input(shape=[1], name='MovieInput')
+    movie_embedding = Embedding(input_dim=n_movies, output_dim=embedding_size, name='MovieEmbedding')(movie_input)
+    movie_vec = Flatten()(movie_embedding)
+    concat = Concatenate()([user_vec, movie_vec])
+    dense = Dense(128, activation='relu')(concat)
+    dense = Dense(64, activation='relu')(dense)
+    output = Dense(1, name='Output')(dense)
+    model = Model([user_input, movie_input], output)
+    model.compile(optimizer=Adam(learning_rate=learning_rate), loss='mean_squared_error',
+                  metrics=[RootMeanSquaredError(name='rmse')])
+    return model
+
+
+def grow_model(old_model, n_users, n_movies):
+    """Copy of `old_model` with room for more users/movies; existing indices keep their rows.
+
+    New rows start at the average embedding (the same prior as user_foldin).
+    """
+    from tensorflow.keras.layers import Dense
+
+    arrays = extract_weights(old_model)
+
+    def grow(table, n_rows):
+        extra = np.repeat(table.mean(axis=0, keepdims=True), n_rows - len(table), axis=0)
+        return np.vstack([table, extra])
+
+    model = build_model(n_users, n_movies, embedding_size=arrays['user_embedding'].shape[1])
+    model.get_layer('UserEmbedding').set_weights([grow(arrays['user_embedding'], n_users)])
+    model.get_layer('MovieEmbedding').set_weights([grow(arrays['movie_embedding'], n_movies)])
+    dense_layers = [layer for layer in model.layers if isinstance(layer, Dense)]
+    for layer, i in zip(dense_layers, '123'):
+        layer.set_weights([arrays['w' + i], arrays['b' + i]])
+    return model
+
+
+# --- 3. Saving ---
+def publish_artifacts(model, user_to_index, movie_to_index, manifest):
+    """Write every output to a temp file, then rename them all into place.
+
+    The app keeps reading the old files until the renames, which are atomic
+    per file and happen back to back; the manifest is renamed last.
+    """
+    tmp_model = MODEL_PATH.replace('.keras', '.tmp.keras')
+    model.save(tmp_model)
+    tmp_weights = WEIGHTS_PATH + '.tmp.npz'
+    np.savez(tmp_weights, **extract_weights(model))
+
+    pending = [
+        (tmp_weights, WEIGHTS_PATH),
+        (tmp_model, MODEL_PATH),
+        (write_json(USER_INDEX_PATH, {str(k): v for k, v in user_to_index.items()}), USER_INDEX_PATH),
+        (write_json(MOVIE_INDEX_PATH, {str(k): v for k, v in movie_to_index.items()}), MOVIE_INDEX_PATH),
+        (write_json(MANIFEST_PATH, manifest, indent=2), MANIFEST_PATH),
+    ]
+    for tmp_path, path in pending:
+        os.replace(tmp_path, path)
+
+
+def write_json(path, data, **kwargs):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, **kwargs)
+    return tmp_path
+
+
+def clear_stale_foldins(db_path, published_at):
+    """Folded-in user vectors written up to `published_at` live in the OLD model's embedding space."""
+    con = connect(db_path)
+    try:
+        with con:
+            con.execute("DELETE FROM user_embedding_overrides WHERE updated_at <= ?", (int(published_at),))
+    except sqlite3.OperationalError:
+        pass  # no user was ever folded in on this database
+    finally:
+        con.close()
+
+
+def read_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+# --- 4. Training ---
+def train(db_path=DB_PATH, epochs=EPOCHS, batch_size=BATCH_SIZE, chunk_size=CHUNK_SIZE, seed=SEED):
+    import tensorflow as tf
+
+    use_all_cpu_cores()
+    tf.keras.utils.set_random_seed(seed)
+    started_at = time.time()
+    timings = {}
+
+    print("Scanning ratings in movies.db...")
+    start_time = time.perf_counter()
+    con = connect(db_path)
+    try:
+        data = scan_ratings(con, chunk_size)
+    finally:
+        con.close()
+    timings['scan'] = time.perf_counter() - start_time
+    user_to_index, movie_to_index = data['user_to_index'], data['movie_to_index']
+    print(f"{data['n_train']} training / {data['n_validation']} validation ratings, "
+          f"{len(user_to_index)} users, {len(movie_to_index)} movies ({timings['scan']:.1f}s).")
+
+    user_table, movie_table = lookup_table(user_to_index), lookup_table(movie_to_index)
+    train_ds = make_dataset(chunk_generator(db_path, data['ranges'], user_table, movie_table, False, seed=seed),
+                            batch_size, shuffle_batches=SHUFFLE_BATCHES, seed=seed)
+    # The validation split is small: read it once, then keep it in memory
+    val_ds = make_dataset(chunk_generator(db_path, data['ranges'], user_table, movie_table, True),
+                          batch_size * 8).cache()
+
+    # A streamed dataset has no known length, so Keras warns at every epoch end
+    warnings.filterwarnings('ignore', message='Your input ran out of data')
+    print(f"Training for {epochs} epochs on {os.cpu_count()} CPU threads...")
+    start_time = time.perf_counter()
+    model = build_model(len(user_to_index), len(movie_to_index))
+    history = model.fit(train_ds, validation_data=val_ds, epochs=epochs, verbose=2)
+    timings['train'] = time.perf_counter() - start_time
+
+    manifest = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(started_at)),
+        'mode': 'full',
+        'data': {
+            'sha256': data['sha256'],
+            'n_train': data['n_train'],
+            'n_validation': data['n_validation'],
+            'max_rating_id': data['max_rating_id'],
+            'timestamp_watermark': data['timestamp_watermark'],
+        },
+        'n_users': len(user_to_index),
+        'n_movies': len(movie_to_index),
+        'embedding_size': EMBEDDING_SIZE,
+        'epochs': epochs,
+        'batch_size': batch_size,
+        'learning_rate': LEARNING_RATE,
+        'validation_percent': VALIDATION_PERCENT,
+        'seed': seed,
+        'history': {key: [float(v) for v in values] for key, values in history.history.items()},
+        'validation_rmse': float(history.history['val_rmse'][-1]),
+    }
+
+    timings['total'] = time.time() - started_at
+    manifest['timings_seconds'] = {key: round(value, 2) for key, value in timings.items()}
+    publish_artifacts(model, user_to_index, movie_to_index, manifest)
+    # Cut off after publishing: users folded in while this run trained were fitted to the old item weights too
+    clear_stale_foldins(db_path, time.time())
+    return manifest
+
+
+def read_delta(con, watermark, max_rating_id):
+    """Ratings added (or re-rated) since the last build."""
+    con.execute("CREATE INDEX IF NOT EXISTS idx_ratings_timestamp ON ratings (timestamp)")
+    return pd.read_sql_query(
+        "SELECT ratingId, userId, movieId, rating, timestamp FROM ratings "
+        "WHERE (ratingId > ? OR timestamp > ?) AND movieId IN (SELECT movieId FROM movies) ORDER BY ratingId",
+        con, params=(int(max_rating_id), int(watermark)),
+    )
+
+
+def sample_replay(con, n_samples, max_rating_id, rng):
+    """Random older ratings, fetched by random ratingId (gaps simply return fewer rows)."""
+    min_id = con.execute("SELECT MIN(ratingId) FROM ratings").fetchone()[0]
+    if min_id is None or n_samples <= 0:
+        return read_chunk(con, 0, 0)
+    n_draw = min(int(n_samples * 1.1), max_rating_id - min_id + 1)
+    # An integer population: NumPy draws the ids without materializing (or permuting) the whole range
+    ids = min_id + rng.choice(max_rating_id - min_id + 1, size=n_draw, replace=False)
+    return pd.read_sql_query(
+        "SELECT ratingId, userId, movieId, rating, timestamp FROM ratings "
+        "WHERE ratingId IN (SELECT value FROM json_each(?))",
+        con, params=(json.dumps(ids.tolist()),),
+    )
+
+
+def train_incremental(db_path=DB_PATH, epochs=INCREMENTAL_EPOCHS, batch_size=BATCH_SIZE,
+                      replay_ratio=REPLAY_RATIO, seed=SEED):
+    import tensorflow as tf
+    from tensorflow.keras.models import load_model
+    from ncf_engine import load_mappings
+
+    previous = read_manifest()
+    if previous is None or not os.path.exists(MODEL_PATH):
+        raise FileNotFoundError(f"Incremental training needs {MODEL_PATH} and {MANIFEST_PATH}; run a full training first.")
+    watermark = previous['data']['timestamp_watermark']
+    max_rating_id = previous['data']['max_rating_id']
+
+    use_all_cpu_cores()
+    tf.keras.utils.set_random_seed(seed)
+    rng = np.random.default_rng(seed)
+    started_at = time.time()
+    timings = {}
+
+    start_time = time.perf_counter()
+    con = connect(db_path)
+    try:
+        delta = read_delta(con, watermark, max_rating_id)
+        if delta.empty:
+            return None
+        replay = sample_replay(con, max(int(len(delta) * replay_ratio), MIN_REPLAY), max_rating_id, rng)
+    finally:
+        con.close()
+    replay = replay[~replay['ratingId'].isin(delta['ratingId'])]
+
+    # Grow the mappings: existing ids keep their index, new ones go at the end
+    user_to_index, movie_to_index = load_mappings()
+    n_old_users, n_old_movies = len(user_to_index), len(movie_to_index)
+    extend_mapping(user_to_index, delta['userId'])
+    extend_mapping(movie_to_index, delta['movieId'])
+
+    rows = pd.concat([delta, replay], ignore_index=True)
+    rows['user_idx'] = lookup(lookup_table(user_to_index), rows['userId'])
+    rows['movie_idx'] = lookup(lookup_table(movie_to_index), rows['movieId'])
+    rows = rows[(rows['user_idx'] >= 0) & (rows['movie_idx'] >= 0)]
+    held_out = is_validation(rows['ratingId'])
+    train_rows, val_rows = rows[~held_out], rows[held_out]
+    timings['read'] = time.perf_counter() - start_time
+    print(f"{len(delta)} new ratings since the last build (+{len(replay)} replayed), "
+          f"{len(user_to_index) - n_old_users} new users, {len(movie_to_index) - n_old_movies} new movies.")
+
+    model = grow_model(load_model(MODEL_PATH), len(user_to_index), len(movie_to_index))
+
+    def inputs(frame):
+        return [frame['user_idx'].to_numpy(np.int32), frame['movie_idx'].to_numpy(np.int32)]
+
+    validation = (inputs(val_rows), val_rows['rating'].to_numpy(np.float32)) if len(val_rows) else None
+    rmse_before = float(model.evaluate(*validation, batch_size=batch_size * 8, verbose=0)[1]) if validation else None
+
+    start_time = time.perf_counter()
+    history = model.fit(inputs(train_rows), train_rows['rating'].to_numpy(np.float32), epochs=epochs,
+                        batch_size=batch_size, shuffle=True, validation_data=validation, verbose=2)
+    timings['train'] = time.perf_counter() - start_time
+
+    delta_digest = hashlib.sha256()
+    hash_ratings(delta_digest, delta)
+    manifest = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(started_at)),
+        'mode': 'incremental',
+        'parent': {'created_at': previous['created_at'], 'sha256': previous['data']['sha256']},
+        'data': {
+            # Chained: hash of the parent's data hash and the delta that was added
+            'sha256': hashlib.sha256((previous['data']['sha256'] + delta_digest.hexdigest()).encode()).hexdigest(),
+            'delta_sha256': delta_digest.hexdigest(),
+            'n_delta': len(delta),
+            'n_replay': len(replay),
+            'n_train': len(train_rows),
+            'n_validation': len(val_rows),
+            'max_rating_id': max(max_rating_id, int(delta['ratingId'].max())),
+            'timestamp_watermark': max(watermark, int(delta['timestamp'].max())),
+        },
+        'n_users': len(user_to_index),
+        'n_movies': len(movie_to_index),
+        'embedding_size': previous.get('embedding_size', EMBEDDING_SIZE),
+        'epochs': epochs,
+        'batch_size': batch_size,
+        'learning_rate': LEARNING_RATE,
+        'validation_percent': VALIDATION_PERCENT,
+        'seed': seed,
+        'history': {key: [float(v) for v in values] for key, values in history.history.items()},
+        'validation_rmse_before': rmse_before,
+        'validation_rmse': float(history.history['val_rmse'][-1]) if validation else None,
+    }
+
+    timings['total'] = time.time() - started_at
+    manifest['timings_seconds'] = {key: round(value, 2) for key, value in timings.items()}
+    publish_artifacts(model, user_to_index, movie_to_index, manifest)
+    # As in train(): fold-ins made during the update used the old item weights
+    clear_stale_foldins(db_path, time.time())
+    return manifest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train the NCF recommender from movies.db.")
+    parser.add_argument('--incremental', action='store_true',
+                        help="fine-tune the current model on ratings added since the last build")
+    parser.add_argument('--epochs', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--replay-ratio', type=float, default=REPLAY_RATIO)
+    parser.add_argument('--seed', type=int, default=SEED)
+    args = parser.parse_args()
+
+    if args.incremental:
+        manifest = train_incremental(epochs=args.epochs or INCREMENTAL_EPOCHS, batch_size=args.batch_size,
+                                     replay_ratio=args.replay_ratio, seed=args.seed)
+        if manifest is None:
+            print("No new ratings since the last build; the model is up to date.")
+            raise SystemExit(0)
+    else:
+        manifest = train(epochs=args.epochs or EPOCHS, batch_size=args.batch_size, chunk_size=args.chunk_size,
+                         seed=args.seed)
+    print("\n--- SUCCESS! ---")
+    if manifest.get('validation_rmse_before') is not None:
+        print(f"Validation RMSE before fine-tuning: {manifest['validation_rmse_before']:.4f}")
+    print(f"Validation RMSE: {manifest['validation_rmse'] or float('nan'):.4f}  (took {manifest['timings_seconds']['total']:.0f}s)")
+    print(f"Updated {MODEL_PATH}, {USER_INDEX_PATH}, {MOVIE_INDEX_PATH}, {WEIGHTS_PATH} and {MANIFEST_PATH}.")
+    print("Rebuild the derived files next: python ann_index.py build && python batch_recommendations.py")
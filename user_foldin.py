@@ -0,0 +1,133 @@
+# user_foldin.py
+#
+# Online "fold-in" of a user's embedding from their current ratings, so a new
+# rating (or a brand-new user) gets personalized recommendations right away,
+# without retraining the NCF model.
+#
+# The movie embeddings and Dense layers stay FIXED. We only solve for the
+# user's 50-number embedding u that best reproduces their ratings:
+#   minimize  sum_i (f(u, movie_i) - rating_i)^2 + reg * ||u - u_avg||^2
+# f is the NCF network, which is non-linear in u, so this takes a few damped
+# Gauss-Newton steps; each step is a small (50 x 50) regularized
+# least-squares solve. u_avg (the average trained user) is the starting point
+# and the prior, so users with only one or two ratings stay sensible.
+#
+# Results go to the `user_embedding_overrides` table of movies.db and Home.py
+# prefers them over the (older) trained embedding.
+
+import time
+import sqlite3
+import numpy as np
+
+from db import DB_PATH, connect, bump_user_version
+
+REGULARIZATION = 0.1
+N_ITERATIONS = 30
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS user_embedding_overrides (
+    userId INTEGER PRIMARY KEY,
+    vector BLOB NOT NULL,
+    n_ratings INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL
+)
+"""
+
+
+def fold_in_user(model, movie_indices, ratings, reg=REGULARIZATION, n_iter=N_ITERATIONS, init=None):
+    """Regularized Gauss-Newton fit of one user vector against fixed item weights."""
+    k = model.embedding_size
+    w1_user = model.w1[:k].astype(np.float64)
+    item_hidden = (model.movie_embedding[movie_indices] @ model.w1[k:] + model.b1).astype(np.float64)
+    w2, b2 = model.w2.astype(np.float64), model.b2.astype(np.float64)
+    w3, b3 = model.w3[:, 0].astype(np.float64), float(model.b3[0])
+    ratings = np.asarray(ratings, dtype=np.float64)
+
+    prior = model.user_embedding.mean(axis=0).astype(np.float64)
+    u = prior.copy() if init is None else np.asarray(init, dtype=np.float64).copy()
+
+    def residuals_and_jacobian(u):
+        h1 = u @ w1_user + item_hidden
+        a1 = np.maximum(h1, 0)
+        h2 = a1 @ w2 + b2
+        predictions = np.maximum(h2, 0) @ w3 + b3
+        # d prediction / d u, row by row: W1u . (relu'(h1) * (W2 . (relu'(h2) * w3)))
+        grad_h1 = (h1 > 0) * (((h2 > 0) * w3) @ w2.T)
+        return predictions - ratings, grad_h1 @ w1_user.T
+
+    def loss(u):
+        return float(np.sum(residuals_and_jacobian(u)[0] ** 2) + reg * np.sum((u - prior) ** 2))
+
+    # Levenberg-Marquardt damping: grow it when a step overshoots (ReLU kinks),
+    # shrink it when steps work, so the solve moves toward plain Gauss-Newton
+    current_loss = loss(u)
+    damping = 1e-3
+    for _ in range(n_iter):
+        residuals, jacobian = residuals_and_jacobian(u)
+        lhs = jacobian.T @ jacobian + (reg + damping) * np.eye(k)
+        rhs = jacobian.T @ residuals + reg * (u - prior)
+        step = np.linalg.solve(lhs, -rhs)
+        new_loss = loss(u + step)
+        if new_loss < current_loss:
+            converged = current_loss - new_loss < 1e-6 * max(current_loss, 1.0)
+            u, current_loss = u + step, new_loss
+            damping = max(damping / 3, 1e-9)
+            if converged:
+                break
+        else:
+            damping *= 4
+    return u.astype(np.float32)
+
+
+# --- Storage ---
+def save_user_vector(con, user_id, vector, n_ratings):
+    with con:
+        con.execute(CREATE_TABLE_SQL)
+        con.execute(
+            "INSERT OR REPLACE INTO user_embedding_overrides (userId, vector, n_ratings, updated_at) VALUES (?, ?, ?, ?)",
+            (int(user_id), np.asarray(vector, dtype=np.float32).tobytes(), int(n_ratings), int(time.time())),
+        )
+        # Cached recommendations for this user are now stale
+        bump_user_version(con, user_id)
+
+
+def load_user_vector(user_id, db_path=DB_PATH):
+    """The folded-in embedding for a user, or None if they have none."""
+    con = connect(db_path)
+    try:
+        row = con.execute("SELECT vector FROM user_embedding_overrides WHERE userId = ?", (int(user_id),)).fetchone()
+    except sqlite3.OperationalError:
+        # No user has been folded in on this database yet
+        row = None
+    finally:
+        con.close()
+    return None if row is None else np.frombuffer(row[0], dtype=np.float32)
+
+
+def user_rated_movie_indices(con, user_id, movie_to_index):
+    """(movie indices, ratings) of everything a user rated that the model knows about."""
+    rows = con.execute("SELECT movieId, rating FROM ratings WHERE userId = ?", (int(user_id),)).fetchall()
+    known = [(movie_to_index[m], r) for m, r in rows if m in movie_to_index]
+    movie_indices = np.array([m for m, _ in known], dtype=np.int64)
+    ratings = np.array([r for _, r in known], dtype=np.float32)
+    return movie_indices, ratings
+
+
+def refresh_user_vector(model, movie_to_index, user_id, user_to_index=None, db_path=DB_PATH):
+    """Re-fit and store a user's embedding from their ratings in movies.db.
+
+    Users the model was trained on start from their trained embedding.
+    """
+    con = connect(db_path)
+    try:
+        movie_indices, ratings = user_rated_movie_indices(con, user_id, movie_to_index)
+        if len(ratings) == 0:
+            return None
+        init = None
+        if user_to_index is not None and user_id in user_to_index:
+            init = model.user_embedding[user_to_index[user_id]]
+        vector = fold_in_user(model, movie_indices, ratings, init=init)
+        save_user_vector(con, user_id, vector, len(ratings))
+    finally:
+        con.close()
+    return vector